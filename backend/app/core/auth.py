@@ -0,0 +1,292 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Request, status
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core import database
+from app.core.database import get_async_db, is_replica_session, read_session
+from app.core.metrics import cache_collector, registry
+from app.core.security import decode_token, token_cache
+from app.models.user import User, UserRole
+from app.services.events import Event, event_hub
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated caller built from signed token claims, without a DB lookup"""
+
+    user_id: int
+    email: str
+    role: UserRole
+    token_version: int = 0
+
+    @property
+    def id(self) -> int:
+        return self.user_id
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only copy of a User row that is safe to share across sessions"""
+
+    id: int
+    email: str
+    full_name: str
+    role: UserRole
+    is_active: bool
+    token_version: int
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=user.is_active,
+            token_version=user.token_version or 0,
+            created_at=user.created_at,
+        )
+
+
+# Minimum version for users that are deactivated or gone: every token is revoked
+ALL_REVOKED = 2 ** 63
+
+
+class TokenVersions:
+    """Minimum accepted token version per user, read from ``users``.
+
+    A miss loads ``token_version`` and ``is_active`` and keeps the result for
+    ``token_version_cache_ttl_seconds``. A change made anywhere (another
+    worker, manage_users.py, plain SQL) therefore takes effect within that
+    window. Changes flushed by this app apply at once in this process and
+    reach the other workers over the event hub when the session commits.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = TTLCache(maxsize, ttl)
+        self.lookups = 0
+
+    def revoke(self, user_id: int, min_version: int) -> None:
+        if min_version > (self.cache.get(user_id) or 0):
+            self.cache.set(user_id, min_version)
+
+    async def min_version(self, user_id: int) -> int:
+        cached = self.cache.get(user_id)
+        if cached is not None:
+            return cached
+        self.lookups += 1
+        async with database.AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(User.token_version, User.is_active).where(User.id == user_id)
+            )).first()
+        min_version = (row.token_version or 0) if row is not None and row.is_active else ALL_REVOKED
+        self.cache.set(user_id, min_version)
+        return min_version
+
+    async def is_revoked(self, user_id: int, token_version: int) -> bool:
+        if not settings.token_version_check:
+            return False
+        return token_version < await self.min_version(user_id)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+token_versions = TokenVersions(settings.user_cache_size, settings.token_version_cache_ttl_seconds)
+registry.add_collector(cache_collector("token_versions", token_versions.cache))
+user_cache = TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+registry.add_collector(cache_collector("users", user_cache))
+# Users updated within the replica lag window; a replica may still return
+# their old row, so such reads are served but not cached
+recent_user_writes = TTLCache(settings.user_cache_size, settings.read_your_writes_seconds)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop the cached snapshot and cached token payloads of one user"""
+    user_cache.pop(user_id)
+    token_cache.discard_where(lambda _, payload: payload.get("user_id") == user_id)
+
+
+def may_cache_user_read(db: AsyncSession, user_id: int) -> bool:
+    return not (is_replica_session(db) and recent_user_writes.get(user_id) is not None)
+
+
+def cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
+def revoke_user_tokens(user: User) -> None:
+    """Invalidate every token issued to the user so far (caller commits)"""
+    user.token_version = (user.token_version or 0) + 1
+
+
+@event.listens_for(User, "before_update")
+def _bump_version_on_access_change(mapper, connection, target):
+    # Tokens carry the role claim, so a role change retires them as well
+    added, _, _ = get_history(target, "is_active")
+    if (added and added[0] is False) or get_history(target, "role").has_changes():
+        if not get_history(target, "token_version").has_changes():
+            revoke_user_tokens(target)
+
+
+@event.listens_for(User, "after_update")
+def _record_token_version(mapper, connection, target):
+    recent_user_writes.set(target.id, True)
+    if get_history(target, "token_version").has_changes():
+        token_versions.revoke(target.id, target.token_version)
+        invalidate_user(target.id)
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("token_revocations", {})[target.id] = target.token_version
+    else:
+        user_cache.pop(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _broadcast_revocations(session):
+    revocations = session.info.pop("token_revocations", None)
+    if revocations:
+        # No recipients: only the workers' listeners see it
+        event_hub.publish(Event("user.tokens_revoked", {"revocations": list(revocations.items())}))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_revocations(session):
+    session.info.pop("token_revocations", None)
+
+
+def _revoke_on_event(published: Event) -> None:
+    for user_id, min_version in published.data["revocations"]:
+        token_versions.revoke(user_id, min_version)
+        invalidate_user(user_id)
+        event_hub.revoke_streams(user_id, min_version)
+
+
+event_hub.add_listener("user.tokens_revoked", _revoke_on_event)
+
+
+def token_claims(user: User) -> dict:
+    """Claims signed into access tokens and read back by get_current_principal"""
+    return {
+        "sub": user.email,
+        "user_id": user.id,
+        "role": user.role,
+        "ver": user.token_version or 0,
+    }
+
+
+def principal_from_payload(payload: Optional[dict]) -> Optional[Principal]:
+    if not payload or payload.get("user_id") is None:
+        return None
+    try:
+        role = UserRole(payload.get("role"))
+    except ValueError:
+        return None
+    return Principal(
+        user_id=payload["user_id"],
+        email=payload.get("sub", ""),
+        role=role,
+        token_version=payload.get("ver", 0),
+    )
+
+
+async def get_token(
+    token: Optional[str] = None, authorization: Optional[str] = Header(None)
+) -> Optional[str]:
+    """Read the access token from the ?token= query or the Authorization header"""
+    if token:
+        return token
+    if authorization:
+        scheme, _, value = authorization.partition(" ")
+        if scheme.lower() == "bearer" and value:
+            return value
+    return None
+
+
+async def get_current_principal(token: Optional[str] = Depends(get_token)) -> Principal:
+    """Authenticate the caller from the token claims alone"""
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+        )
+
+    principal = principal_from_payload(decode_token(token))
+    if not principal or await token_versions.is_revoked(principal.user_id, principal.token_version):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+        )
+
+    return principal
+
+
+async def get_user_or_404(db: AsyncSession, user_id: int) -> User:
+    user = await db.get(User, user_id)
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+
+    return user
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """Load the full User row for routes that need more than the token claims"""
+    return await get_user_or_404(db, principal.user_id)
+
+
+async def load_user_snapshot(db: AsyncSession, user_id: int) -> UserSnapshot:
+    """Read the user from ``db`` and cache the snapshot when that is safe"""
+    snapshot = UserSnapshot.from_user(await get_user_or_404(db, user_id))
+    if may_cache_user_read(db, user_id):
+        user_cache.set(user_id, snapshot)
+    return snapshot
+
+
+async def get_user_snapshot_or_404(db: AsyncSession, user_id: int) -> UserSnapshot:
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        snapshot = await load_user_snapshot(db, user_id)
+    return snapshot
+
+
+async def get_current_user_snapshot(
+    request: Request,
+    principal: Principal = Depends(get_current_principal),
+) -> UserSnapshot:
+    """Cached read-only view of the caller for routes that only render the user"""
+    snapshot = user_cache.get(principal.user_id)
+    if snapshot is None:
+        # Only a miss opens a session
+        async with read_session(request) as db:
+            snapshot = await load_user_snapshot(db, principal.user_id)
+    return snapshot
+
+
+def require_role(role: UserRole, detail: str = "Access denied"):
+    """Dependency factory that checks the principal's role without touching the DB"""
+
+    async def dependency(principal: Principal = Depends(get_current_principal)) -> Principal:
+        if principal.role != role:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=detail,
+            )
+        return principal
+
+    return dependency
@@ -6,8 +6,145 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Access-token signing keys as kid:secret[:retire_at], comma separated;
+    # the first signs, the rest only verify. Empty = SECRET_KEY as kid "default"
+    jwt_keys: str = ""
+    jwt_backend: str = "jose"  # 'jose' or 'hmac' (stdlib, HS* only)
+    # Opaque refresh tokens, rotated on every /api/auth/refresh
+    refresh_token_expire_days: int = 30
     frontend_url: str = "http://localhost:3000"
 
+    # Connection pool (per engine, per worker process)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Connections to open at startup so the first requests skip connect latency
+    db_pool_warmup: int = 0
+
+    # Optional read replicas (comma-separated URLs) used by get_read_db
+    database_replica_urls: str = ""
+    replica_health_check_interval_seconds: int = 5
+    replica_health_check_timeout_seconds: float = 2.0
+    # Reads within this many seconds of the client's last write use the primary
+    read_your_writes_seconds: int = 5
+
+    # Reject tokens whose "ver" claim is older than the user's current
+    # token_version (bumped on deactivation / explicit revocation)
+    token_version_check: bool = True
+    # How long a worker trusts its copy of users.token_version / is_active.
+    # Changes made through the app reach every worker at once over the event
+    # hub; this is the bound for changes made with plain SQL
+    token_version_cache_ttl_seconds: int = 60
+
+    # In-process caches for verified token payloads and resolved users
+    token_cache_size: int = 10000
+    token_cache_max_ttl_seconds: int = 300
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: int = 60
+    # Rendered client / fee-earner home payloads, invalidated on user updates
+    dashboard_cache_size: int = 10000
+    dashboard_cache_ttl_seconds: int = 300
+
+    # Password hashing: bcrypt work factor and the dedicated worker pool
+    bcrypt_rounds: int = 12
+    bcrypt_executor: str = "thread"  # 'thread' or 'process'
+    bcrypt_workers: int = 4
+    bcrypt_max_pending: int = 64
+
+    # Login brute-force protection (sliding window per client IP and per email)
+    login_rate_limit_enabled: bool = True
+    login_rate_limit_per_ip: int = 30
+    login_rate_limit_per_email: int = 5
+    login_rate_limit_window_seconds: int = 300
+    rate_limit_backend: str = "memory"  # 'memory' or 'redis'
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    rate_limit_max_keys: int = 100000
+
+    # Background job that marks overdue pending invites as expired
+    invite_sweep_enabled: bool = True
+    invite_sweep_interval_seconds: int = 60
+    invite_sweep_batch_size: int = 500
+
+    # Upper bound on rows accepted by POST /api/invites/bulk
+    bulk_invite_max_rows: int = 5000
+
+    # Outbox dispatcher delivering invite emails after the invite commits
+    outbox_dispatch_enabled: bool = True
+    outbox_poll_interval_seconds: float = 5.0
+    outbox_batch_size: int = 100
+    outbox_concurrency: int = 10
+    outbox_max_attempts: int = 8
+    outbox_retry_base_seconds: float = 10.0
+    outbox_retry_max_seconds: float = 3600.0
+    outbox_lease_seconds: int = 300
+    outbox_send_timeout_seconds: float = 30.0
+
+    # Email delivery: 'file' (writes .eml files), 'memory' or 'smtp'
+    email_transport: str = "file"
+    email_from: str = "no-reply@example.com"
+    email_file_dir: str = "outbox-mail"
+    smtp_host: str = "localhost"
+    smtp_port: int = 587
+    smtp_username: str = ""
+    smtp_password: str = ""
+    smtp_starttls: bool = True
+
+    # Server-sent events (/api/events/stream). 'auto' uses LISTEN/NOTIFY on
+    # PostgreSQL so events reach streams held by any worker, else 'local'
+    events_transport: str = "auto"  # 'auto', 'postgres' or 'local'
+    events_queue_size: int = 100  # per stream; a client that falls further behind resyncs
+    events_heartbeat_seconds: float = 15.0
+    events_max_connections: int = 10000  # per worker
+
+    # Audit log: requests buffer events in memory and a background writer
+    # inserts them in batches. When the buffer is full, 'drop' discards the
+    # event (counted in audit_events_dropped_total); 'block' makes the request
+    # wait for room, up to audit_block_timeout_seconds, then drops
+    audit_enabled: bool = True
+    audit_buffer_size: int = 10000  # per worker
+    audit_overflow: str = "drop"  # 'drop' or 'block'
+    audit_block_timeout_seconds: float = 1.0
+    audit_batch_size: int = 500  # rows per multi-row INSERT
+    audit_write_attempts: int = 3
+
+    # Idempotency-Key on retry-prone POSTs (see main.py): a retry gets the
+    # first attempt's response replayed. 'memory' is per worker; 'database'
+    # shares keys between workers through the idempotency_keys table
+    idempotency_enabled: bool = True
+    idempotency_backend: str = "memory"  # 'memory' or 'database'
+    idempotency_ttl_seconds: int = 86400
+    idempotency_cache_size: int = 10000  # completed responses kept in memory per worker
+    # How long a duplicate waits for the original still running in another
+    # worker before getting 409, and how long a crashed worker's claim blocks the key
+    idempotency_wait_seconds: float = 10.0
+    idempotency_lock_seconds: int = 60
+
+    # Production server (serve.py): pre-forked workers, each with its own
+    # pools, caches and background services
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # 0 = one per CPU
+    # Total connections to the primary across all workers; when set, serve.py
+    # gives each worker a pool of db_max_connections // workers, no overflow
+    db_max_connections: int = 0
+    # Threads per worker for sync endpoints and to_thread calls
+    threadpool_size: int = 40
+    keep_alive_timeout_seconds: int = 5
+    server_backlog: int = 2048
+    server_limit_concurrency: int = 0  # per worker, 0 = unlimited; excess gets 503
+    server_max_requests: int = 0  # recycle a worker after about this many requests
+    graceful_shutdown_seconds: int = 30
+    # Workers share metrics snapshots here so /metrics covers all of them
+    metrics_dir: str = ""
+    metrics_snapshot_interval_seconds: float = 5.0
+
+    # /metrics and /health/db-pool answer only callers from these networks
+    # (comma-separated CIDRs) or presenting "Authorization: Bearer <metrics_token>"
+    internal_networks: str = "127.0.0.0/8,::1/128"
+    metrics_token: str = ""
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,78 @@
+"""Read-your-writes tracking for replica routing.
+
+A commit on a primary session marks the current request as a writer; the
+response then carries ``X-Last-Write`` (a Unix timestamp). Clients echo the
+latest value back on later requests, and reads within
+``read_your_writes_seconds`` of it are served by the primary instead of a
+replica that may not have caught up yet.
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+LAST_WRITE_HEADER = "X-Last-Write"
+
+
+class RequestWrites:
+    def __init__(self):
+        self.last_write: Optional[float] = None
+
+
+current_request_writes: ContextVar[Optional[RequestWrites]] = ContextVar(
+    "current_request_writes", default=None
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_write(session):
+    if session.info.get("replica"):
+        return
+    writes = current_request_writes.get()
+    if writes is not None:
+        writes.last_write = time.time()
+
+
+def needs_primary(last_write_header: Optional[str]) -> bool:
+    """True if this request wrote, or the client wrote within the lag window"""
+    writes = current_request_writes.get()
+    if writes is not None and writes.last_write is not None:
+        return True
+    if not last_write_header:
+        return False
+    try:
+        last_write = float(last_write_header)
+    except ValueError:
+        return False
+    return time.time() - last_write < settings.read_your_writes_seconds
+
+
+class WriteMarkerMiddleware:
+    """Pure ASGI middleware that stamps responses of requests that committed"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes = RequestWrites()
+        token = current_request_writes.set(writes)
+
+        async def send_with_marker(message):
+            if message["type"] == "http.response.start" and writes.last_write is not None:
+                headers = list(message.get("headers", []))
+                headers.append((LAST_WRITE_HEADER.lower().encode(), f"{writes.last_write:.3f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_marker)
+        finally:
+            current_request_writes.reset(token)
@@ -1,20 +1,357 @@
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.core.consistency import LAST_WRITE_HEADER, needs_primary
+from app.core.metrics import instrument_engine, registry
 
-engine = create_engine(
-    settings.database_url,
-    echo=False,
-    pool_pre_ping=True,
-)
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class PoolStats:
+    """Checkout wait times for one engine's pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+
+def _timed_pool_class(base):
+    """Subclass ``base`` so every checkout records how long it waited.
+
+    The stats live on the class because Pool.recreate() (engine.dispose())
+    builds a fresh instance of the same class.
+    """
+
+    class TimedPool(base):
+        stats = PoolStats()
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                self.stats.record_wait(time.perf_counter() - start)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def async_database_url(database_url: str) -> str:
+    """Swap the sync driver in DATABASE_URL for its asyncio counterpart"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if url.get_driver_name() in ("asyncpg", "aiosqlite") or backend not in ASYNC_DRIVERS:
+        return database_url
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def engine_options(database_url: str, poolclass) -> dict:
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite keeps its single-connection pool
+        return {}
+    return {
+        "poolclass": _timed_pool_class(poolclass),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+class ReplicaSet:
+    """Async engines for the read replicas, handed out round-robin among the healthy ones.
+
+    A replica is marked down when a connection to it fails, and a background
+    health check (one ``SELECT 1`` per replica per interval) brings it back.
+    With no healthy replica, reads fall back to the primary.
+    """
+
+    def __init__(self):
+        self.engines: List[AsyncEngine] = []
+        self.healthy: List[bool] = []
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.failovers = 0
+
+    def configure(self, urls: List[str]) -> None:
+        for url in urls:
+            replica = create_async_engine(
+                async_database_url(url),
+                echo=False,
+                **engine_options(url, AsyncAdaptedQueuePool),
+            )
+            instrument_engine(replica.sync_engine)
+            self.engines.append(replica)
+            self.healthy.append(True)
+
+    def candidates(self) -> List[AsyncEngine]:
+        """Healthy replicas, starting from the next one in round-robin order"""
+        if not self.engines:
+            return []
+        count = len(self.engines)
+        start = next(self._counter) % count
+        indexes = [(start + offset) % count for offset in range(count)]
+        return [self.engines[index] for index in indexes if self.healthy[index]]
+
+    def mark_down(self, replica: AsyncEngine) -> None:
+        index = self.engines.index(replica)
+        if self.healthy[index]:
+            logger.warning("Read replica %d is unavailable; routing reads elsewhere", index)
+        self.healthy[index] = False
+        self.failovers += 1
+
+    async def check(self) -> None:
+        for index, replica in enumerate(self.engines):
+            try:
+                await asyncio.wait_for(self._ping(replica), settings.replica_health_check_timeout_seconds)
+            except Exception:
+                if self.healthy[index]:
+                    logger.warning("Read replica %d failed its health check", index)
+                self.healthy[index] = False
+            else:
+                if not self.healthy[index]:
+                    logger.info("Read replica %d is healthy again", index)
+                self.healthy[index] = True
+
+    @staticmethod
+    async def _ping(replica: AsyncEngine) -> None:
+        async with replica.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def run_forever(self) -> None:
+        while not self._stopping.is_set():
+            await self.check()
+            try:
+                await asyncio.wait_for(
+                    self._stopping.wait(), settings.replica_health_check_interval_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self.engines and self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    async def dispose(self) -> None:
+        await self.stop()
+        for replica in self.engines:
+            await replica.dispose()
+        self.engines, self.healthy = [], []
+
+
+def replica_urls() -> List[str]:
+    return [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()]
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engines are created by init_engines() (the app's lifespan, or a CLI
+# script) rather than at import, so importing the app opens no connections
+# and loads no DB driver, and a pre-forking server builds its pools per worker
+engine: Optional[Engine] = None
+async_engine: Optional[AsyncEngine] = None
+
+read_replicas = ReplicaSet()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+# Bound per session to whichever replica get_read_db picks
+ReadSessionLocal = async_sessionmaker(
+    class_=AsyncSession, autoflush=False, expire_on_commit=False, info={"replica": True}
+)
 Base = declarative_base()
 
 
+def init_engines(sync: bool = True, use_async: bool = True) -> None:
+    """Create the requested engines (once) and bind the session factories to them"""
+    global engine, async_engine
+    if sync and engine is None:
+        engine = create_engine(
+            settings.database_url,
+            echo=False,
+            **engine_options(settings.database_url, QueuePool),
+        )
+        instrument_engine(engine)
+        SessionLocal.configure(bind=engine)
+    if use_async and async_engine is None:
+        async_engine = create_async_engine(
+            async_database_url(settings.database_url),
+            echo=False,
+            **engine_options(settings.database_url, AsyncAdaptedQueuePool),
+        )
+        instrument_engine(async_engine.sync_engine)
+        AsyncSessionLocal.configure(bind=async_engine)
+        read_replicas.configure(replica_urls())
+
+
+async def warm_up_pool(connections: int) -> int:
+    """Open up to ``connections`` pooled async connections ahead of the first requests"""
+    if async_engine is None or connections <= 0:
+        return 0
+    pool = async_engine.pool
+    if isinstance(pool, QueuePool):
+        connections = min(connections, pool.size())
+    opened = await asyncio.gather(
+        *(async_engine.connect() for _ in range(connections)), return_exceptions=True
+    )
+    for connection in opened:
+        if not isinstance(connection, BaseException):
+            await connection.close()
+    return sum(not isinstance(connection, BaseException) for connection in opened)
+
+
+async def dispose_engines() -> None:
+    global engine, async_engine
+    await read_replicas.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+    if engine is not None:
+        engine.dispose()
+        engine = None
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def _open_replica_session() -> Optional[AsyncSession]:
+    """A session on the first healthy replica that accepts a connection"""
+    for replica in read_replicas.candidates():
+        db = ReadSessionLocal(bind=replica)
+        try:
+            # Check out the connection now so a dead replica fails over here
+            # rather than in the middle of the endpoint
+            await db.connection()
+        except Exception:
+            await db.close()
+            read_replicas.mark_down(replica)
+            continue
+        return db
+    return None
+
+
+@asynccontextmanager
+async def read_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """Session for read-only work: a replica when one is healthy and safe to read.
+
+    Falls back to the primary when no replica is configured or reachable, and
+    when the request or the client's recent write (``X-Last-Write``) needs to
+    read its own writes. Endpoints that can often answer from a cache open it
+    only on a miss, so a hit holds no connection.
+    """
+    db = None
+    if read_replicas.engines and not needs_primary(request.headers.get(LAST_WRITE_HEADER)):
+        db = await _open_replica_session()
+    if db is None:
+        db = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_read_db(request: Request):
+    """read_session as a dependency, for endpoints that always query"""
+    async with read_session(request) as db:
+        yield db
+
+
+def is_replica_session(db) -> bool:
+    return bool(db.info.get("replica"))
+
+
+def pool_stats() -> dict:
+    """Current pool occupancy and checkout wait times for the sync and async engines"""
+    result = {}
+    engines = [("sync", engine), ("async", async_engine)]
+    engines += [(f"replica-{index}", replica) for index, replica in enumerate(read_replicas.engines)]
+    for name, current in engines:
+        if current is None:
+            continue
+        pool = current.pool
+        stats = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=max(pool.overflow(), 0),
+            )
+        timing = getattr(pool, "stats", None)
+        if timing is not None:
+            stats.update(
+                checkouts=timing.checkouts,
+                wait_seconds_total=round(timing.wait_seconds_total, 6),
+                wait_seconds_max=round(timing.wait_seconds_max, 6),
+            )
+        if name.startswith("replica-"):
+            stats["healthy"] = read_replicas.healthy[int(name.split("-")[1])]
+        result[name] = stats
+    return result
+
+
+@registry.add_collector
+def _pool_metrics():
+    stats = pool_stats()
+    for field, metric_type, help in (
+        ("size", "gauge", "Configured pool size"),
+        ("checked_out", "gauge", "Connections currently checked out"),
+        ("overflow", "gauge", "Overflow connections currently open"),
+        ("checkouts", "counter", "Connection checkouts"),
+        ("wait_seconds_total", "counter", "Time spent waiting for a pooled connection"),
+    ):
+        samples = [({"engine": name}, engine_stats[field])
+                   for name, engine_stats in stats.items() if field in engine_stats]
+        name = f"db_pool_{field}" if field != "checkouts" else "db_pool_checkouts_total"
+        yield name, metric_type, help, samples
+    if read_replicas.engines:
+        yield "db_replica_healthy", "gauge", "1 if the read replica passed its last health check", [
+            ({"engine": f"replica-{index}"}, int(healthy))
+            for index, healthy in enumerate(read_replicas.healthy)
+        ]
+        yield "db_replica_failovers_total", "counter", "Replica connections that failed over", [
+            ({}, read_replicas.failovers)
+        ]
@@ -0,0 +1,373 @@
+"""Idempotency-Key support for retry-prone POST endpoints.
+
+A client that sends ``Idempotency-Key: <unique value>`` can retry the request
+safely. The first request runs. Every retry with the same key and body gets
+that response replayed, marked ``Idempotent-Replayed: true``, without
+reaching the endpoint, the database or bcrypt. A retry that arrives while the
+first attempt is still running waits for it and shares its response, rather
+than running a second time. Reusing a key for a different body gets 422.
+
+Keys are scoped to the method, path and caller: the access token, read from
+``?token=`` or the Authorization header the way ``get_token`` reads it.
+They are kept for ``IDEMPOTENCY_TTL_SECONDS``. 5xx, 408 and 429 responses are
+not stored, so those attempts can really be retried. Requests without the
+header, or to routes not listed in main.py, pass straight through.
+
+Responses of routes that issue credentials (``withheld_routes``) are never
+stored. Only the fact that the request completed is kept, and a later retry
+gets 409 instead of a copy of the tokens. A duplicate that arrives while the
+original is still running in the same worker still shares its response.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import orjson
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import Counter, cache_collector, registry
+from app.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+# How often a duplicate re-checks a key that another worker is running
+POLL_INTERVAL_SECONDS = 0.2
+# How often the database store deletes expired keys
+PURGE_INTERVAL_SECONDS = 300
+
+idempotency_requests = registry.register(Counter(
+    "idempotency_requests_total",
+    "Requests carrying an Idempotency-Key, by outcome",
+    ("outcome",),  # executed, replayed, coalesced, conflict, mismatch
+))
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str  # sha256 hex of the request body
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: Optional[bytes]  # None when withheld: only the completion is stored
+
+    def withheld(self) -> "StoredResponse":
+        return StoredResponse(self.fingerprint, self.status, [], None)
+
+
+def storable(status: int) -> bool:
+    """Transient failures are not remembered; the retry runs for real"""
+    return status < 500 and status not in (408, 429)
+
+
+def _utc(moment: datetime) -> datetime:
+    # SQLite hands TIMESTAMPTZ values back without an offset; they are UTC
+    return moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+class MemoryIdempotencyStore:
+    """Completed responses in a per-worker LRU cache with a TTL"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self.responses = TTLCache(maxsize, ttl)
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        return self.responses.get(key)
+
+    async def claim(self, key: str, fingerprint: str) -> bool:
+        """Reserve ``key`` for a request about to run; False if another worker
+        holds it. Within one worker the middleware coalesces duplicates itself."""
+        return True
+
+    async def save(self, key: str, response: StoredResponse) -> None:
+        self.responses.set(key, response)
+
+    async def release(self, key: str) -> None:
+        """Give up a claim without a response, so the next retry runs"""
+
+
+class DatabaseIdempotencyStore(MemoryIdempotencyStore):
+    """Keys shared by every worker through ``idempotency_keys``.
+
+    The memory cache sits in front of the table, so a worker replays
+    responses it has already seen without a query. A claim is a primary-key
+    INSERT: exactly one worker wins it, and the others poll until the
+    response is saved.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, session_factory: async_sessionmaker = AsyncSessionLocal):
+        super().__init__(maxsize, ttl)
+        self.session_factory = session_factory
+        self._next_purge = 0.0
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        response = await super().get(key)
+        if response is not None:
+            return response
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            row = (await db.execute(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_not(None),
+                    IdempotencyKey.expires_at > now,
+                )
+            )).scalars().first()
+        if row is None:
+            return None
+        response = StoredResponse(
+            row.fingerprint,
+            row.status_code,
+            [(name.encode("latin-1"), value.encode("latin-1")) for name, value in row.headers or ()],
+            row.body,
+        )
+        self.responses.set(key, response, ttl=(_utc(row.expires_at) - now).total_seconds())
+        return response
+
+    async def claim(self, key: str, fingerprint: str) -> bool:
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+                await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+            else:
+                # A forgotten response, or the claim of a worker that died mid-request
+                await db.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+                )
+            db.add(IdempotencyKey(
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=settings.idempotency_lock_seconds),
+            ))
+            try:
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                return False
+        return True
+
+    async def save(self, key: str, response: StoredResponse) -> None:
+        await super().save(key, response)
+        async with self.session_factory() as db:
+            await db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    status_code=response.status,
+                    headers=[(name.decode("latin-1"), value.decode("latin-1")) for name, value in response.headers],
+                    body=response.body,
+                    expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.ttl),
+                )
+            )
+            await db.commit()
+
+    async def release(self, key: str) -> None:
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+            )
+            await db.commit()
+
+
+def build_store() -> MemoryIdempotencyStore:
+    store_class = DatabaseIdempotencyStore if settings.idempotency_backend == "database" else MemoryIdempotencyStore
+    return store_class(settings.idempotency_cache_size, settings.idempotency_ttl_seconds)
+
+
+idempotency_store = build_store()
+registry.add_collector(cache_collector("idempotency", idempotency_store.responses))
+
+
+async def _send_json(send, status_code: int, detail: str, headers: Iterable[Tuple[bytes, bytes]] = ()) -> None:
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _caller(scope, headers: Dict[bytes, bytes]) -> bytes:
+    """The credentials a request runs as; ?token= wins over the header, as in get_token"""
+    tokens = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("token")
+    # Starlette, and so FastAPI, reads the last of repeated query parameters
+    if tokens and tokens[-1]:
+        return b"token " + tokens[-1].encode("latin-1")
+    return headers.get(b"authorization", b"")
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware applying Idempotency-Key to the given (method, path) routes"""
+
+    def __init__(
+        self,
+        app,
+        routes: Iterable[Tuple[str, str]],
+        withheld_routes: Iterable[Tuple[str, str]] = (),
+        store: Optional[MemoryIdempotencyStore] = None,
+    ):
+        self.app = app
+        self.withheld_routes = frozenset(withheld_routes)
+        self.routes = frozenset(routes) | self.withheld_routes
+        self.store = store or idempotency_store
+        # Requests running in this worker, by scoped key; duplicates await them
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key.strip() or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = hashlib.sha256(b"\n".join((
+            scope["method"].encode(),
+            scope["path"].encode(),
+            _caller(scope, headers),
+            idempotency_key,
+        ))).hexdigest()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.idempotency_wait_seconds
+        while True:
+            stored = await self.store.get(key)
+            if stored is not None:
+                await self.replay(stored, fingerprint, send)
+                return
+            running = self.inflight.get(key)
+            if running is not None:
+                idempotency_requests.inc("coalesced")
+                # Shielded so a duplicate that disconnects can't cancel the
+                # original's future
+                stored = await asyncio.shield(running)
+                if stored is not None:
+                    await self.replay(stored, fingerprint, send, counted=True)
+                    return
+                # The original failed without a storable response; run it ourselves
+                continue
+
+            future = loop.create_future()
+            self.inflight[key] = future
+            try:
+                claimed = await self.store.claim(key, fingerprint)
+            except BaseException:
+                self._finish(key, future, None)
+                raise
+            if claimed:
+                break
+            # Running in another worker; poll until it saves its response
+            self._finish(key, future, None)
+            if loop.time() >= deadline:
+                idempotency_requests.inc("conflict")
+                await _send_json(
+                    send, 409, "A request with this Idempotency-Key is still in progress",
+                    [(b"retry-after", b"1")],
+                )
+                return
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+        idempotency_requests.inc("executed")
+        await self.execute(scope, receive, send, key, fingerprint, body, future)
+
+    async def execute(self, scope, receive, send, key: str, fingerprint: str, body: bytes, future) -> None:
+        status_code = None
+        response_headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture(message):
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = None
+        try:
+            await self.app(scope, receive_body, capture)
+            if status_code is not None and storable(status_code):
+                stored = StoredResponse(fingerprint, status_code, response_headers, b"".join(chunks))
+                withheld = (scope["method"], scope["path"]) in self.withheld_routes
+                try:
+                    await self.store.save(key, stored.withheld() if withheld else stored)
+                except Exception:
+                    logger.exception("Could not store the response for an Idempotency-Key")
+        finally:
+            if stored is None:
+                try:
+                    await self.store.release(key)
+                except Exception:
+                    logger.exception("Could not release an Idempotency-Key")
+            self._finish(key, future, stored)
+
+    def _finish(self, key: str, future: asyncio.Future, stored: Optional[StoredResponse]) -> None:
+        if self.inflight.get(key) is future:
+            del self.inflight[key]
+        future.set_result(stored)
+
+    async def replay(self, stored: StoredResponse, fingerprint: str, send, counted: bool = False) -> None:
+        if stored.fingerprint != fingerprint:
+            idempotency_requests.inc("mismatch")
+            await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+            return
+        if not counted:
+            idempotency_requests.inc("replayed")
+        if stored.body is None:
+            await _send_json(
+                send, 409, "A request with this Idempotency-Key already completed; its response is not kept",
+                [(REPLAYED_HEADER, b"true")],
+            )
+            return
+        await send({
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": [*stored.headers, (REPLAYED_HEADER, b"true")],
+        })
+        await send({"type": "http.response.body", "body": stored.body})
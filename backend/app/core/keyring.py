@@ -0,0 +1,214 @@
+"""Access-token signing keys and the JWT backends that use them.
+
+``JWT_KEYS`` lists ``kid:secret[:retire_at]`` entries, comma separated. The
+first entry signs new tokens (its kid goes in the token header); the others
+only verify, so tokens signed before a rotation stay valid. ``retire_at``
+(Unix seconds or ISO-8601) is when a verify-only key stops being accepted:
+the rotation time plus the access-token lifetime is enough. Without
+``JWT_KEYS`` the keyring holds ``SECRET_KEY`` as kid ``default``, which is also
+the key for tokens without a kid (issued before keys had ids).
+
+To rotate: prepend a new key and keep the old one with a ``retire_at``.
+
+    JWT_KEYS=2024-06:<new secret>,default:<old secret>:2024-06-01T12:30:00Z
+
+Each key's verifier is built once: a python-jose ``Key`` for the ``jose``
+backend, a keyed HMAC state for the stdlib ``hmac`` backend.
+"""
+import base64
+import binascii
+import calendar
+import hashlib
+import hmac
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import orjson
+from jose import JWTError, jwk, jwt
+
+DEFAULT_KID = "default"
+
+HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    secret: str
+    algorithm: str
+    retire_at: Optional[float] = None
+
+    def retired(self, now: float) -> bool:
+        return self.retire_at is not None and now >= self.retire_at
+
+
+def _parse_time(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class Keyring:
+    def __init__(self, keys: List[SigningKey]):
+        if not keys:
+            raise ValueError("The keyring needs at least one key")
+        self.keys = keys
+        self.signing = keys[0]
+        self.by_kid: Dict[str, SigningKey] = {key.kid: key for key in keys}
+
+    @classmethod
+    def parse(cls, spec: str, default_secret: str, algorithm: str) -> "Keyring":
+        keys = []
+        for entry in filter(None, (item.strip() for item in spec.split(","))):
+            kid, _, rest = entry.partition(":")
+            # ISO timestamps contain colons too, so split the secret off first
+            secret, _, retire_at = rest.partition(":")
+            if not kid or not secret:
+                raise ValueError(f"JWT_KEYS entries look like kid:secret[:retire_at], got {kid!r}")
+            keys.append(SigningKey(kid, secret, algorithm, _parse_time(retire_at) if retire_at else None))
+        if not keys:
+            keys.append(SigningKey(DEFAULT_KID, default_secret, algorithm))
+        if keys[0].retire_at is not None:
+            raise ValueError("The signing key (first in JWT_KEYS) cannot have a retire time")
+        return cls(keys)
+
+    def verification_key(self, kid) -> Optional[SigningKey]:
+        """The key for a token header's ``kid``, unless unknown or retired.
+        ``kid`` comes from an unverified header and may be any JSON value."""
+        if kid is not None and not isinstance(kid, str):
+            return None
+        key = self.by_kid.get(kid or DEFAULT_KID)
+        if key is None or key.retired(time.time()):
+            return None
+        return key
+
+
+def _claims_for_signing(claims: dict) -> dict:
+    # Same conversion python-jose applies: datetimes become Unix seconds
+    return {
+        name: calendar.timegm(value.utctimetuple()) if isinstance(value, datetime) else value
+        for name, value in claims.items()
+    }
+
+
+class JoseBackend:
+    """python-jose, with each key's jose Key object constructed once"""
+
+    name = "jose"
+
+    def __init__(self, keyring: Keyring):
+        self.keyring = keyring
+        self.verifiers = {key.kid: jwk.construct(key.secret, key.algorithm) for key in keyring.keys}
+
+    def encode(self, claims: dict) -> str:
+        key = self.keyring.signing
+        return jwt.encode(claims, key.secret, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    def decode(self, token: str) -> Optional[dict]:
+        try:
+            key = self.keyring.verification_key(jwt.get_unverified_header(token).get("kid"))
+            if key is None:
+                return None
+            return jwt.decode(token, self.verifiers[key.kid], algorithms=[key.algorithm])
+        except JWTError:
+            return None
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _encoded_header(key: SigningKey) -> str:
+    # The same bytes python-jose emits for an ASCII kid, so tokens from
+    # either backend hit the fast path
+    header = {"alg": key.algorithm, "kid": key.kid, "typ": "JWT"}
+    return _b64encode(json.dumps(header, separators=(",", ":"), sort_keys=True).encode()).decode()
+
+
+class HMACBackend:
+    """HS256/384/512 compact JWS on the standard library.
+
+    Each key's HMAC state is keyed once and copied per token, and the encoded
+    header of every key is precomputed, so picking the verifier for a token
+    is one dict lookup on its first segment. Each backend verifies the
+    other's tokens; the encodings differ only for non-ASCII claims, which
+    orjson writes as UTF-8 where python-jose escapes them.
+    """
+
+    name = "hmac"
+
+    def __init__(self, keyring: Keyring):
+        for key in keyring.keys:
+            if key.algorithm not in HMAC_DIGESTS:
+                raise ValueError(f"The hmac JWT backend does not support {key.algorithm}")
+        self.keyring = keyring
+        self.macs = {
+            key.kid: hmac.new(key.secret.encode(), digestmod=HMAC_DIGESTS[key.algorithm])
+            for key in keyring.keys
+        }
+        self.headers = {_encoded_header(key): key.kid for key in keyring.keys}
+        self.signing_header = _encoded_header(keyring.signing)
+
+    def _sign(self, kid: str, signing_input: bytes) -> bytes:
+        mac = self.macs[kid].copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: dict) -> str:
+        payload = _b64encode(orjson.dumps(_claims_for_signing(claims))).decode()
+        signing_input = f"{self.signing_header}.{payload}"
+        signature = _b64encode(self._sign(self.keyring.signing.kid, signing_input.encode())).decode()
+        return f"{signing_input}.{signature}"
+
+    def _key_for_header(self, header_segment: str) -> Optional[SigningKey]:
+        kid = self.headers.get(header_segment)
+        if kid is None:
+            # Not a header we produce; parse it, and refuse algorithm switches
+            header = orjson.loads(_b64decode(header_segment))
+            if not isinstance(header, dict):
+                return None
+            kid = header.get("kid")
+            key = self.keyring.verification_key(kid)
+            if key is None or header.get("alg") != key.algorithm:
+                return None
+            return key
+        return self.keyring.verification_key(kid)
+
+    def decode(self, token: str) -> Optional[dict]:
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            key = self._key_for_header(header_segment)
+            if key is None:
+                return None
+            expected = self._sign(key.kid, f"{header_segment}.{payload_segment}".encode())
+            if not hmac.compare_digest(expected, _b64decode(signature_segment)):
+                return None
+            payload = orjson.loads(_b64decode(payload_segment))
+        except (ValueError, binascii.Error, orjson.JSONDecodeError):
+            return None
+        if not isinstance(payload, dict):
+            return None
+        now = time.time()
+        for claim, valid in (("exp", lambda value: now < value), ("nbf", lambda value: now >= value)):
+            value = payload.get(claim)
+            if value is not None and (not isinstance(value, (int, float)) or not valid(value)):
+                return None
+        return payload
+
+
+TOKEN_BACKENDS = {"jose": JoseBackend, "hmac": HMACBackend}
+
+
+def build_token_backend(backend: str, keyring: Keyring):
+    try:
+        return TOKEN_BACKENDS[backend](keyring)
+    except KeyError:
+        raise ValueError(f"Unknown JWT backend {backend!r}; use one of {', '.join(TOKEN_BACKENDS)}")
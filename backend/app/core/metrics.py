@@ -0,0 +1,466 @@
+import asyncio
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# A collector returns (name, type, help, [(labels, value), ...]) tuples
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+# A rendered family: (name, type, help, [(series name, labels, value), ...]);
+# histograms expand into their _bucket/_sum/_count series
+Series = Tuple[str, Dict[str, str], float]
+Family = Tuple[str, str, str, List[Series]]
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def series(self) -> List[Series]:
+        """Every sample of this metric, as rendered series"""
+
+    def collect(self) -> Family:
+        return self.name, self.type, self.help, self.series()
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def series(self) -> List[Series]:
+        return [
+            (self.name, dict(zip(self.label_names, labels)), value)
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def series(self) -> List[Series]:
+        result = []
+        for labels, values in sorted(self._values.items()):
+            label_dict = dict(zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                result.append((f"{self.name}_bucket", {**label_dict, "le": _format_value(bound)}, cumulative))
+            result.append((f"{self.name}_sum", label_dict, values[-1]))
+            result.append((f"{self.name}_count", label_dict, cumulative))
+        return result
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector) -> Collector:
+        """Register a callable that reports point-in-time values at scrape time"""
+        self._collectors.append(collector)
+        return collector
+
+    def collect(self) -> List[Family]:
+        families = [metric.collect() for metric in self._metrics]
+        # Several collectors may report the same family (e.g. one per cache)
+        collected: Dict[str, Tuple[str, str, List[Series]]] = {}
+        for collector in self._collectors:
+            for name, metric_type, help, samples in collector():
+                collected.setdefault(name, (metric_type, help, []))[2].extend(
+                    (name, labels, value) for labels, value in samples
+                )
+        families.extend((name, metric_type, help, series) for name, (metric_type, help, series) in collected.items())
+        return families
+
+    def render(self) -> str:
+        return render_families(self.collect())
+
+
+def render_families(families: Iterable[Family]) -> str:
+    """Prometheus text exposition of ``families``"""
+    lines: List[str] = []
+    for name, metric_type, help, series in families:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for series_name, labels, value in series:
+            label_text = _format_labels(tuple(labels), tuple(labels.values()))
+            lines.append(f"{series_name}{label_text} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+))
+db_queries_per_request = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("route",), COUNT_BUCKETS
+))
+db_seconds_per_request = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ("route",)
+))
+bcrypt_seconds_per_request = registry.register(Histogram(
+    "http_request_bcrypt_seconds", "Time spent waiting on bcrypt per request", ("route",)
+))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency"
+))
+bcrypt_duration = registry.register(Histogram(
+    "bcrypt_duration_seconds", "bcrypt hash/verify latency including pool queueing", ("operation",)
+))
+
+
+@dataclass
+class RequestStats:
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    bcrypt_seconds: float = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    db_query_duration.observe(elapsed)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement and attribute it to the request being served"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def record_bcrypt(operation: str, seconds: float) -> None:
+    bcrypt_duration.observe(seconds, operation)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.bcrypt_seconds += seconds
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and DB/bcrypt cost per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            current_request_stats.reset(token)
+
+            route = scope.get("route")
+            # Label by path template so ids and tokens don't explode cardinality
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests_total.inc(method, route_path, str(status_code))
+            http_request_duration.observe(elapsed, method, route_path)
+            db_queries_per_request.observe(stats.db_queries, route_path)
+            db_seconds_per_request.observe(stats.db_seconds, route_path)
+            if stats.bcrypt_seconds:
+                bcrypt_seconds_per_request.observe(stats.bcrypt_seconds, route_path)
+
+
+def cache_collector(name: str, cache) -> Collector:
+    """Expose a TTLCache's size and hit/miss/eviction counters"""
+
+    def collect():
+        stats = cache.stats()
+        labels = {"cache": name}
+        yield "cache_entries", "gauge", "Entries currently cached", [(labels, stats["size"])]
+        for field in ("hits", "misses", "evictions", "expirations"):
+            yield f"cache_{field}_total", "counter", f"Cache {field}", [(labels, stats[field])]
+
+    return collect
+
+
+# Counters and histograms of exited workers, folded into one file by the
+# supervisor (see retire_snapshots)
+RETIRED_SNAPSHOT = "retired.json"
+SNAPSHOT_READ_ATTEMPTS = 3
+
+
+class MultiProcessMetrics:
+    """Shares metrics between pre-forked workers (see serve.py).
+
+    Each worker periodically writes its families to ``<directory>/<pid>-<start>.json``
+    (the start time keeps a recycled pid from overwriting an old worker's file);
+    ``render`` merges every worker's snapshot with the live local registry.
+    Counters and histograms are summed, including those of workers that have
+    exited, so totals don't drop when a worker is recycled; the supervisor
+    folds exited workers' snapshots into one file (``retire_snapshots``).
+    Gauges are point-in-time per process: they keep a ``worker`` label and
+    are only reported for live workers.
+    """
+
+    def __init__(self, registry: Registry):
+        self.registry = registry
+        self.directory: Optional[str] = None
+        self.interval = 5.0
+        self.path: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def write(self) -> None:
+        _write_json(self.path, self.registry.collect())
+
+    def snapshots(self) -> Iterable[Tuple[int, bool, List[Family]]]:
+        """(pid, alive, families) for every worker, the current one read live"""
+        yield os.getpid(), True, self.registry.collect()
+        for pid, _, families in read_snapshots(self.directory, exclude=self.path):
+            yield pid, bool(pid) and _pid_alive(pid), families
+
+    def collect(self) -> List[Family]:
+        return merge_families(self.snapshots())
+
+    def render(self) -> str:
+        return render_families(self.collect())
+
+    async def run_forever(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(self.write)
+            except Exception:
+                logger.exception("Writing the metrics snapshot failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, directory: str, interval: float) -> None:
+        if self._task is None:
+            self.directory = directory
+            self.interval = interval
+            self.path = os.path.join(directory, f"{os.getpid()}-{time.time_ns()}.json")
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        """Write a final snapshot so the worker's counters outlive it"""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+            self.write()
+
+
+def merge_families(snapshots: Iterable[Tuple[int, bool, List[Family]]]) -> List[Family]:
+    """Sum (pid, alive, families) snapshots; gauges only of live workers, per worker"""
+    merged: Dict[str, Tuple[str, str, Dict[Tuple, float]]] = {}
+    for pid, alive, families in snapshots:
+        for name, metric_type, help, series in families:
+            if metric_type == "gauge" and not alive:
+                continue
+            values = merged.setdefault(name, (metric_type, help, {}))[2]
+            for series_name, labels, value in series:
+                if metric_type == "gauge":
+                    labels = {**labels, "worker": str(pid)}
+                key = (series_name, tuple(labels.items()))
+                values[key] = values.get(key, 0) + value
+    return [
+        (name, metric_type, help, [
+            (series_name, dict(labels), value) for (series_name, labels), value in values.items()
+        ])
+        for name, (metric_type, help, values) in merged.items()
+    ]
+
+
+def read_snapshots(directory: str, exclude: Optional[str] = None) -> List[Tuple[int, str, List[Family]]]:
+    """(pid, path, families) of every snapshot in ``directory``; pid 0 is the retired one.
+
+    Snapshots named in the retired file's ``folded`` list are already counted
+    there. The directory is listed before the retired file is read, so a
+    snapshot folded in between is either skipped or, if it is gone before it
+    could be read, the whole read starts over.
+    """
+    for _ in range(SNAPSHOT_READ_ATTEMPTS):
+        paths = glob.glob(os.path.join(directory, "*.json"))
+        retired_path = os.path.join(directory, RETIRED_SNAPSHOT)
+        snapshots, folded = [], set()
+        try:
+            with open(retired_path) as f:
+                retired = json.load(f)
+            folded = set(retired["folded"])
+            snapshots.append((0, retired_path, retired["families"]))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError):
+            logger.exception("Ignoring unreadable %s", retired_path)
+        vanished = False
+        for path in paths:
+            name = os.path.basename(path)
+            if path in (exclude, retired_path) or name in folded:
+                continue
+            try:
+                with open(path) as f:
+                    families = json.load(f)
+            except FileNotFoundError:
+                vanished = True
+                break
+            except (OSError, ValueError):
+                continue
+            snapshots.append((int(name.split("-")[0]), path, families))
+        if not vanished:
+            break
+    return snapshots
+
+
+def retire_snapshots(directory: str) -> int:
+    """Fold the snapshots of exited workers into RETIRED_SNAPSHOT and delete them.
+
+    Run by serve.py's supervisor, the only writer of that file, so the
+    directory holds one file per live worker plus one for all retired ones
+    however often workers are recycled. Gauges of the folded workers are
+    dropped; counters and histograms keep adding up. Returns how many
+    snapshots were folded.
+    """
+    snapshots = read_snapshots(directory)
+    dead = [(path, families) for pid, path, families in snapshots if pid and not _pid_alive(pid)]
+    if not dead:
+        return 0
+    retired = [(0, False, families) for pid, _, families in snapshots if pid == 0]
+    families = merge_families([*retired, *((0, False, families) for _, families in dead)])
+    _write_json(
+        os.path.join(directory, RETIRED_SNAPSHOT),
+        {"folded": [os.path.basename(path) for path, _ in dead], "families": families},
+    )
+    for path, _ in dead:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return len(dead)
+
+
+def _write_json(path: str, data) -> None:
+    # Write then rename so a reader never sees a half-written file
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+multiprocess_metrics = MultiProcessMetrics(registry)
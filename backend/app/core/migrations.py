@@ -0,0 +1,163 @@
+"""Versioned schema migrations.
+
+Each module in ``app.migrations`` named ``vNNNN_<name>.py`` declares a
+``VERSION`` and an ``upgrade(conn)`` that runs inside its own transaction.
+Applied versions are recorded in ``schema_migrations``; run them with
+``python migrate.py`` as a deploy step, never from the app's startup.
+"""
+import importlib
+import pkgutil
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+# Any constant works; it only has to be the same for every deployer
+ADVISORY_LOCK_ID = 72_731_011
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def load_migrations(package: str = "app.migrations") -> List[Migration]:
+    """Import every migration module in ``package``, ordered by version"""
+    module = importlib.import_module(package)
+    migrations = []
+    for info in pkgutil.iter_modules(module.__path__):
+        if not info.name.startswith("v"):
+            continue
+        migration_module = importlib.import_module(f"{package}.{info.name}")
+        migrations.append(Migration(
+            version=migration_module.VERSION,
+            name=info.name.split("_", 1)[-1],
+            upgrade=migration_module.upgrade,
+        ))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions in {package}: {versions}")
+    return migrations
+
+
+def applied_versions(conn: Connection) -> set:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return set()
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(conn: Connection, migrations: Optional[Sequence[Migration]] = None) -> List[Migration]:
+    applied = applied_versions(conn)
+    return [m for m in (migrations or load_migrations()) if m.version not in applied]
+
+
+def upgrade(
+    engine: Engine,
+    target: Optional[int] = None,
+    migrations: Optional[Sequence[Migration]] = None,
+    log: Callable[[str], None] = print,
+) -> List[Migration]:
+    """Apply pending migrations up to ``target`` (default: all), one transaction each.
+
+    On PostgreSQL a session advisory lock serialises concurrent deployers, so
+    two rollouts racing each other apply every migration exactly once.
+    """
+    applied: List[Migration] = []
+    with engine.connect() as conn:
+        is_postgres = conn.dialect.name == "postgresql"
+        if is_postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+            conn.commit()
+        try:
+            with conn.begin():
+                schema_migrations.create(conn, checkfirst=True)
+                pending = pending_migrations(conn, migrations)
+            for migration in pending:
+                if target is not None and migration.version > target:
+                    break
+                log(f"Applying {migration.version:04d} {migration.name}")
+                with conn.begin():
+                    migration.upgrade(conn)
+                    conn.execute(schema_migrations.insert().values(
+                        version=migration.version,
+                        name=migration.name,
+                        applied_at=datetime.now(timezone.utc),
+                    ))
+                applied.append(migration)
+        finally:
+            if is_postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+                conn.commit()
+    return applied
+
+
+# Helpers for migration modules. They are idempotent so a migration can run
+# against a database that create_all() already brought partly up to date.
+
+def add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    """``ALTER TABLE ... ADD COLUMN`` unless ``table.column`` already exists"""
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_index(
+    conn: Connection,
+    name: str,
+    table: str,
+    columns: Iterable[str],
+    unique: bool = False,
+    where: Optional[str] = None,
+) -> None:
+    statement = (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+        f"ON {table} ({', '.join(columns)})"
+    )
+    if where:
+        statement += f" WHERE {where}"
+    conn.execute(text(statement))
+
+
+def add_enum_value(conn: Connection, enum_name: str, value: str) -> None:
+    """Extend a native PostgreSQL enum type; other backends store enums as strings.
+
+    Needs PostgreSQL 12+ to run inside the migration's transaction, and the
+    new value cannot be used until that transaction commits.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"ALTER TYPE {enum_name} ADD VALUE IF NOT EXISTS '{value}'"))
+
+
+def month_start(moment: datetime) -> datetime:
+    """The first of ``moment``'s UTC month; naive values are taken as UTC"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return datetime(moment.year, moment.month, 1)
+
+
+def next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def monthly_partition_ddl(table: str, month: datetime) -> str:
+    """``CREATE TABLE ... PARTITION OF`` for the UTC calendar month starting at ``month``.
+
+    Also run by the app (the audit writer creates months as events reach
+    them), so it only returns the statement.
+    """
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table}_y{month:%Y}m{month:%m} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{next_month(month):%Y-%m-%d} 00:00:00+00')"
+    )
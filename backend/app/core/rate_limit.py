@@ -0,0 +1,151 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+
+def _weighted_count(previous: int, current: int, now: float, window: float) -> float:
+    """Sliding-window estimate: the previous window's count decays linearly"""
+    elapsed = (now % window) / window
+    return previous * (1 - elapsed) + current
+
+
+class MemoryRateLimitBackend:
+    """Sliding-window counters kept in-process.
+
+    Each key costs one small list ([window index, current count, previous
+    count]); keys are kept in LRU order and the least recently hit are
+    evicted beyond ``max_keys``, so memory stays bounded under spraying.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    async def hit(self, key: str, window: float, now: float) -> float:
+        index = int(now // window)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = [index, 0, 0]
+            elif counter[0] != index:
+                counter[2] = counter[1] if counter[0] == index - 1 else 0
+                counter[0], counter[1] = index, 0
+            counter[1] += 1
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+                self.evictions += 1
+            return _weighted_count(counter[2], counter[1], now, window)
+
+    async def reset(self, key: str, window: float) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+
+class RedisRateLimitBackend:
+    """Sliding-window counters shared by every worker through Redis"""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        self._redis = redis.from_url(url)
+
+    async def hit(self, key: str, window: float, now: float) -> float:
+        index = int(now // window)
+        current_key = f"ratelimit:{key}:{index}"
+        pipe = self._redis.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, math.ceil(window * 2))
+        pipe.get(f"ratelimit:{key}:{index - 1}")
+        current, _, previous = await pipe.execute()
+        return _weighted_count(int(previous or 0), int(current), now, window)
+
+    async def reset(self, key: str, window: float) -> None:
+        index = int(time.time() // window)
+        await self._redis.delete(f"ratelimit:{key}:{index}", f"ratelimit:{key}:{index - 1}")
+
+
+class SlidingWindowLimiter:
+    def __init__(self, backend, window: float):
+        self.backend = backend
+        self.window = window
+        self.rejected = 0
+
+    async def hit(self, key: str, limit: int) -> bool:
+        """Count one attempt; False once the key is over ``limit`` in the window"""
+        count = await self.backend.hit(key, self.window, time.time())
+        if count > limit:
+            self.rejected += 1
+            return False
+        return True
+
+    async def reset(self, key: str) -> None:
+        await self.backend.reset(key, self.window)
+
+
+def _build_backend():
+    if settings.rate_limit_backend == "redis":
+        return RedisRateLimitBackend(settings.rate_limit_redis_url)
+    return MemoryRateLimitBackend(settings.rate_limit_max_keys)
+
+
+login_limiter = SlidingWindowLimiter(_build_backend(), settings.login_rate_limit_window_seconds)
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+async def enforce_login_rate_limit(request: Request, email: str) -> None:
+    """Reject a login attempt over the per-IP or per-email budget with 429.
+
+    Runs before any DB or bcrypt work, so a credential-stuffing burst costs a
+    dict update per attempt rather than a query plus a hash.
+    """
+    if not settings.login_rate_limit_enabled:
+        return
+
+    for key, limit in (
+        (f"login:ip:{client_ip(request)}", settings.login_rate_limit_per_ip),
+        (f"login:email:{email}", settings.login_rate_limit_per_email),
+    ):
+        if not await login_limiter.hit(key, limit):
+            # The previous window still counts (decaying) after a rollover, so
+            # a full window is the honest upper bound
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, please try again later",
+                headers={"Retry-After": str(math.ceil(login_limiter.window))},
+            )
+
+
+async def reset_login_rate_limit(email: str) -> None:
+    """Clear the per-email budget after a successful login"""
+    if settings.login_rate_limit_enabled:
+        await login_limiter.reset(f"login:email:{email}")
+
+
+@registry.add_collector
+def _rate_limit_metrics():
+    yield "login_rate_limited_total", "counter", "Login attempts rejected with 429", [
+        ({}, login_limiter.rejected)
+    ]
+    backend = login_limiter.backend
+    if isinstance(backend, MemoryRateLimitBackend):
+        yield "rate_limit_keys", "gauge", "Keys tracked by the in-memory limiter", [({}, len(backend))]
+        yield "rate_limit_evictions_total", "counter", "Limiter keys evicted by the size cap", [
+            ({}, backend.evictions)
+        ]
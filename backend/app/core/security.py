@@ -1,8 +1,22 @@
-from datetime import datetime, timedelta
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import JWTError, jwt
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.keyring import Keyring, build_token_backend
+from app.core.metrics import cache_collector, record_bcrypt, registry
+import asyncio
 import bcrypt
+import hashlib
+import time
+
+# Verified payloads keyed by the token's SHA-256 digest
+token_cache = TTLCache(settings.token_cache_size, settings.token_cache_max_ttl_seconds)
+registry.add_collector(cache_collector("tokens", token_cache))
+
+keyring = Keyring.parse(settings.jwt_keys, settings.secret_key, settings.algorithm)
+token_backend = build_token_backend(settings.jwt_backend, keyring)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # bcrypt.checkpw requires bytes
@@ -17,24 +31,124 @@ def get_password_hash(password: str) -> str:
     if isinstance(password, str):
         password = password.encode('utf-8')
     # Generate salt and hash
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
     return bcrypt.hashpw(password, salt).decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with a different work factor than configured"""
+    try:
+        cost = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return cost != settings.bcrypt_rounds
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the bcrypt pool already has bcrypt_max_pending jobs queued"""
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated executor so it never blocks the event loop
+    or Starlette's shared threadpool.
+
+    Jobs beyond ``bcrypt_max_pending`` (running + queued) are shed with
+    PasswordHashingBusy instead of queueing without bound.
+    """
+
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if settings.bcrypt_executor == "process":
+                self._executor = ProcessPoolExecutor(max_workers=settings.bcrypt_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.bcrypt_workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def run(self, operation: str, fn, *args):
+        if self.pending >= settings.bcrypt_max_pending:
+            self.rejected += 1
+            raise PasswordHashingBusy()
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            record_bcrypt(operation, time.perf_counter() - start)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
+
+
+@registry.add_collector
+def _password_hasher_metrics():
+    yield "bcrypt_pending", "gauge", "bcrypt jobs running or queued", [({}, password_hasher.pending)]
+    yield "bcrypt_rejected_total", "counter", "bcrypt jobs shed because the pool was full", [
+        ({}, password_hasher.rejected)
+    ]
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run("hash", get_password_hash, password)
+
+
+_dummy_hash: Optional[str] = None
+
+
+async def verify_dummy_password(plain_password: str) -> bool:
+    """Spend the same bcrypt time as a real verify when the account doesn't exist,
+    so login latency does not reveal which emails are registered"""
+    global _dummy_hash
+    if _dummy_hash is None or password_needs_rehash(_dummy_hash):
+        _dummy_hash = await get_password_hash_async("dummy-password-for-timing")
+    await verify_password_async(plain_password, _dummy_hash)
+    return False
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-    return encoded_jwt
+    return token_backend.encode(to_encode)
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode('utf-8')).digest()
 
 
 def decode_token(token: str) -> dict:
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    key = token_digest(token)
+    payload = token_cache.get(key)
+    if payload is not None:
         return payload
-    except JWTError:
+
+    payload = token_backend.decode(token)
+    if payload is None:
         return None
+
+    # Never serve a cached payload past the token's own expiry
+    exp = payload.get("exp")
+    ttl = exp - time.time() if exp else None
+    token_cache.set(key, payload, ttl=ttl)
+    return payload
@@ -0,0 +1,155 @@
+import functools
+import inspect
+import typing
+from collections.abc import Mapping
+from typing import Any, Callable, List, Optional, Tuple, Type
+
+import orjson
+from fastapi import Response
+from fastapi.dependencies.utils import get_typed_signature
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
+from pydantic import BaseModel
+from sqlalchemy.engine import Row
+
+# UTC datetimes render with "Z", matching pydantic's JSON output
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+# Name under which TrustedResponseRoute receives FastAPI's sub-response
+SUB_RESPONSE_PARAMETER = "trusted_sub_response"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def _nested_model(annotation) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """(model, is_list) for fields typed Model, Optional[Model] or List[Model]"""
+    many = False
+    while True:
+        origin = typing.get_origin(annotation)
+        if origin in (list, List):
+            many = True
+            annotation = typing.get_args(annotation)[0]
+        elif origin is typing.Union:
+            args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+            if len(args) != 1:
+                return None, False
+            annotation = args[0]
+        else:
+            break
+    if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+        return annotation, many
+    return None, False
+
+
+class ModelSerializer:
+    """Turns ORM objects, ``Row``s or mappings into plain dicts shaped like ``model``.
+
+    The field list (and nested serializers) is worked out once per schema, and
+    values are copied as-is: no validation or coercion happens, so only use it
+    for data the app produced itself. orjson renders enums, datetimes and
+    UUIDs natively.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields: List[Tuple[str, Optional["ModelSerializer"], bool]] = []
+        for name, field in model.model_fields.items():
+            nested, many = _nested_model(field.annotation)
+            self.fields.append((name, serializer_for(nested) if nested else None, many))
+
+    def dump(self, obj: Any) -> Optional[dict]:
+        if obj is None:
+            return None
+        if isinstance(obj, BaseModel):
+            return obj.model_dump()
+        if isinstance(obj, Row):
+            obj = obj._mapping
+        get: Callable[[str], Any] = obj.get if isinstance(obj, Mapping) else (
+            lambda name: getattr(obj, name, None)
+        )
+        data = {}
+        for name, nested, many in self.fields:
+            value = get(name)
+            if nested is not None and value is not None:
+                value = [nested.dump(item) for item in value] if many else nested.dump(value)
+            data[name] = value
+        return data
+
+
+@functools.lru_cache(maxsize=None)
+def serializer_for(model: Type[BaseModel]) -> ModelSerializer:
+    return ModelSerializer(model)
+
+
+class TrustedResponseRoute(APIRoute):
+    """APIRoute that renders return values with ModelSerializer + orjson.
+
+    FastAPI normally validates an endpoint's return value against
+    ``response_model`` and then serialises the validated copy; routes of this
+    class skip that pass and build the JSON straight from the ORM rows.
+    ``response_model`` still drives the OpenAPI schema. Opt a router in with
+    ``APIRouter(route_class=TrustedResponseRoute)``.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        response_model = kwargs.get("response_model")
+        if inspect.isclass(response_model) and issubclass(response_model, BaseModel):
+            endpoint = self._wrap(endpoint, serializer_for(response_model))
+        super().__init__(path, endpoint, **kwargs)
+
+    def _render(self, result: Any, serializer: ModelSerializer, sub_response: Response) -> Any:
+        if isinstance(result, Response):
+            return result
+        # Same precedence as FastAPI: a status set on the injected Response
+        # wins over the route's, and its headers and cookies are carried over
+        status_code = sub_response.status_code or self.status_code or 200
+        if is_body_allowed_for_status_code(status_code):
+            response = FastJSONResponse(serializer.dump(result), status_code=status_code)
+        else:
+            response = Response(status_code=status_code)
+        response.headers.raw.extend(sub_response.headers.raw)
+        return response
+
+    def _wrap(self, endpoint: Callable[..., Any], serializer: ModelSerializer) -> Callable[..., Any]:
+        if getattr(endpoint, "trusted_response", False):
+            # Already wrapped: include_router rebuilds routes from their endpoints
+            return endpoint
+        signature = get_typed_signature(endpoint)
+        # FastAPI injects its sub-response into one Response-typed parameter;
+        # use the endpoint's own if it has one, else add a hidden one
+        sub_response_name = next(
+            (name for name, parameter in signature.parameters.items()
+             if inspect.isclass(parameter.annotation) and issubclass(parameter.annotation, Response)),
+            None,
+        )
+        own_parameter = sub_response_name is not None
+        if not own_parameter:
+            sub_response_name = SUB_RESPONSE_PARAMETER
+            signature = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(SUB_RESPONSE_PARAMETER, inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+            ])
+
+        def sub_response(kwargs: dict) -> Response:
+            return kwargs[sub_response_name] if own_parameter else kwargs.pop(sub_response_name)
+
+        # Keep sync endpoints sync so FastAPI still runs them in the threadpool
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def trusted_endpoint(*args, **kwargs):
+                response = sub_response(kwargs)
+                return self._render(await endpoint(*args, **kwargs), serializer, response)
+        else:
+            @functools.wraps(endpoint)
+            def trusted_endpoint(*args, **kwargs):
+                response = sub_response(kwargs)
+                return self._render(endpoint(*args, **kwargs), serializer, response)
+        trusted_endpoint.__signature__ = signature
+        trusted_endpoint.trusted_response = True
+        return trusted_endpoint
@@ -0,0 +1 @@
+"""Schema migrations, applied in VERSION order by app.core.migrations"""
@@ -0,0 +1,60 @@
+"""Initial users and invites tables.
+
+The definitions are frozen copies of the original models rather than imports,
+so later model changes can't alter what this migration creates. Tables that
+already exist (databases created by the old create_all() at startup) are left
+alone.
+"""
+import enum
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Enum, ForeignKey, Integer, MetaData, String, Table, func,
+)
+
+VERSION = 1
+
+metadata = MetaData()
+
+
+class UserRole(str, enum.Enum):
+    ADMIN = "ADMIN"
+    CLIENT = "CLIENT"
+    FEE_EARNER = "FEE_EARNER"
+
+
+class InviteStatus(str, enum.Enum):
+    PENDING = "pending"
+    ACCEPTED = "accepted"
+    REJECTED = "rejected"
+
+
+users = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("full_name", String, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("role", Enum(UserRole), nullable=False),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+invites = Table(
+    "invites",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("invite_token", String, unique=True, index=True),
+    Column("email", String, index=True, nullable=False),
+    Column("role", String, nullable=False),
+    Column("status", Enum(InviteStatus)),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=True),
+    Column("created_by", Integer, ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("expires_at", DateTime(timezone=True), nullable=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
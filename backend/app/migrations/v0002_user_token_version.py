@@ -0,0 +1,8 @@
+"""users.token_version, compared against the "ver" claim to revoke tokens"""
+from app.core.migrations import add_column
+
+VERSION = 2
+
+
+def upgrade(conn):
+    add_column(conn, "users", "token_version", "INTEGER DEFAULT 0 NOT NULL")
@@ -0,0 +1,9 @@
+"""Composite indexes behind the admin invite listing's keyset pagination"""
+from app.core.migrations import create_index
+
+VERSION = 3
+
+
+def upgrade(conn):
+    create_index(conn, "ix_invites_status_id", "invites", ["status", "id"])
+    create_index(conn, "ix_invites_created_by_id", "invites", ["created_by", "id"])
@@ -0,0 +1,10 @@
+"""EXPIRED invite status and the indexes used by the expiry sweeper"""
+from app.core.migrations import add_enum_value, create_index
+
+VERSION = 4
+
+
+def upgrade(conn):
+    add_enum_value(conn, "invitestatus", "EXPIRED")
+    create_index(conn, "ix_invites_status_expires_at", "invites", ["status", "expires_at"])
+    create_index(conn, "ix_invites_pending_email", "invites", ["email"], where="status = 'PENDING'")
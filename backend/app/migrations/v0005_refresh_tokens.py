@@ -0,0 +1,27 @@
+"""refresh_tokens: hashed, rotating refresh tokens grouped into families"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, func
+
+VERSION = 5
+
+metadata = MetaData()
+
+# Referenced by the foreign key only; never created here
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+refresh_tokens = Table(
+    "refresh_tokens",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("token_hash", String(64), unique=True, index=True, nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("family_id", String(36), nullable=False, index=True),
+    Column("token_version", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("expires_at", DateTime(timezone=True), nullable=False),
+    Column("used_at", DateTime(timezone=True), nullable=True),
+    Column("revoked_at", DateTime(timezone=True), nullable=True),
+)
+
+
+def upgrade(conn):
+    refresh_tokens.create(conn, checkfirst=True)
@@ -0,0 +1,36 @@
+"""outbox_messages: side effects (invite emails) committed with the invite"""
+import enum
+
+from sqlalchemy import (
+    JSON, Column, DateTime, Enum, Index, Integer, MetaData, String, Table, Text, func,
+)
+
+VERSION = 6
+
+metadata = MetaData()
+
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+outbox_messages = Table(
+    "outbox_messages",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("kind", String, nullable=False),
+    Column("payload", JSON, nullable=False),
+    Column("status", Enum(OutboxStatus), nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("available_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("sent_at", DateTime(timezone=True), nullable=True),
+    Index("ix_outbox_messages_status_available_at", "status", "available_at"),
+)
+
+
+def upgrade(conn):
+    outbox_messages.create(conn, checkfirst=True)
@@ -0,0 +1,40 @@
+"""Lower-case stored emails and make pending invites unique per email.
+
+Rows that only differ by case or surrounding whitespace are resolved first so
+the unique indexes can be built:
+
+- duplicate users keep the oldest account; the others are deactivated and
+  their email is rewritten to ``duplicate-<id>+<email>`` so nothing is lost
+- duplicate pending invites keep the newest; older ones are marked EXPIRED
+"""
+from sqlalchemy import text
+
+from app.core.migrations import create_index
+
+VERSION = 7
+
+NORMALIZED = "lower(trim(email))"
+
+
+def upgrade(conn):
+    conn.execute(text(f"""
+        UPDATE users
+        SET is_active = FALSE,
+            email = 'duplicate-' || id || '+' || {NORMALIZED}
+        WHERE id NOT IN (SELECT min(id) FROM users GROUP BY {NORMALIZED})
+    """))
+    conn.execute(text(f"UPDATE users SET email = {NORMALIZED} WHERE email <> {NORMALIZED}"))
+
+    conn.execute(text(f"""
+        UPDATE invites
+        SET status = 'EXPIRED'
+        WHERE status = 'PENDING'
+          AND id NOT IN (
+              SELECT max(id) FROM invites WHERE status = 'PENDING' GROUP BY {NORMALIZED}
+          )
+    """))
+    conn.execute(text(f"UPDATE invites SET email = {NORMALIZED} WHERE email <> {NORMALIZED}"))
+
+    # users.email already has a unique index; the pending-invite one becomes unique
+    conn.execute(text("DROP INDEX IF EXISTS ix_invites_pending_email"))
+    create_index(conn, "ix_invites_pending_email", "invites", ["email"], unique=True, where="status = 'PENDING'")
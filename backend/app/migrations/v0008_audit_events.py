@@ -0,0 +1,52 @@
+"""audit_events: append-only audit log, partitioned by month on PostgreSQL"""
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Integer, MetaData, String, Table, text
+
+from app.core.migrations import create_index, month_start, monthly_partition_ddl, next_month
+
+VERSION = 8
+
+metadata = MetaData()
+
+audit_events = Table(
+    "audit_events",
+    metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    Column("occurred_at", DateTime(timezone=True), nullable=False),
+    Column("action", String, nullable=False),
+    Column("actor_id", Integer, nullable=True),
+    Column("target_type", String, nullable=True),
+    Column("target_id", Integer, nullable=True),
+    Column("ip", String, nullable=True),
+    Column("data", JSON, nullable=True),
+)
+
+
+def upgrade(conn):
+    if conn.dialect.name == "postgresql":
+        # The partition key has to be part of the primary key. Months are
+        # created ahead of time here and then by the audit writer; old ones
+        # can be detached or dropped whole.
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS audit_events (
+                id BIGSERIAL,
+                occurred_at TIMESTAMPTZ NOT NULL,
+                action VARCHAR NOT NULL,
+                actor_id INTEGER,
+                target_type VARCHAR,
+                target_id INTEGER,
+                ip VARCHAR,
+                data JSON,
+                PRIMARY KEY (occurred_at, id)
+            ) PARTITION BY RANGE (occurred_at)
+        """))
+        month = month_start(datetime.now(timezone.utc))
+        for partition in (month, next_month(month)):
+            conn.execute(text(monthly_partition_ddl("audit_events", partition)))
+    else:
+        audit_events.create(conn, checkfirst=True)
+
+    create_index(conn, "ix_audit_events_occurred_at_id", "audit_events", ["occurred_at", "id"])
+    create_index(conn, "ix_audit_events_actor_id_occurred_at", "audit_events", ["actor_id", "occurred_at"])
+    create_index(conn, "ix_audit_events_action_occurred_at", "audit_events", ["action", "occurred_at"])
@@ -0,0 +1,22 @@
+"""idempotency_keys: stored responses for Idempotency-Key, shared by workers"""
+from sqlalchemy import JSON, Column, DateTime, Integer, LargeBinary, MetaData, String, Table, func
+
+VERSION = 9
+
+metadata = MetaData()
+
+idempotency_keys = Table(
+    "idempotency_keys",
+    metadata,
+    Column("key", String(64), primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+    Column("status_code", Integer, nullable=True),
+    Column("headers", JSON, nullable=True),
+    Column("body", LargeBinary, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+)
+
+
+def upgrade(conn):
+    idempotency_keys.create(conn, checkfirst=True)
@@ -0,0 +1,21 @@
+"""schema_migrations.applied_at as TIMESTAMPTZ, like every other timestamp"""
+from sqlalchemy import text
+
+VERSION = 10
+
+
+def upgrade(conn):
+    # SQLite has a single datetime type; databases created since this change
+    # already have the TIMESTAMPTZ column
+    if conn.dialect.name != "postgresql":
+        return
+    column_type = conn.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = 'schema_migrations' AND column_name = 'applied_at'"
+    )).scalar()
+    if column_type == "timestamp without time zone":
+        # Earlier rows were written as naive UTC
+        conn.execute(text(
+            "ALTER TABLE schema_migrations ALTER COLUMN applied_at TYPE TIMESTAMPTZ "
+            "USING applied_at AT TIME ZONE 'UTC'"
+        ))
@@ -1,4 +1,8 @@
 from .user import User
 from .invite import Invite
+from .refresh_token import RefreshToken
+from .outbox import OutboxMessage
+from .audit import AuditEvent
+from .idempotency import IdempotencyKey
 
-__all__ = ["User", "Invite"]
+__all__ = ["User", "Invite", "RefreshToken", "OutboxMessage", "AuditEvent", "IdempotencyKey"]
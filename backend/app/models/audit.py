@@ -0,0 +1,35 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, JSON, Index
+from app.core.database import Base
+
+
+class AuditEvent(Base):
+    """Append-only record of a security-relevant action (login, invite sent, ...).
+
+    Rows are written in batches by the audit writer, never by the request
+    that caused them. On PostgreSQL the table is range-partitioned by month
+    on ``occurred_at`` (primary key ``(occurred_at, id)``); elsewhere it is a
+    plain table keyed on ``id``.
+    """
+
+    __tablename__ = "audit_events"
+    __table_args__ = (
+        # Newest-first keyset pages, optionally narrowed to a time range
+        Index("ix_audit_events_occurred_at_id", "occurred_at", "id"),
+        Index("ix_audit_events_actor_id_occurred_at", "actor_id", "occurred_at"),
+        Index("ix_audit_events_action_occurred_at", "action", "occurred_at"),
+    )
+
+    # BIGSERIAL on PostgreSQL; SQLite only autoincrements INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # When the action happened, not when the writer flushed it
+    occurred_at = Column(DateTime(timezone=True), nullable=False)
+    action = Column(String, nullable=False)  # e.g. 'auth.login', 'invite.sent'
+    # No foreign keys: the log outlives the rows it mentions
+    actor_id = Column(Integer, nullable=True)
+    target_type = Column(String, nullable=True)
+    target_id = Column(Integer, nullable=True)
+    ip = Column(String, nullable=True)
+    data = Column(JSON, nullable=True)
+
+    def __repr__(self):
+        return f"<AuditEvent(id={self.id}, action={self.action}, actor_id={self.actor_id})>"
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, LargeBinary
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """Shared Idempotency-Key record (IDEMPOTENCY_BACKEND=database).
+
+    A row is inserted when a request claims its key and gets the response
+    once the request finishes; ``status_code`` is NULL while it is in flight.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    # sha256 hex of the key's scope: method, path, caller and header value
+    key = Column(String(64), primary_key=True)
+    # sha256 hex of the request body, to reject a key reused for another request
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    headers = Column(JSON, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # In flight: when another worker may take the key over; done: when it is forgotten
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(key={self.key}, status_code={self.status_code})>"
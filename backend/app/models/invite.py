@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, Boolean, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Boolean, ForeignKey, Index
+from sqlalchemy.sql import func, text
 from app.core.database import Base
+from datetime import datetime, timezone
 import enum
 import uuid
 
@@ -9,10 +10,29 @@ class InviteStatus(str, enum.Enum):
     PENDING = "pending"
     ACCEPTED = "accepted"
     REJECTED = "rejected"
+    EXPIRED = "expired"
 
 
 class Invite(Base):
     __tablename__ = "invites"
+    __table_args__ = (
+        # Admin listing is keyset-paginated on id (newest first), optionally
+        # narrowed by status or creator. id follows creation order, so
+        # (created_by, id) does the job of a (created_by, created_at) index
+        # and needs no tie-breaker. Expiry scans filter on expires_at
+        Index("ix_invites_status_id", "status", "id"),
+        Index("ix_invites_created_by_id", "created_by", "id"),
+        Index("ix_invites_status_expires_at", "status", "expires_at"),
+        # At most one pending invite per (lower-cased) email. Only pending
+        # invites take part, so with expired ones swept out it stays small
+        Index(
+            "ix_invites_pending_email",
+            "email",
+            unique=True,
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invite_token = Column(String, unique=True, index=True, default=lambda: str(uuid.uuid4()))
@@ -24,5 +44,14 @@ class Invite(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=True)
 
+    def is_expired(self) -> bool:
+        if self.expires_at is None:
+            return False
+        # PostgreSQL hands back aware datetimes, SQLite naive ones
+        now = datetime.now(timezone.utc)
+        if self.expires_at.tzinfo is None:
+            now = now.replace(tzinfo=None)
+        return now > self.expires_at
+
     def __repr__(self):
         return f"<Invite(id={self.id}, email={self.email}, status={self.status})>"
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, Enum, JSON, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+import enum
+
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class OutboxMessage(Base):
+    """Side effect recorded in the same transaction as the change that causes it"""
+
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        # The dispatcher polls for due pending messages in id order
+        Index("ix_outbox_messages_status_available_at", "status", "available_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # e.g. 'invite_email'
+    payload = Column(JSON, nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, kind={self.kind}, status={self.status})>"
@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth import Principal, require_role
+from app.core.database import get_read_db
+from app.core.serialization import FastJSONResponse, TrustedResponseRoute
+from app.models.audit import AuditEvent
+from app.models.user import UserRole
+from app.schemas.user import AuditEventPage
+
+# Responses are built straight from ORM rows, without a validation pass
+router = APIRouter(route_class=TrustedResponseRoute, default_response_class=FastJSONResponse)
+
+get_current_admin_user = require_role(UserRole.ADMIN, "Only admins can read the audit log")
+
+
+def encode_cursor(occurred_at: datetime, event_id: int) -> str:
+    raw = json.dumps({"t": occurred_at.isoformat(), "id": event_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(raw["t"]), int(raw["id"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+@router.get("", response_model=AuditEventPage, tags=["audit"])
+async def list_audit_events(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action: Optional[str] = None,
+    actor_id: Optional[int] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    current_admin: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List audit events newest first, within [since, until) (admin only)
+
+    Pages are keyed on (occurred_at, id), so each page is an index range scan
+    and, on PostgreSQL, only touches the month partitions the range covers.
+    Events reach the table a moment after they happen (they are written in
+    batches), so the newest page can still grow.
+    """
+    query = select(AuditEvent)
+    if since is not None:
+        query = query.where(AuditEvent.occurred_at >= since)
+    if until is not None:
+        query = query.where(AuditEvent.occurred_at < until)
+    if action is not None:
+        query = query.where(AuditEvent.action == action)
+    if actor_id is not None:
+        query = query.where(AuditEvent.actor_id == actor_id)
+    if target_type is not None:
+        query = query.where(AuditEvent.target_type == target_type)
+    if target_id is not None:
+        query = query.where(AuditEvent.target_id == target_id)
+    if cursor:
+        occurred_at, event_id = decode_cursor(cursor)
+        query = query.where(
+            # The plain bound lets the planner prune partitions; the row
+            # comparison breaks ties between events in the same instant
+            AuditEvent.occurred_at <= occurred_at,
+            tuple_(AuditEvent.occurred_at, AuditEvent.id) < (occurred_at, event_id),
+        )
+
+    query = query.order_by(AuditEvent.occurred_at.desc(), AuditEvent.id.desc()).limit(limit + 1)
+    events = list(await db.scalars(query))
+
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_cursor(events[-1].occurred_at, events[-1].id)
+
+    return {"items": events, "next_cursor": next_cursor}
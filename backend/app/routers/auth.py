@@ -1,26 +1,44 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth import UserSnapshot, get_current_user_snapshot, token_claims
+from app.core.database import get_async_db
+from app.core.serialization import FastJSONResponse, TrustedResponseRoute
+from app.core.rate_limit import enforce_login_rate_limit, reset_login_rate_limit
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    verify_password_async,
+    verify_dummy_password,
+    get_password_hash_async,
+    password_needs_rehash,
     create_access_token,
-    decode_token,
 )
 from app.core.config import settings
 from app.models.user import User, UserRole
 from app.models.invite import Invite, InviteStatus
-from app.schemas.user import UserCreate, UserLogin, Token, UserResponse, InviteRequest, InviteResponse
+from app.schemas.user import (
+    UserCreate, UserLogin, Token, UserResponse, InviteRequest, InviteResponse, RefreshRequest,
+    InviteRegistration,
+)
+from app.services.audit import audit_log
+from app.services.events import publish_to_admins
+from app.services.refresh_tokens import issue_refresh_token, rotate_refresh_token
+
+# Responses are built straight from ORM rows, without a validation pass
+router = APIRouter(route_class=TrustedResponseRoute, default_response_class=FastJSONResponse)
 
-router = APIRouter()
+
+async def _get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
 
 @router.post("/register", response_model=UserResponse, tags=["auth"])
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Register a new user with email and password"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = await _get_user_by_email(db, user.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,7 +46,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     new_user = User(
         email=user.email,
         full_name=user.full_name,
@@ -36,17 +54,105 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         role=UserRole.CLIENT,  # Default role is CLIENT
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Registered concurrently; the unique index on users.email caught it
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered",
+        )
+    await db.refresh(new_user)
+    await audit_log.record("auth.register", actor_id=new_user.id, target_type="user", target_id=new_user.id,
+                           request=request)
     return new_user
 
 
+@router.post("/register-with-invite", response_model=Token, tags=["auth"])
+async def register_with_invite(
+    body: InviteRegistration,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Accept an invite: create the account with the invite's email and role and log it in"""
+    # Hash before locking the invite so the lock is only held for the writes
+    hashed_password = await get_password_hash_async(body.password)
+
+    # A concurrent submit of the same token blocks here until this
+    # transaction ends, then sees the invite as no longer pending
+    result = await db.execute(
+        select(Invite).where(Invite.invite_token == body.invite_token).with_for_update()
+    )
+    invite = result.scalars().first()
+
+    if not invite:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invite not found",
+        )
+
+    if invite.status != InviteStatus.PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invite is no longer valid",
+        )
+
+    if invite.is_expired():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invite has expired",
+        )
+
+    new_user = User(
+        email=invite.email,
+        full_name=body.full_name,
+        hashed_password=hashed_password,
+        role=UserRole(invite.role.upper()),
+    )
+    db.add(new_user)
+    try:
+        # INSERT ... RETURNING gives the id (and server defaults) for the
+        # invite and refresh token, which are written with the commit
+        await db.flush()
+        invite.status = InviteStatus.ACCEPTED
+        invite.user_id = new_user.id
+        refresh_token = issue_refresh_token(db, new_user)
+        await db.commit()
+    except IntegrityError:
+        # The email was registered some other way since the invite was sent
+        # (the row lock can't cover that, and SQLite has no FOR UPDATE)
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered",
+        )
+
+    publish_to_admins("invite.accepted", {"id": invite.id, "email": invite.email, "user_id": new_user.id})
+    await audit_log.record("invite.accepted", actor_id=new_user.id, target_type="invite", target_id=invite.id,
+                           request=request, data={"email": invite.email, "role": invite.role})
+    return _token_response(new_user, refresh_token)
+
+
 @router.post("/login", response_model=Token, tags=["auth"])
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(
+    user_credentials: UserLogin,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
     """Login with email and password"""
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    await enforce_login_rate_limit(request, user_credentials.email)
+
+    user = await _get_user_by_email(db, user_credentials.email)
+
+    if not user:
+        password_ok = await verify_dummy_password(user_credentials.password)
+    else:
+        password_ok = await verify_password_async(user_credentials.password, user.hashed_password)
 
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not password_ok:
+        await audit_log.record("auth.login_failed", actor_id=user.id if user else None, request=request,
+                               data={"email": user_credentials.email, "reason": "bad_credentials"})
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -54,15 +160,45 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
         )
 
     if not user.is_active:
+        await audit_log.record("auth.login_failed", actor_id=user.id, request=request,
+                               data={"email": user.email, "reason": "inactive"})
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive",
         )
 
-    # Create access token
+    await reset_login_rate_limit(user_credentials.email)
+
+    # Upgrade hashes made with an outdated work factor while we have the password
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(user_credentials.password)
+
+    refresh_token = issue_refresh_token(db, user)
+    await db.commit()
+    await audit_log.record("auth.login", actor_id=user.id, request=request)
+
+    return _token_response(user, refresh_token)
+
+
+@router.post("/refresh", response_model=Token, tags=["auth"])
+async def refresh(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Exchange a refresh token for a new access token and a rotated refresh token"""
+    rotated = await rotate_refresh_token(db, body.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user, refresh_token = rotated
+    return _token_response(user, refresh_token)
+
+
+def _token_response(user: User, refresh_token: str) -> dict:
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id, "role": user.role},
+        data=token_claims(user),
         expires_delta=access_token_expires,
     )
 
@@ -70,32 +206,11 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
         "access_token": access_token,
         "token_type": "bearer",
         "user": user,
+        "refresh_token": refresh_token,
     }
 
 
 @router.get("/me", response_model=UserResponse, tags=["auth"])
-def get_current_user(token: str = None, db: Session = Depends(get_db)):
+def read_current_user(current_user: UserSnapshot = Depends(get_current_user_snapshot)):
     """Get current user information from token"""
-    if not token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-        )
-
-    payload = decode_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-        )
-
-    user_id = payload.get("user_id")
-    user = db.query(User).filter(User.id == user_id).first()
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found",
-        )
-
-    return user
+    return current_user
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from app.core.auth import Principal, get_current_principal, get_token
+from app.core.config import settings
+from app.core.security import decode_token
+from app.core.serialization import ORJSON_OPTIONS
+from app.services.events import CLOSED, REVOKED, event_hub
+
+router = APIRouter()
+
+# Browsers wait this long before reconnecting a dropped stream
+RECONNECT_MILLISECONDS = 3000
+
+
+def format_event(event_type: str, data: dict) -> bytes:
+    return b"event: " + event_type.encode() + b"\ndata: " + orjson.dumps(data, option=ORJSON_OPTIONS) + b"\n\n"
+
+
+async def stream_events(principal: Principal, expires_at: Optional[float]) -> AsyncIterator[bytes]:
+    """Relay the caller's events until its token expires or is revoked.
+
+    Revocations arrive as user.tokens_revoked events, which end the stream
+    through EventHub.revoke_streams, so an idle stream costs no queries.
+    Tokens revoked with plain SQL only end streams when they expire.
+    """
+    subscription = event_hub.subscribe(principal.user_id, principal.role, principal.token_version)
+    try:
+        yield f"retry: {RECONNECT_MILLISECONDS}\n".encode() + format_event("ready", {})
+        while True:
+            timeout = settings.events_heartbeat_seconds
+            if expires_at is not None:
+                timeout = min(timeout, expires_at - time.time())
+            if timeout <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(subscription.next(), timeout)
+            except asyncio.TimeoutError:
+                # Keeps proxies from timing out an idle stream
+                yield b": keep-alive\n\n"
+                continue
+            if event is CLOSED:
+                return
+            if event is REVOKED:
+                break
+            yield format_event(event.type, event.data)
+        # The token ran out or was revoked: reconnect with a fresh one
+        yield format_event("expired", {})
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+@router.get("/stream", tags=["events"])
+async def event_stream(
+    principal: Principal = Depends(get_current_principal),
+    token: Optional[str] = Depends(get_token),
+):
+    """Server-sent events for the caller: invite changes for admins, dashboard
+    invalidations for everyone. Pass the access token as ?token= (EventSource
+    can't send headers)."""
+    if event_hub.closing or event_hub.connections >= settings.events_max_connections:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event streams, please retry shortly",
+            headers={"Retry-After": "5"},
+        )
+    expires_at = (decode_token(token) or {}).get("exp")
+    return StreamingResponse(
+        stream_events(principal, expires_at),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,57 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import decode_token
-from app.models.user import User, UserRole
+from fastapi import APIRouter, Depends, Request, Response, status
+from app.core.auth import Principal, require_role
+from app.core.database import read_session
+from app.models.user import UserRole
 from app.schemas.user import UserResponse
+from app.services.dashboard import Dashboard, build_dashboard, dashboard_cache, etag_matches
 
 router = APIRouter()
 
+require_client = require_role(
+    UserRole.CLIENT, "Access denied. Only clients can access this page"
+)
+require_fee_earner = require_role(
+    UserRole.FEE_EARNER, "Access denied. Only fee earners can access this page"
+)
 
-def get_current_user(token: str = None, db: Session = Depends(get_db)):
-    """Get current user from token"""
-    if not token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-        )
 
-    payload = decode_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-        )
+async def load_dashboard(request: Request, principal: Principal) -> Dashboard:
+    """The cached dashboard, or one built on a read session opened for the miss"""
+    dashboard = dashboard_cache.get(principal.user_id)
+    if dashboard is None:
+        async with read_session(request) as db:
+            dashboard = await build_dashboard(db, principal)
+    return dashboard
 
-    user_id = payload.get("user_id")
-    user = db.query(User).filter(User.id == user_id).first()
 
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found",
-        )
-
-    return user
+def dashboard_response(request: Request, dashboard: Dashboard) -> Response:
+    """Serve the pre-rendered payload, or 304 if the client already has it"""
+    # no-cache: browsers may keep the payload but must revalidate every poll
+    headers = {"ETag": dashboard.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), dashboard.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(dashboard.body, media_type="application/json", headers=headers)
 
 
 @router.get("/client-home", response_model=UserResponse, tags=["home"])
-def client_home(current_user: User = Depends(get_current_user)):
+async def client_home(
+    request: Request,
+    principal: Principal = Depends(require_client),
+):
     """Client home page - returns client information"""
-    if current_user.role != UserRole.CLIENT:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied. Only clients can access this page",
-        )
-    return current_user
+    return dashboard_response(request, await load_dashboard(request, principal))
 
 
 @router.get("/fee-earner-home", response_model=UserResponse, tags=["home"])
-def fee_earner_home(current_user: User = Depends(get_current_user)):
+async def fee_earner_home(
+    request: Request,
+    principal: Principal = Depends(require_fee_earner),
+):
     """Fee earner home page - returns fee earner information"""
-    if current_user.role != UserRole.FEE_EARNER:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied. Only fee earners can access this page",
-        )
-    return current_user
+    return dashboard_response(request, await load_dashboard(request, principal))
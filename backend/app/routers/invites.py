@@ -1,57 +1,53 @@
-from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import decode_token
+import base64
+import codecs
+import csv
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth import Principal, require_role
+from app.core.config import settings
+from app.core.database import get_async_db, get_read_db
+from app.core.serialization import FastJSONResponse, TrustedResponseRoute
 from app.models.user import User, UserRole
 from app.models.invite import Invite, InviteStatus
-from app.schemas.user import InviteRequest, InviteResponse
+from app.schemas.user import BulkInviteResponse, InvitePage, InviteRequest, InviteResponse
+from app.services.audit import audit_log
+from app.services.events import publish_to_admins
+from app.services.outbox import enqueue, enqueue_many, invite_email_payload, outbox_dispatcher
 
-router = APIRouter()
+# Responses are built straight from ORM rows, without a validation pass
+router = APIRouter(route_class=TrustedResponseRoute, default_response_class=FastJSONResponse)
 
+INVITE_ROLES = ("client", "fee_earner")
+INVITE_LIFETIME = timedelta(days=7)
 
-def get_current_admin_user(token: str = None, db: Session = Depends(get_db)):
-    """Verify that the current user is an admin"""
-    if not token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-        )
 
-    payload = decode_token(token)
-    if not payload or payload.get("role") != UserRole.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can create invites",
-        )
-
-    user_id = payload.get("user_id")
-    user = db.query(User).filter(User.id == user_id).first()
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found",
-        )
-
-    return user
+get_current_admin_user = require_role(UserRole.ADMIN, "Only admins can create invites")
 
 
 @router.post("/send-invite", response_model=InviteResponse, tags=["invites"])
-def send_invite(
+async def send_invite(
     invite_request: InviteRequest,
-    current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    current_admin: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Send an invite to a client or fee earner (admin only)"""
-    if invite_request.role not in ["client", "fee_earner"]:
+    if invite_request.role not in INVITE_ROLES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Role must be 'client' or 'fee_earner'",
         )
 
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == invite_request.email).first()
+    result = await db.execute(select(User.id).where(User.email == invite_request.email))
+    existing_user = result.first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -59,38 +55,291 @@ def send_invite(
         )
 
     # Check if invite already exists and is pending
-    existing_invite = (
-        db.query(Invite)
-        .filter(
+    result = await db.execute(
+        select(Invite.id).where(
             Invite.email == invite_request.email,
             Invite.status == InviteStatus.PENDING,
         )
-        .first()
     )
+    existing_invite = result.first()
     if existing_invite:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Pending invite already exists for this email",
         )
 
-    # Create new invite
+    # Create new invite; its email is queued in the same transaction and
+    # sent by the outbox dispatcher, off the request path
     new_invite = Invite(
         email=invite_request.email,
         role=invite_request.role,
+        invite_token=str(uuid.uuid4()),
         created_by=current_admin.id,
-        expires_at=datetime.utcnow() + timedelta(days=7),
+        expires_at=datetime.now(timezone.utc) + INVITE_LIFETIME,
     )
     db.add(new_invite)
-    db.commit()
-    db.refresh(new_invite)
+    enqueue(db, "invite_email", invite_email_payload(
+        new_invite.email, new_invite.role, new_invite.invite_token, new_invite.expires_at
+    ))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with another admin; the unique pending-invite index caught it
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pending invite already exists for this email",
+        )
+    await db.refresh(new_invite)
+    outbox_dispatcher.notify()
+    publish_to_admins("invite.created", {
+        "id": new_invite.id,
+        "email": new_invite.email,
+        "role": new_invite.role,
+        "created_by": new_invite.created_by,
+    })
+    await audit_log.record("invite.sent", actor_id=current_admin.id, target_type="invite", target_id=new_invite.id,
+                           request=request, data={"email": new_invite.email, "role": new_invite.role})
 
     return new_invite
 
 
+def encode_cursor(invite_id: int) -> str:
+    raw = json.dumps({"id": invite_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return int(json.loads(raw)["id"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+@router.get("", response_model=InvitePage, tags=["invites"])
+async def list_invites(
+    status_filter: Optional[InviteStatus] = Query(None, alias="status"),
+    role: Optional[str] = None,
+    created_by: Optional[int] = None,
+    expires_after: Optional[datetime] = None,
+    expires_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_admin: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List invites newest first with cursor pagination (admin only)
+
+    Pages are keyed on id (assigned in creation order) rather than OFFSET, so
+    every page is an index range scan no matter how deep it is. Ordering by id
+    rather than created_at is deliberate: rows from one bulk insert share a
+    created_at, so a created_at cursor would need id as a tie-breaker anyway.
+    The creator filter is therefore served by (created_by, id), which stands
+    in for (created_by, created_at), and the status filter by (status, id);
+    an expires_at range goes through (status, expires_at). The plans are
+    pinned in tests/test_invites.py.
+    """
+    query = select(Invite)
+    if status_filter is not None:
+        query = query.where(Invite.status == status_filter)
+    if role is not None:
+        query = query.where(Invite.role == role)
+    if created_by is not None:
+        query = query.where(Invite.created_by == created_by)
+    if expires_after is not None:
+        query = query.where(Invite.expires_at >= expires_after)
+    if expires_before is not None:
+        query = query.where(Invite.expires_at < expires_before)
+    if cursor:
+        query = query.where(Invite.id < decode_cursor(cursor))
+
+    query = query.order_by(Invite.id.desc()).limit(limit + 1)
+    invites = list(await db.scalars(query))
+
+    next_cursor = None
+    if len(invites) > limit:
+        invites = invites[:limit]
+        next_cursor = encode_cursor(invites[-1].id)
+
+    return {"items": invites, "next_cursor": next_cursor}
+
+
+async def _iter_body_lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _read_csv_rows(request: Request) -> AsyncIterator[dict]:
+    """Parse a streamed CSV upload; the header row (email,role) is optional"""
+    fields = None
+    async for line in _iter_body_lines(request):
+        if not line.strip():
+            continue
+        values = [value.strip() for value in next(csv.reader([line]))]
+        if fields is None:
+            fields = ["email", "role"]
+            if "email" in (value.lower() for value in values):
+                fields = [value.lower() for value in values]
+                continue
+        yield dict(zip(fields, values))
+
+
+async def _read_bulk_rows(request: Request) -> List[dict]:
+    too_many = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"At most {settings.bulk_invite_max_rows} invites per request",
+    )
+
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        rows = []
+        async for row in _read_csv_rows(request):
+            rows.append(row)
+            if len(rows) > settings.bulk_invite_max_rows:
+                raise too_many
+        return rows
+
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    if isinstance(body, dict):
+        body = body.get("invites")
+    if not isinstance(body, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a list of invites or a CSV upload",
+        )
+    if len(body) > settings.bulk_invite_max_rows:
+        raise too_many
+    return [row if isinstance(row, dict) else {} for row in body]
+
+
+@router.post("/bulk", response_model=BulkInviteResponse, tags=["invites"])
+async def bulk_send_invites(
+    request: Request,
+    current_admin: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Send many invites from a JSON list or a text/csv upload (admin only)
+
+    Existing users and pending invites are resolved with one IN query each and
+    the accepted rows are written with a single multi-row INSERT ... RETURNING.
+    """
+    results = []
+    accepted = {}
+    for row in await _read_bulk_rows(request):
+        try:
+            invite_request = InviteRequest.model_validate(row)
+        except ValidationError as exc:
+            results.append({
+                "email": str(row.get("email", "")),
+                "status": "invalid",
+                "detail": exc.errors()[0]["msg"],
+            })
+            continue
+
+        result = {"email": invite_request.email, "role": invite_request.role}
+        results.append(result)
+        if invite_request.role not in INVITE_ROLES:
+            result.update(status="invalid", detail="Role must be 'client' or 'fee_earner'")
+        elif invite_request.email in accepted:
+            result.update(status="duplicate", detail="Email appears more than once")
+        else:
+            result["status"] = "created"
+            accepted[invite_request.email] = result
+
+    if accepted:
+        existing_users = await db.scalars(select(User.email).where(User.email.in_(accepted)))
+        for email in existing_users:
+            accepted.pop(email).update(
+                status="user_exists", detail="User with this email already exists"
+            )
+
+    if accepted:
+        pending_invites = await db.scalars(
+            select(Invite.email).where(
+                Invite.email.in_(accepted),
+                Invite.status == InviteStatus.PENDING,
+            )
+        )
+        for email in pending_invites:
+            accepted.pop(email).update(
+                status="invite_pending", detail="Pending invite already exists for this email"
+            )
+
+    if accepted:
+        expires_at = datetime.now(timezone.utc) + INVITE_LIFETIME
+        try:
+            inserted = await db.execute(
+                insert(Invite)
+                .values([
+                    {
+                        "invite_token": str(uuid.uuid4()),
+                        "email": email,
+                        "role": result["role"],
+                        "status": InviteStatus.PENDING,
+                        "created_by": current_admin.id,
+                        "expires_at": expires_at,
+                    }
+                    for email, result in accepted.items()
+                ])
+                .returning(
+                    Invite.id,
+                    Invite.email,
+                    Invite.role,
+                    Invite.status,
+                    Invite.invite_token,
+                    Invite.created_at,
+                    Invite.expires_at,
+                    Invite.created_by,
+                )
+            )
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Invites for some of these emails were created concurrently; retry the upload",
+            )
+        for invite in inserted.mappings():
+            accepted[invite["email"]]["invite"] = invite
+        await enqueue_many(db, "invite_email", [
+            invite_email_payload(invite["email"], invite["role"], invite["invite_token"], invite["expires_at"])
+            for invite in (result["invite"] for result in accepted.values())
+        ])
+        await db.commit()
+        outbox_dispatcher.notify()
+        publish_to_admins("invites.bulk_created", {"count": len(accepted), "created_by": current_admin.id})
+        await audit_log.record_many(
+            "invite.sent",
+            [
+                (invite["id"], {"email": invite["email"], "role": invite["role"], "bulk": True})
+                for invite in (result["invite"] for result in accepted.values())
+            ],
+            actor_id=current_admin.id,
+            target_type="invite",
+            request=request,
+        )
+
+    return {"created": len(accepted), "results": results}
+
+
 @router.get("/invite/{invite_token}", response_model=InviteResponse, tags=["invites"])
-def verify_invite(invite_token: str, db: Session = Depends(get_db)):
+async def verify_invite(invite_token: str, db: AsyncSession = Depends(get_read_db)):
     """Verify that an invite token is valid"""
-    invite = db.query(Invite).filter(Invite.invite_token == invite_token).first()
+    result = await db.execute(select(Invite).where(Invite.invite_token == invite_token))
+    invite = result.scalars().first()
 
     if not invite:
         raise HTTPException(
@@ -104,7 +353,9 @@ def verify_invite(invite_token: str, db: Session = Depends(get_db)):
             detail="Invite is no longer valid",
         )
 
-    if invite.expires_at and datetime.utcnow() > invite.expires_at:
+    # The expiry sweeper flips overdue invites to EXPIRED; this covers the gap
+    # between sweeps without another query
+    if invite.is_expired():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invite has expired",
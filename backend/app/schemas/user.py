@@ -1,10 +1,21 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, BeforeValidator, ConfigDict, EmailStr
+from typing import Annotated, Any, List, Optional
 from datetime import datetime
 
 
+def normalize_email(value: Any) -> Any:
+    """Emails are stored and looked up lower-cased, so the plain indexes on
+    ``users.email`` and ``invites.email`` serve case-insensitive matches"""
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+NormalizedEmail = Annotated[EmailStr, BeforeValidator(normalize_email)]
+
+
 class UserBase(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
     full_name: str
 
 
@@ -22,8 +33,15 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class InviteRegistration(BaseModel):
+    """Registration through an invite; the email and role come from the invite"""
+    invite_token: str
+    full_name: str
+    password: str
+
+
 class UserLogin(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
     password: str
 
 
@@ -31,10 +49,15 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: UserResponse
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class InviteRequest(BaseModel):
-    email: EmailStr
+    email: NormalizedEmail
     role: str  # 'client' or 'fee_earner'
 
 
@@ -45,6 +68,44 @@ class InviteResponse(BaseModel):
     status: str
     invite_token: str
     created_at: datetime
+    expires_at: Optional[datetime] = None
+    created_by: Optional[int] = None
 
     class Config:
         from_attributes = True
+
+
+class InvitePage(BaseModel):
+    items: List[InviteResponse]
+    next_cursor: Optional[str] = None
+
+
+class BulkInviteResult(BaseModel):
+    email: str
+    role: Optional[str] = None
+    status: str  # 'created', 'duplicate', 'user_exists', 'invite_pending' or 'invalid'
+    detail: Optional[str] = None
+    invite: Optional[InviteResponse] = None
+
+
+class BulkInviteResponse(BaseModel):
+    created: int
+    results: List[BulkInviteResult]
+
+
+class AuditEventResponse(BaseModel):
+    id: int
+    occurred_at: datetime
+    action: str
+    actor_id: Optional[int] = None
+    target_type: Optional[str] = None
+    target_id: Optional[int] = None
+    ip: Optional[str] = None
+    data: Optional[dict] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AuditEventPage(BaseModel):
+    items: List[AuditEventResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,210 @@
+"""Append-only audit log, written off the request path.
+
+``audit_log.record(...)`` only puts the event in a bounded in-memory buffer.
+A background writer takes whatever has accumulated (up to
+``audit_batch_size`` events) and writes it with one multi-row INSERT. When
+idle, an event is written almost at once; under load the buffer fills while
+a batch is being written, so many requests share one commit. On shutdown the
+writer drains the buffer before the engines are disposed.
+
+Events still buffered when a worker is killed outright are lost. The log is
+an activity trail, not a ledger.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import registry
+from app.core.migrations import month_start, monthly_partition_ddl, next_month
+from app.core.rate_limit import client_ip
+from app.models.audit import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """Bounded buffer of audit events plus the task that writes them in batches"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        buffer_size: int = settings.audit_buffer_size,
+        batch_size: int = settings.audit_batch_size,
+        block: bool = settings.audit_overflow == "block",
+    ):
+        self.session_factory = session_factory
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.block = block
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        # PostgreSQL month partitions known to exist
+        self.partitions: Set[datetime] = set()
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+
+    @property
+    def buffered(self) -> int:
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def record(
+        self,
+        action: str,
+        actor_id: Optional[int] = None,
+        target_type: Optional[str] = None,
+        target_id: Optional[int] = None,
+        request: Optional[Request] = None,
+        data: Optional[dict] = None,
+    ) -> None:
+        """Buffer one event. Never touches the database; a no-op when the
+        writer isn't running (scripts, migrations, AUDIT_ENABLED=false)."""
+        await self.record_many(action, [(target_id, data)], actor_id, target_type, request)
+
+    async def record_many(
+        self,
+        action: str,
+        targets: Iterable[Tuple[Optional[int], Optional[dict]]],
+        actor_id: Optional[int] = None,
+        target_type: Optional[str] = None,
+        request: Optional[Request] = None,
+    ) -> None:
+        """Buffer one event per ``(target_id, data)`` pair, such as every
+        invite of a bulk upload. When the buffer is full and overflow is
+        'block', the whole batch waits at most audit_block_timeout_seconds."""
+        if self.queue is None:
+            return
+        occurred_at = datetime.now(timezone.utc)
+        ip = client_ip(request) if request is not None else None
+        events = [
+            {
+                "occurred_at": occurred_at,
+                "action": action,
+                "actor_id": actor_id,
+                "target_type": target_type,
+                "target_id": target_id,
+                "ip": ip,
+                "data": data,
+            }
+            for target_id, data in targets
+        ]
+        loop = asyncio.get_running_loop()
+        deadline = None
+        for index, event in enumerate(events):
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                if not self.block:
+                    self.dropped += 1
+                    continue
+                if deadline is None:
+                    deadline = loop.time() + settings.audit_block_timeout_seconds
+                try:
+                    await asyncio.wait_for(self.queue.put(event), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    self.dropped += len(events) - index
+                    return
+            self.recorded += 1
+
+    def take(self, limit: int) -> List[dict]:
+        """Up to ``limit`` buffered events, without waiting"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                event = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if event is not None:
+                batch.append(event)
+        return batch
+
+    async def ensure_partitions(self, db: AsyncSession, batch: List[dict]) -> None:
+        """Create the month partitions the batch needs, and next month's ahead of time"""
+        months = {month_start(event["occurred_at"]) for event in batch}
+        months.add(next_month(month_start(datetime.now(timezone.utc))))
+        for month in sorted(months - self.partitions):
+            # IF NOT EXISTS makes this safe to repeat; a concurrent create by
+            # another worker fails this attempt and the retry finds it there
+            await db.execute(text(monthly_partition_ddl(AuditEvent.__tablename__, month)))
+            await db.commit()
+            self.partitions.add(month)
+
+    async def write_batch(self, batch: List[dict]) -> None:
+        attempts = settings.audit_write_attempts
+        for attempt in range(1, attempts + 1):
+            try:
+                async with self.session_factory() as db:
+                    if db.bind.dialect.name == "postgresql":
+                        await self.ensure_partitions(db, batch)
+                    await db.execute(insert(AuditEvent).values(batch))
+                    await db.commit()
+                self.batches += 1
+                self.written += len(batch)
+                return
+            except Exception:
+                self.errors += 1
+                if attempt == attempts:
+                    logger.exception("Dropping %d audit events after %d failed writes", len(batch), attempt)
+                    self.dropped += len(batch)
+                    return
+                logger.warning("Writing %d audit events failed; retrying", len(batch), exc_info=True)
+                await asyncio.sleep(attempt)
+
+    async def run_forever(self) -> None:
+        while True:
+            batch = self.take(self.batch_size)
+            if not batch:
+                if self._stopping.is_set():
+                    return
+                event = await self.queue.get()
+                if event is None:
+                    # stop() woke us up; drain whatever is left, then exit
+                    continue
+                batch = [event] + self.take(self.batch_size - 1)
+            await self.write_batch(batch)
+
+    def start(self) -> None:
+        if self._task is None:
+            self.queue = asyncio.Queue(self.buffer_size)
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        """Write everything buffered, then end the writer"""
+        if self._task is not None:
+            self._stopping.set()
+            try:
+                self.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                # Busy writing full batches; it checks _stopping once drained
+                pass
+            await self._task
+            self._task = None
+            self.queue = None
+
+
+audit_log = AuditLog()
+
+
+@registry.add_collector
+def _audit_metrics():
+    yield "audit_events_recorded_total", "counter", "Audit events buffered", [({}, audit_log.recorded)]
+    yield "audit_events_written_total", "counter", "Audit events written to the database", [
+        ({}, audit_log.written)
+    ]
+    yield "audit_events_dropped_total", "counter", "Audit events dropped (buffer full or writes failing)", [
+        ({}, audit_log.dropped)
+    ]
+    yield "audit_write_errors_total", "counter", "Failed audit batch writes", [({}, audit_log.errors)]
+    yield "audit_buffer_depth", "gauge", "Audit events waiting to be written", [({}, audit_log.buffered)]
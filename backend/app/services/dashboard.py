@@ -0,0 +1,144 @@
+import hashlib
+import itertools
+import threading
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.auth import Principal, get_user_snapshot_or_404, may_cache_user_read
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import cache_collector, registry
+from app.models.user import User, UserRole
+from app.schemas.user import UserResponse
+from app.services.events import Event, event_hub, publish_to_users
+
+# An invalidation only has to outlive the slowest dashboard build it races with
+INVALIDATION_WINDOW_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class Dashboard:
+    """A rendered home payload and its ETag"""
+
+    etag: str
+    body: bytes
+
+
+class DashboardCache:
+    """Rendered dashboards per user, with generation-checked invalidation.
+
+    ``invalidate`` stamps the user with a new generation. A build records the
+    generation it started at and is only stored if the user was not
+    invalidated after that, so a build racing an update can't cache the
+    pre-update payload.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl)
+        self._invalidated_at = TTLCache(maxsize, INVALIDATION_WINDOW_SECONDS)
+        self._generations = itertools.count(1)
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Dashboard]:
+        return self.entries.get(user_id)
+
+    def store(self, user_id: int, dashboard: Dashboard, generation: int) -> None:
+        with self._lock:
+            invalidated_at = self._invalidated_at.get(user_id)
+            if invalidated_at is None or invalidated_at <= generation:
+                self.entries.set(user_id, dashboard)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self.generation = next(self._generations)
+            self._invalidated_at.set(user_id, self.generation)
+            self.entries.pop(user_id)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+dashboard_cache = DashboardCache(settings.dashboard_cache_size, settings.dashboard_cache_ttl_seconds)
+registry.add_collector(cache_collector("dashboards", dashboard_cache.entries))
+
+
+async def build_user_dashboard(db: AsyncSession, principal: Principal) -> BaseModel:
+    return UserResponse.model_validate(await get_user_snapshot_or_404(db, principal.user_id))
+
+
+# Role -> payload builder. Anything a builder reads must invalidate the
+# user's dashboard when it changes (see the listeners below).
+DASHBOARD_BUILDERS: Dict[UserRole, Callable[[AsyncSession, Principal], Awaitable[BaseModel]]] = {
+    UserRole.CLIENT: build_user_dashboard,
+    UserRole.FEE_EARNER: build_user_dashboard,
+}
+
+
+def make_etag(body: bytes) -> str:
+    # Derived from the content, so every worker agrees on it and a rebuild
+    # that renders the same payload still answers 304
+    return f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+async def build_dashboard(db: AsyncSession, principal: Principal) -> Dashboard:
+    """Render the caller's dashboard from ``db`` and cache it.
+
+    Callers look in ``dashboard_cache`` first and only open a session (and
+    call this) on a miss, so a cached dashboard or a 304 costs no DB work.
+    """
+    generation = dashboard_cache.generation
+    payload = await DASHBOARD_BUILDERS[principal.role](db, principal)
+    body = payload.model_dump_json().encode("utf-8")
+    dashboard = Dashboard(etag=make_etag(body), body=body)
+    if may_cache_user_read(db, principal.user_id):
+        dashboard_cache.store(principal.user_id, dashboard, generation)
+    return dashboard
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag``"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in if_none_match.split(","))
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_user_update(mapper, connection, target):
+    dashboard_cache.invalidate(target.id)
+    # Invalidate again once the change is visible to other sessions, so a
+    # build that read the old row between flush and commit is dropped too
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("dashboard_invalidations", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    user_ids = session.info.pop("dashboard_invalidations", ())
+    for user_id in user_ids:
+        dashboard_cache.invalidate(user_id)
+    # Tells the users' open pages to refetch, and the other workers to drop
+    # their cached copies (see _invalidate_on_event)
+    publish_to_users("dashboard.invalidated", list(user_ids))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_invalidations(session):
+    session.info.pop("dashboard_invalidations", None)
+
+
+def _invalidate_on_event(published: Event) -> None:
+    for user_id in published.user_ids:
+        dashboard_cache.invalidate(user_id)
+
+
+event_hub.add_listener("dashboard.invalidated", _invalidate_on_event)
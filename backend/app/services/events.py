@@ -0,0 +1,348 @@
+"""Live events pushed to browsers over server-sent events.
+
+Publishers call ``event_hub.publish`` after their transaction commits. The
+hub hands the event to a transport, which delivers it to the hub of every
+worker (``local``: just this process; ``postgres``: LISTEN/NOTIFY on one
+dedicated connection per worker), and each hub fans it out to the matching
+subscriptions of its own connections.
+
+A subscription is a bounded queue. A client too slow to keep up is not
+allowed to grow it: once the queue is full, further events are dropped and
+the client receives a single ``resync`` event telling it to refetch over
+REST instead.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, List, Optional, Set
+
+import orjson
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.serialization import ORJSON_OPTIONS
+from app.models.user import UserRole
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "app_events"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_BYTES = 7900
+
+
+@dataclass(frozen=True)
+class Event:
+    type: str
+    data: dict = field(default_factory=dict)
+    # Delivered to these users and to every user holding one of these roles
+    user_ids: FrozenSet[int] = frozenset()
+    roles: FrozenSet[str] = frozenset()
+
+    def encode(self) -> bytes:
+        return orjson.dumps({
+            "type": self.type,
+            "data": self.data,
+            "user_ids": sorted(self.user_ids),
+            "roles": sorted(self.roles),
+        }, option=ORJSON_OPTIONS)
+
+    @classmethod
+    def decode(cls, raw) -> "Event":
+        message = orjson.loads(raw)
+        return cls(
+            type=message["type"],
+            data=message["data"],
+            user_ids=frozenset(message["user_ids"]),
+            roles=frozenset(message["roles"]),
+        )
+
+
+RESYNC = Event("resync")
+# Ends a stream: the worker is shutting down and the client should reconnect
+CLOSED = Event("closed")
+# Ends a stream: the token it was opened with has been revoked
+REVOKED = Event("revoked")
+
+
+class Subscription:
+    """One connected client's bounded queue of pending events"""
+
+    def __init__(self, user_id: int, role: UserRole, maxsize: int, token_version: int = 0):
+        self.user_id = user_id
+        self.role = role
+        self.token_version = token_version
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event: Event) -> bool:
+        """Queue ``event`` without waiting; False if it had to be dropped"""
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # Everything queued is stale for this client now; one resync
+            # replaces it
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            return False
+
+    def close(self, reason: Event = CLOSED) -> None:
+        """Drop whatever is queued and end the stream with ``reason``"""
+        self.overflowed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(reason)
+
+    async def next(self) -> Event:
+        event = await self.queue.get()
+        if event is RESYNC:
+            self.overflowed = False
+        return event
+
+
+class LocalTransport:
+    """Delivers to this process only (single worker, tests)"""
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    async def start(self) -> None:
+        pass
+
+    async def publish(self, event: Event) -> None:
+        self.deliver(event)
+
+    async def stop(self) -> None:
+        pass
+
+
+class PostgresTransport:
+    """Delivers to every worker through LISTEN/NOTIFY.
+
+    Each worker keeps one dedicated asyncpg connection outside the pool. It
+    LISTENs on ``CHANNEL`` and also sends the NOTIFYs, so a worker receives
+    its own events through the same path as everyone else's. After the
+    connection is lost and re-established, subscribers are told to resync,
+    since notifications sent in between are gone.
+    """
+
+    def __init__(self, deliver, dsn: str):
+        self.deliver = deliver
+        self.dsn = dsn
+        self.connection = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        # asyncpg runs one statement at a time per connection
+        self._send_lock: Optional[asyncio.Lock] = None
+        self.reconnects = 0
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            self.deliver(Event.decode(payload))
+        except Exception:
+            logger.exception("Dropping malformed event notification")
+
+    async def run_forever(self) -> None:
+        import asyncpg
+
+        delay = 1.0
+        while not self._stopping.is_set():
+            lost = asyncio.Event()
+            try:
+                self.connection = await asyncpg.connect(self.dsn)
+                self.connection.add_termination_listener(lambda connection: lost.set())
+                await self.connection.add_listener(CHANNEL, self._on_notify)
+                if self.reconnects:
+                    self.deliver(RESYNC)
+                delay = 1.0
+                waiters = {asyncio.ensure_future(self._stopping.wait()), asyncio.ensure_future(lost.wait())}
+                try:
+                    await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    for waiter in waiters:
+                        waiter.cancel()
+            except Exception:
+                logger.exception("Event listener connection failed; retrying in %.0fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                if self.connection is not None and not self.connection.is_closed():
+                    await self.connection.close()
+                self.connection = None
+            self.reconnects += 1
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._send_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def publish(self, event: Event) -> None:
+        payload = event.encode()
+        if len(payload) > MAX_NOTIFY_BYTES:
+            # Receivers still learn that something changed and refetch
+            payload = Event(event.type, {"truncated": True}, event.user_ids, event.roles).encode()
+        async with self._send_lock:
+            if self.connection is None:
+                logger.warning("Event %s dropped: listener connection is down", event.type)
+                return
+            await self.connection.execute("SELECT pg_notify($1, $2)", CHANNEL, payload.decode())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+
+def listen_dsn(database_url: str) -> str:
+    """Plain libpq DSN for asyncpg from a SQLAlchemy URL"""
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def transport_name() -> str:
+    """'postgres' or 'local': EVENTS_TRANSPORT with 'auto' resolved"""
+    transport = settings.events_transport
+    if transport == "auto":
+        transport = "postgres" if make_url(settings.database_url).get_backend_name() == "postgresql" else "local"
+    return transport
+
+
+def build_transport(hub: "EventHub"):
+    if transport_name() == "postgres":
+        return PostgresTransport(hub.deliver, listen_dsn(settings.database_url))
+    return LocalTransport(hub.deliver)
+
+
+class EventHub:
+    """In-process fan-out from published events to matching subscriptions"""
+
+    def __init__(self):
+        self.by_user: Dict[int, Set[Subscription]] = {}
+        self.by_role: Dict[str, Set[Subscription]] = {}
+        self.listeners: Dict[str, List[Callable[[Event], None]]] = {}
+        self.transport = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.closing = False
+        self._pending: Set[asyncio.Task] = set()
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    @property
+    def connections(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self.by_user.values())
+
+    def subscribe(self, user_id: int, role: UserRole, token_version: int = 0) -> Subscription:
+        subscription = Subscription(user_id, role, settings.events_queue_size, token_version)
+        self.by_user.setdefault(user_id, set()).add(subscription)
+        self.by_role.setdefault(role.value, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for index, key in ((self.by_user, subscription.user_id), (self.by_role, subscription.role.value)):
+            subscriptions = index.get(key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del index[key]
+
+    def add_listener(self, event_type: str, callback: Callable[[Event], None]) -> None:
+        """Call ``callback`` in every worker for each ``event_type`` event (e.g. to
+        drop per-process cache entries another worker made stale)"""
+        self.listeners.setdefault(event_type, []).append(callback)
+
+    def deliver(self, event: Event) -> None:
+        """Fan ``event`` out to this process's subscriptions (event loop thread only)"""
+        for callback in self.listeners.get(event.type, ()):
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Event listener for %s failed", event.type)
+        if event.type == RESYNC.type:
+            targets = {s for subscriptions in self.by_user.values() for s in subscriptions}
+        else:
+            targets = set()
+            for user_id in event.user_ids:
+                targets |= self.by_user.get(user_id, set())
+            for role in event.roles:
+                targets |= self.by_role.get(role, set())
+        for subscription in targets:
+            if subscription.offer(event):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+
+    def publish(self, event: Event) -> None:
+        """Send ``event`` to every worker; safe to call from any thread or a sync
+        ORM hook. A no-op when the hub isn't running (scripts, migrations)."""
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.published += 1
+        self.loop.call_soon_threadsafe(self._send, event)
+
+    def _send(self, event: Event) -> None:
+        task = self.loop.create_task(self.transport.publish(event))
+        self._pending.add(task)
+        task.add_done_callback(self._sent)
+
+    def _sent(self, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Publishing an event failed", exc_info=task.exception())
+
+    def revoke_streams(self, user_id: int, min_version: int) -> None:
+        """End the user's streams opened with a token older than ``min_version``"""
+        for subscription in self.by_user.get(user_id, ()):
+            if subscription.token_version < min_version:
+                subscription.close(REVOKED)
+
+    def close_streams(self) -> None:
+        """End every open stream so a stopping worker can drain; clients reconnect
+        to another worker"""
+        self.closing = True
+        for subscriptions in self.by_user.values():
+            for subscription in subscriptions:
+                subscription.close()
+
+    async def start(self) -> None:
+        if self.loop is None:
+            self.closing = False
+            self.transport = build_transport(self)
+            self.loop = asyncio.get_running_loop()
+            await self.transport.start()
+
+    async def stop(self) -> None:
+        if self.loop is not None:
+            self.loop = None
+            if self._pending:
+                await asyncio.gather(*self._pending, return_exceptions=True)
+            await self.transport.stop()
+
+
+event_hub = EventHub()
+
+
+def publish_to_admins(event_type: str, data: dict) -> None:
+    event_hub.publish(Event(event_type, data, roles=frozenset({UserRole.ADMIN.value})))
+
+
+def publish_to_users(event_type: str, user_ids: List[int], data: Optional[dict] = None) -> None:
+    if user_ids:
+        event_hub.publish(Event(event_type, data or {}, user_ids=frozenset(user_ids)))
+
+
+@registry.add_collector
+def _event_metrics():
+    yield "events_connections", "gauge", "Open event streams", [({}, event_hub.connections)]
+    yield "events_published_total", "counter", "Events published by this worker", [({}, event_hub.published)]
+    yield "events_delivered_total", "counter", "Events queued to connected clients", [({}, event_hub.delivered)]
+    yield "events_dropped_total", "counter", "Events dropped for clients that fell behind", [
+        ({}, event_hub.dropped)
+    ]
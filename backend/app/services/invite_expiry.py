@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import registry
+from app.models.invite import Invite, InviteStatus
+from app.services.events import publish_to_admins
+
+logger = logging.getLogger(__name__)
+
+
+class InviteExpirySweeper:
+    """Periodically moves overdue PENDING invites to EXPIRED in bounded batches.
+
+    Each batch is a single ``UPDATE ... WHERE id IN (SELECT ... LIMIT n FOR
+    UPDATE SKIP LOCKED)``, so several workers can sweep concurrently without
+    blocking on or double-processing each other's rows.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        batch_size: int = settings.invite_sweep_batch_size,
+        interval: float = settings.invite_sweep_interval_seconds,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+        self.runs = 0
+        self.batches = 0
+        self.expired_total = 0
+        self.errors = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_seconds = 0.0
+
+    async def expire_batch(self, db: AsyncSession) -> List[int]:
+        overdue = (
+            select(Invite.id)
+            .where(
+                Invite.status == InviteStatus.PENDING,
+                Invite.expires_at < datetime.now(timezone.utc),
+            )
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            update(Invite)
+            .where(Invite.id.in_(overdue))
+            .values(status=InviteStatus.EXPIRED)
+            .returning(Invite.id)
+            .execution_options(synchronize_session=False)
+        )
+        expired = list(result.scalars())
+        await db.commit()
+        return expired
+
+    async def sweep(self) -> int:
+        """Expire everything currently overdue; returns the number of invites expired"""
+        start = time.perf_counter()
+        expired_count = 0
+        async with self.session_factory() as db:
+            while True:
+                expired = await self.expire_batch(db)
+                self.batches += 1
+                expired_count += len(expired)
+                if len(expired) < self.batch_size:
+                    break
+
+        self.runs += 1
+        self.expired_total += expired_count
+        self.last_run_at = datetime.now(timezone.utc)
+        self.last_run_seconds = time.perf_counter() - start
+        if expired_count:
+            logger.info("Expired %d invites in %.3fs", expired_count, self.last_run_seconds)
+            publish_to_admins("invite.expired", {"count": expired_count})
+        return expired_count
+
+    async def run_forever(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.sweep()
+            except Exception:
+                self.errors += 1
+                logger.exception("Invite expiry sweep failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        """Let the current sweep finish, then end the loop"""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "batches": self.batches,
+            "expired_total": self.expired_total,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": round(self.last_run_seconds, 6),
+        }
+
+
+invite_sweeper = InviteExpirySweeper()
+
+
+@registry.add_collector
+def _sweeper_metrics():
+    yield "invite_sweeps_total", "counter", "Invite expiry sweeps run", [({}, invite_sweeper.runs)]
+    yield "invites_expired_total", "counter", "Invites moved to EXPIRED", [
+        ({}, invite_sweeper.expired_total)
+    ]
+    yield "invite_sweep_errors_total", "counter", "Failed invite expiry sweeps", [
+        ({}, invite_sweeper.errors)
+    ]
+    yield "invite_sweep_last_duration_seconds", "gauge", "Duration of the last sweep", [
+        ({}, invite_sweeper.last_run_seconds)
+    ]
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import smtplib
+import uuid
+from email.message import EmailMessage
+from typing import List
+
+from app.core.config import settings
+
+
+class MemoryTransport:
+    """Keeps sent messages in a list (tests and local development)"""
+
+    def __init__(self):
+        self.sent: List[EmailMessage] = []
+
+    async def send(self, message: EmailMessage) -> None:
+        self.sent.append(message)
+
+
+class FileTransport:
+    """Writes each message to ``directory`` as an .eml file"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    async def send(self, message: EmailMessage) -> None:
+        path = os.path.join(self.directory, f"{uuid.uuid4()}.eml")
+        await asyncio.to_thread(self._write, path, bytes(message))
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a reader never sees a half-written file
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+
+class SMTPTransport:
+    """Delivers through an SMTP relay; each send runs in a worker thread"""
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "",
+                 starttls: bool = True, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    async def send(self, message: EmailMessage) -> None:
+        await asyncio.to_thread(self._send, message)
+
+    def _send(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+def build_transport():
+    if settings.email_transport == "smtp":
+        return SMTPTransport(
+            settings.smtp_host,
+            settings.smtp_port,
+            settings.smtp_username,
+            settings.smtp_password,
+            settings.smtp_starttls,
+            # Socket timeout: wait_for in the dispatcher can't stop the send thread
+            timeout=settings.outbox_send_timeout_seconds,
+        )
+    if settings.email_transport == "memory":
+        return MemoryTransport()
+    return FileTransport(settings.email_file_dir)
+
+
+def render_invite_email(payload: dict) -> EmailMessage:
+    link = f"{settings.frontend_url}/register?invite_token={payload['invite_token']}"
+    role = payload["role"].replace("_", " ")
+    message = EmailMessage()
+    message["From"] = settings.email_from
+    message["To"] = payload["email"]
+    message["Subject"] = "You're invited to the SaaS Collaboration Platform"
+    message.set_content(
+        f"You have been invited to join as a {role}.\n\n"
+        f"Create your account here:\n{link}\n\n"
+        f"This invite expires on {payload['expires_at']} (UTC).\n"
+    )
+    return message
+
+
+# Outbox message kind -> renderer
+RENDERERS = {
+    "invite_email": render_invite_email,
+}
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import registry
+from app.models.outbox import OutboxMessage, OutboxStatus
+from app.services.mailer import RENDERERS, build_transport
+
+logger = logging.getLogger(__name__)
+
+
+def invite_email_payload(email: str, role: str, invite_token: str, expires_at: Optional[datetime]) -> dict:
+    return {
+        "email": email,
+        "role": role,
+        "invite_token": invite_token,
+        "expires_at": expires_at.strftime("%Y-%m-%d %H:%M") if expires_at else None,
+    }
+
+
+def enqueue(db: AsyncSession, kind: str, payload: dict) -> None:
+    """Add an outbox message to the session; it is sent only if the caller commits"""
+    db.add(OutboxMessage(
+        kind=kind,
+        payload=payload,
+        status=OutboxStatus.PENDING,
+        attempts=0,
+        available_at=datetime.now(timezone.utc),
+    ))
+
+
+async def enqueue_many(db: AsyncSession, kind: str, payloads: List[dict]) -> None:
+    if not payloads:
+        return
+    now = datetime.now(timezone.utc)
+    await db.execute(insert(OutboxMessage), [
+        {
+            "kind": kind,
+            "payload": payload,
+            "status": OutboxStatus.PENDING,
+            "attempts": 0,
+            "available_at": now,
+        }
+        for payload in payloads
+    ])
+
+
+class OutboxDispatcher:
+    """Delivers pending outbox messages in batches through an email transport.
+
+    A batch is claimed with ``UPDATE ... WHERE id IN (SELECT ... FOR UPDATE
+    SKIP LOCKED)`` that also pushes ``available_at`` out by a lease, so
+    dispatchers in several workers never send the same message twice, and a
+    worker that dies mid-batch only delays its messages until the lease ends.
+    Sends run concurrently up to ``concurrency``; failures are retried with
+    exponential backoff and jitter until ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        transport=None,
+        batch_size: int = settings.outbox_batch_size,
+        concurrency: int = settings.outbox_concurrency,
+        interval: float = settings.outbox_poll_interval_seconds,
+    ):
+        self.session_factory = session_factory
+        self.transport = transport or build_transport()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._wake: Optional[asyncio.Event] = None
+
+        self.batches = 0
+        self.sent_total = 0
+        self.retried_total = 0
+        self.failed_total = 0
+        self.errors = 0
+
+    async def claim_batch(self, db: AsyncSession) -> List[Row]:
+        now = datetime.now(timezone.utc)
+        due = (
+            select(OutboxMessage.id)
+            .where(
+                OutboxMessage.status == OutboxStatus.PENDING,
+                OutboxMessage.available_at <= now,
+            )
+            .order_by(OutboxMessage.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(due))
+            .values(
+                attempts=OutboxMessage.attempts + 1,
+                available_at=now + timedelta(seconds=settings.outbox_lease_seconds),
+            )
+            .returning(OutboxMessage.id, OutboxMessage.kind, OutboxMessage.payload, OutboxMessage.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.all()
+        await db.commit()
+        return claimed
+
+    async def deliver(self, message: Row, semaphore: asyncio.Semaphore) -> Optional[str]:
+        """Send one message; returns an error description instead of raising"""
+        async with semaphore:
+            try:
+                email = RENDERERS[message.kind](message.payload)
+                await asyncio.wait_for(self.transport.send(email), settings.outbox_send_timeout_seconds)
+            except Exception as exc:
+                return f"{type(exc).__name__}: {exc}"[:1000]
+        return None
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        delay = min(
+            settings.outbox_retry_max_seconds,
+            settings.outbox_retry_base_seconds * 2 ** (attempts - 1),
+        )
+        return delay * random.uniform(0.5, 1.0)
+
+    async def dispatch_batch(self) -> int:
+        """Claim and deliver one batch; returns the number of messages claimed"""
+        async with self.session_factory() as db:
+            claimed = await self.claim_batch(db)
+            if not claimed:
+                return 0
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            errors = await asyncio.gather(*(self.deliver(message, semaphore) for message in claimed))
+
+            now = datetime.now(timezone.utc)
+            sent_ids = [message.id for message, error in zip(claimed, errors) if error is None]
+            if sent_ids:
+                await db.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id.in_(sent_ids))
+                    .values(status=OutboxStatus.SENT, sent_at=now, last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for message, error in zip(claimed, errors):
+                if error is None:
+                    continue
+                if message.attempts >= settings.outbox_max_attempts:
+                    values = {"status": OutboxStatus.FAILED, "last_error": error}
+                    self.failed_total += 1
+                    logger.error("Outbox message %d failed permanently: %s", message.id, error)
+                else:
+                    values = {
+                        "available_at": now + timedelta(seconds=self.backoff(message.attempts)),
+                        "last_error": error,
+                    }
+                    self.retried_total += 1
+                await db.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id == message.id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+
+        self.batches += 1
+        self.sent_total += len(sent_ids)
+        return len(claimed)
+
+    async def drain(self) -> int:
+        """Dispatch until no due message is left; returns the number claimed"""
+        total = 0
+        while True:
+            claimed = await self.dispatch_batch()
+            total += claimed
+            if claimed < self.batch_size:
+                return total
+
+    def notify(self) -> None:
+        """Wake the dispatcher now instead of at its next poll (e.g. after an enqueue)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run_forever(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                await self.drain()
+            except Exception:
+                self.errors += 1
+                logger.exception("Outbox dispatch failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        """Finish the batch in flight, then end the loop"""
+        if self._task is not None:
+            self._stopping.set()
+            self._wake.set()
+            await self._task
+            self._task = None
+            self._wake = None
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+@registry.add_collector
+def _outbox_metrics():
+    yield "outbox_sent_total", "counter", "Outbox messages delivered", [({}, outbox_dispatcher.sent_total)]
+    yield "outbox_retries_total", "counter", "Outbox deliveries scheduled for retry", [
+        ({}, outbox_dispatcher.retried_total)
+    ]
+    yield "outbox_failed_total", "counter", "Outbox messages that ran out of attempts", [
+        ({}, outbox_dispatcher.failed_total)
+    ]
+    yield "outbox_dispatch_errors_total", "counter", "Dispatcher loop errors", [
+        ({}, outbox_dispatcher.errors)
+    ]
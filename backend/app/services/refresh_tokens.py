@@ -0,0 +1,104 @@
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import Counter, registry
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+refresh_tokens_total = registry.register(Counter(
+    "refresh_tokens_total", "Refresh attempts by outcome", ("outcome",)
+))
+
+
+def refresh_token_hash(token: str) -> str:
+    """SHA-256 is enough here: the tokens are 256-bit random, not guessable passwords"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def issue_refresh_token(db: AsyncSession, user: User, family_id: Optional[str] = None) -> str:
+    """Add a new refresh token for ``user`` to the session and return it (caller commits)"""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        token_hash=refresh_token_hash(token),
+        user_id=user.id,
+        family_id=family_id or str(uuid.uuid4()),
+        token_version=user.token_version or 0,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days),
+    ))
+    return token
+
+
+async def revoke_family(db: AsyncSession, family_id: str) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Optional[Tuple[User, str]]:
+    """Spend ``token`` and return its user with a replacement, or None if it is not valid.
+
+    The token is claimed with a single conditional UPDATE, so of two requests
+    racing with the same token exactly one wins. Presenting a token that was
+    already spent means it leaked (or the client replayed it): the whole
+    family is revoked, logging out both the thief and the legitimate client.
+    """
+    digest = refresh_token_hash(token)
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == digest,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(used_at=now)
+        .returning(RefreshToken.user_id, RefreshToken.family_id, RefreshToken.token_version)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = result.first()
+
+    if claimed is None:
+        spent = await db.execute(
+            select(RefreshToken.family_id).where(
+                RefreshToken.token_hash == digest,
+                RefreshToken.used_at.is_not(None),
+                RefreshToken.revoked_at.is_(None),
+            )
+        )
+        family_id = spent.scalar()
+        if family_id is not None:
+            logger.warning("Refresh token reuse detected; revoking family %s", family_id)
+            await revoke_family(db, family_id)
+            await db.commit()
+            refresh_tokens_total.inc("reused")
+        else:
+            refresh_tokens_total.inc("invalid")
+        return None
+
+    user = await db.get(User, claimed.user_id)
+    # Deactivation and revoke_user_tokens() bump token_version; refresh
+    # tokens issued before that are retired along with the access tokens
+    if user is None or not user.is_active or claimed.token_version < (user.token_version or 0):
+        await revoke_family(db, claimed.family_id)
+        await db.commit()
+        refresh_tokens_total.inc("revoked")
+        return None
+
+    new_token = issue_refresh_token(db, user, family_id=claimed.family_id)
+    await db.commit()
+    refresh_tokens_total.inc("rotated")
+    return user, new_token
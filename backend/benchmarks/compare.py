@@ -0,0 +1,63 @@
+"""Compare two benchmark reports and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.15
+
+Exits with status 1 when any latency metric (``*_ms``) grew, or any
+throughput metric (``rps``) dropped, by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+
+def flatten(results: dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, float(value)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> Dict[str, dict]:
+    before = dict(flatten(baseline["results"]))
+    after = dict(flatten(candidate["results"]))
+    report = {}
+    for path in sorted(before.keys() & after.keys()):
+        metric = path.rsplit(".", 1)[-1]
+        if not (metric.endswith("_ms") or metric == "rps") or not before[path]:
+            continue
+        change = (after[path] - before[path]) / before[path]
+        worse = change > threshold if metric.endswith("_ms") else change < -threshold
+        report[path] = {
+            "baseline": before[path],
+            "candidate": after[path],
+            "change": round(change, 4),
+            "regression": worse,
+        }
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative change tolerated before flagging (default 0.15)")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    report = compare(baseline, candidate, args.threshold)
+    for path, row in report.items():
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{path:60} {row['baseline']:>12.3f} {row['candidate']:>12.3f} {row['change']:>+8.1%} {flag}")
+    return 1 if any(row["regression"] for row in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,463 @@
+"""Load tests and micro-benchmarks for the auth and invite hot paths.
+
+Runs the real FastAPI app from main.py through an in-process ASGI client
+(httpx) against a throwaway SQLite file, or the database in
+BENCH_DATABASE_URL, and writes machine-readable JSON:
+
+    cd backend
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --scenarios login,invites --invite-sizes 1000,1000000
+    python -m benchmarks.compare baseline.json bench.json
+
+The target database is wiped between scenarios; never point it at real data.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench-")
+os.environ["DATABASE_URL"] = os.environ.get(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("INVITE_SWEEP_ENABLED", "false")
+os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("EMAIL_TRANSPORT", "memory")
+
+import httpx  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from app.core.auth import token_versions, user_cache  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core import database  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.core.security import get_password_hash, token_cache  # noqa: E402
+from app.models.invite import Invite, InviteStatus  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+
+SCENARIOS = ("startup", "login", "polling", "invites", "serialization", "tokens")
+PASSWORD = "bench-password"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def measure(
+    request: Callable[[int], Awaitable[httpx.Response]], total: int, concurrency: int
+) -> dict:
+    """Issue ``total`` requests from ``concurrency`` concurrent callers"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await request(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def reset_database() -> None:
+    engine = database.engine
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # Ids are reused after a reset, so nothing cached may survive it
+    token_cache.clear()
+    user_cache.clear()
+    token_versions.clear()
+
+
+def create_user(email: str, role: UserRole) -> int:
+    with database.engine.begin() as conn:
+        result = conn.execute(
+            User.__table__.insert().returning(User.id),
+            {
+                "email": email,
+                "full_name": email.split("@")[0],
+                "hashed_password": get_password_hash(PASSWORD),
+                "role": role,
+                "is_active": True,
+                "token_version": 0,
+            },
+        )
+        return result.scalar_one()
+
+
+def seed_invites(count: int, created_by: int, chunk: int = 10000) -> List[str]:
+    """Insert ``count`` pending invites and return a sample of their tokens"""
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    sample: List[str] = []
+    with database.engine.begin() as conn:
+        for offset in range(0, count, chunk):
+            rows = [
+                {
+                    "invite_token": str(uuid.uuid4()),
+                    "email": f"seed{offset + i}@bench.example.com",
+                    "role": "client",
+                    "status": InviteStatus.PENDING,
+                    "created_by": created_by,
+                    "expires_at": expires_at,
+                }
+                for i in range(min(chunk, count - offset))
+            ]
+            conn.execute(Invite.__table__.insert(), rows)
+            sample.extend(row["invite_token"] for row in rows[:100])
+    return sample
+
+
+async def login_token(client: httpx.AsyncClient, email: str) -> str:
+    response = await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+STARTUP_CODE = """\
+import asyncio, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+async def cycle():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+asyncio.run(cycle())
+print(imported - start, time.perf_counter() - start)
+"""
+
+# What every worker paid on boot before migrations moved to a deploy step:
+# connect, reflect and run create_all() against an up-to-date schema
+LEGACY_DDL_CODE = """\
+import time
+from app.core import database
+import app.models
+start = time.perf_counter()
+database.init_engines(use_async=False)
+database.Base.metadata.create_all(bind=database.engine)
+print(time.perf_counter() - start)
+"""
+
+
+def run_timed(code: str) -> List[float]:
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    return [float(value) for value in output]
+
+
+def bench_startup(args) -> dict:
+    """Wall time to import main and run the app's startup/shutdown in a fresh interpreter"""
+    reset_database()
+    imports, totals, legacy_ddl = [], [], []
+    for _ in range(args.startup_runs):
+        imported, total = run_timed(STARTUP_CODE)[-2:]
+        imports.append(imported)
+        totals.append(total)
+        legacy_ddl.append(run_timed(LEGACY_DDL_CODE)[-1])
+    startup_ms = statistics.median(totals) * 1000
+    legacy_ms = statistics.median(legacy_ddl) * 1000
+    return {
+        "runs": args.startup_runs,
+        "import_ms": round(statistics.median(imports) * 1000, 2),
+        "startup_ms": round(startup_ms, 2),
+        "legacy_ddl_ms": round(legacy_ms, 2),
+        "legacy_startup_ms": round(startup_ms + legacy_ms, 2),
+    }
+
+
+async def bench_login(client: httpx.AsyncClient, args) -> dict:
+    results = {}
+    original_rounds = settings.bcrypt_rounds
+    try:
+        for cost in args.bcrypt_costs:
+            settings.bcrypt_rounds = cost
+            reset_database()
+            create_user("login@bench.example.com", UserRole.CLIENT)
+            payload = {"email": "login@bench.example.com", "password": PASSWORD}
+            results[f"cost_{cost}"] = await measure(
+                lambda i: client.post("/api/auth/login", json=payload),
+                args.login_requests,
+                args.concurrency,
+            )
+    finally:
+        settings.bcrypt_rounds = original_rounds
+    return results
+
+
+async def bench_polling(client: httpx.AsyncClient, args) -> dict:
+    reset_database()
+    emails = [f"poller{i}@bench.example.com" for i in range(args.concurrency)]
+    for email in emails:
+        create_user(email, UserRole.CLIENT)
+    tokens = [await login_token(client, email) for email in emails]
+
+    results = {}
+    for path in ("/api/auth/me", "/api/client-home"):
+        results[path] = await measure(
+            lambda i: client.get(path, headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"}),
+            args.poll_requests,
+            args.concurrency,
+        )
+
+    # Dashboards that send back their ETag, as a polling client would
+    etags = []
+    for token in tokens:
+        response = await client.get("/api/client-home", headers={"Authorization": f"Bearer {token}"})
+        etags.append(response.headers.get("etag", ""))
+    results["/api/client-home (If-None-Match)"] = await measure(
+        lambda i: client.get("/api/client-home", headers={
+            "Authorization": f"Bearer {tokens[i % len(tokens)]}",
+            "If-None-Match": etags[i % len(tokens)],
+        }),
+        args.poll_requests,
+        args.concurrency,
+    )
+    return results
+
+
+async def bench_invites(client: httpx.AsyncClient, args) -> dict:
+    results = {}
+    for size in args.invite_sizes:
+        reset_database()
+        admin_id = create_user("admin@bench.example.com", UserRole.ADMIN)
+        seed_start = time.perf_counter()
+        sample = seed_invites(size, admin_id)
+        seed_seconds = time.perf_counter() - seed_start
+        token = await login_token(client, "admin@bench.example.com")
+        headers = {"Authorization": f"Bearer {token}"}
+
+        send = await measure(
+            lambda i: client.post(
+                "/api/invites/send-invite",
+                json={"email": f"new{size}-{i}@bench.example.com", "role": "client"},
+                headers=headers,
+            ),
+            args.invite_requests,
+            args.concurrency,
+        )
+        verify = await measure(
+            lambda i: client.get(f"/api/invites/invite/{sample[i % len(sample)]}"),
+            args.invite_requests,
+            args.concurrency,
+        )
+        list_page = await measure(
+            lambda i: client.get("/api/invites", params={"limit": 200}, headers=headers),
+            args.invite_requests,
+            args.concurrency,
+        )
+        results[f"rows_{size}"] = {
+            "seed_seconds": round(seed_seconds, 3),
+            "send_invite": send,
+            "verify_invite": verify,
+            "list_invites": list_page,
+        }
+    return results
+
+
+def bench_serialization(args) -> dict:
+    """Per-response cost of rendering a 200-row invite page, validated vs trusted"""
+    from fastapi.encoders import jsonable_encoder
+    from sqlalchemy.orm import Session
+
+    from app.core.serialization import FastJSONResponse, serializer_for
+    from app.schemas.user import InvitePage
+
+    reset_database()
+    admin_id = create_user("admin@bench.example.com", UserRole.ADMIN)
+    seed_invites(200, admin_id)
+    with Session(database.engine) as session:
+        invites = session.query(Invite).order_by(Invite.id.desc()).all()
+    page = {"items": invites, "next_cursor": "eyJpZCI6IDF9"}
+    trusted = serializer_for(InvitePage)
+
+    def validated():
+        # What FastAPI does with a response_model: validate, then encode
+        body = jsonable_encoder(InvitePage.model_validate(page))
+        return json.dumps(body).encode()
+
+    def fast():
+        return FastJSONResponse(None).render(trusted.dump(page))
+
+    results = {}
+    for name, render in (("validated_json", validated), ("trusted_orjson", fast)):
+        samples = []
+        for _ in range(args.serialization_runs):
+            start = time.perf_counter()
+            render()
+            samples.append(time.perf_counter() - start)
+        results[name] = {
+            "runs": args.serialization_runs,
+            "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+            "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        }
+    results["speedup"] = round(results["validated_json"]["mean_ms"] / results["trusted_orjson"]["mean_ms"], 2)
+    return results
+
+
+def bench_tokens(args) -> dict:
+    """Access-token encode and decode throughput per JWT backend, token cache bypassed"""
+    from jose import jwt
+
+    from app.core.keyring import TOKEN_BACKENDS, Keyring, build_token_backend
+
+    # A signing key plus one verify-only key still in its grace period
+    keyring = Keyring.parse("current:bench-current-key,previous:bench-previous-key", "", settings.algorithm)
+    claims = {"sub": "1", "ver": 0, "exp": datetime.now(timezone.utc) + timedelta(hours=1)}
+
+    class Unprepared:
+        """The pre-keyring path: jose with raw key material on every call"""
+
+        def encode(self, claims):
+            return jwt.encode(claims, keyring.signing.secret, algorithm=keyring.signing.algorithm)
+
+        def decode(self, token):
+            return jwt.decode(token, keyring.signing.secret, algorithms=[keyring.signing.algorithm])
+
+    backends = {"jose_unprepared": Unprepared()}
+    backends.update((name, build_token_backend(name, keyring)) for name in TOKEN_BACKENDS)
+
+    results = {}
+    for name, backend in backends.items():
+        token = backend.encode(claims)
+        assert backend.decode(token)["sub"] == "1"
+        results[name] = {}
+        for operation, call, arg in (("encode", backend.encode, claims), ("decode", backend.decode, token)):
+            start = time.perf_counter()
+            for _ in range(args.token_runs):
+                call(arg)
+            elapsed = time.perf_counter() - start
+            results[name][operation] = {
+                "runs": args.token_runs,
+                "mean_ms": round(elapsed / args.token_runs * 1000, 5),
+                "rps": round(args.token_runs / elapsed, 1),
+            }
+    for name in TOKEN_BACKENDS:
+        results[name]["decode_speedup"] = round(
+            results["jose_unprepared"]["decode"]["mean_ms"] / results[name]["decode"]["mean_ms"], 2
+        )
+    return results
+
+
+async def run_http_scenarios(args) -> Dict[str, dict]:
+    import main
+
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if "login" in args.scenarios:
+                results["login"] = await bench_login(client, args)
+            if "polling" in args.scenarios:
+                results["polling"] = await bench_polling(client, args)
+            if "invites" in args.scenarios:
+                results["invites"] = await bench_invites(client, args)
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bcrypt-costs", type=int_list, default=[4, 8, 10, 12])
+    parser.add_argument("--login-requests", type=int, default=64)
+    parser.add_argument("--poll-requests", type=int, default=2000)
+    parser.add_argument("--invite-sizes", type=int_list, default=[1000, 10000, 100000])
+    parser.add_argument("--invite-requests", type=int, default=200)
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--serialization-runs", type=int, default=200)
+    parser.add_argument("--token-runs", type=int, default=20000)
+    args = parser.parse_args(argv)
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    database.init_engines(use_async=False)
+    results = {}
+    if "startup" in args.scenarios:
+        results["startup"] = bench_startup(args)
+    if "serialization" in args.scenarios:
+        results["serialization"] = bench_serialization(args)
+    if "tokens" in args.scenarios:
+        results["tokens"] = bench_tokens(args)
+    results.update(asyncio.run(run_http_scenarios(args)))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": make_url(settings.database_url).get_backend_name(),
+            "args": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 import sys
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal, engine
+from app.core.database import SessionLocal, init_engines
 from app.models.user import User, UserRole
 from app.core.security import get_password_hash
+from app.schemas.user import normalize_email
 
-def debug_and_create_admin():
+def debug_and_create_admin(admin_email: str = "admin@example.com"):
+    # Stored the way the API looks emails up, or the admin can't log in
+    admin_email = normalize_email(admin_email)
+    init_engines(use_async=False)
     db = SessionLocal()
     try:
         # Debug: Check accepted enum values in Postgres
@@ -27,7 +31,6 @@ def debug_and_create_admin():
         print(f"Using role value: {admin_role_value}")
         
         # Check if admin exists
-        admin_email = "admin@example.com"
         # We might need to cast to run the query if python enum mismatches
         # For now, let's try standard ORM
         
@@ -79,4 +82,4 @@ def debug_and_create_admin():
         db.close()
 
 if __name__ == "__main__":
-    debug_and_create_admin()
+    debug_and_create_admin(*sys.argv[1:2])
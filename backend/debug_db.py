@@ -1,8 +1,9 @@
 import sys
 from sqlalchemy import text
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, init_engines
 
 def debug_db():
+    init_engines(use_async=False)
     db = SessionLocal()
     try:
         print("--- Inspecting 'users' table raw data ---")
@@ -1,19 +1,74 @@
-from fastapi import FastAPI
+import hmac
+import ipaddress
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from anyio import to_thread
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
-from app.core.database import engine, Base
-from app.routers import auth, invites, home
+from app.core.consistency import LAST_WRITE_HEADER, WriteMarkerMiddleware
+from app.core.database import dispose_engines, init_engines, pool_stats, read_replicas, warm_up_pool
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.metrics import MetricsMiddleware, multiprocess_metrics, registry
+from app.core.security import PasswordHashingBusy, password_hasher
+from app.routers import audit, auth, events, invites, home
+from app.services.audit import audit_log
+from app.services.events import event_hub
+from app.services.invite_expiry import invite_sweeper
+from app.services.outbox import outbox_dispatcher
 from app.models import user, invite
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes are applied by `python migrate.py`, never at startup
+    init_engines(sync=False)
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    if settings.metrics_dir:
+        multiprocess_metrics.start(settings.metrics_dir, settings.metrics_snapshot_interval_seconds)
+    if settings.db_pool_warmup:
+        await warm_up_pool(settings.db_pool_warmup)
+    read_replicas.start()
+    await event_hub.start()
+    if settings.audit_enabled:
+        audit_log.start()
+    if settings.invite_sweep_enabled:
+        invite_sweeper.start()
+    if settings.outbox_dispatch_enabled:
+        outbox_dispatcher.start()
+    yield
+    await outbox_dispatcher.stop()
+    await invite_sweeper.stop()
+    # Write whatever the last requests buffered
+    await audit_log.stop()
+    await event_hub.stop()
+    password_hasher.shutdown()
+    await dispose_engines()
+    await multiprocess_metrics.stop()
+
 
 app = FastAPI(
     title="SaaS Collaboration Platform",
     description="A platform for clients and fee earners to collaborate",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Replays the first response to retries carrying an Idempotency-Key. Added
+# first, so it sits inside CORS and replays get this request's CORS headers
+if settings.idempotency_enabled:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        routes=[
+            ("POST", "/api/auth/register"),
+            ("POST", "/api/invites/send-invite"),
+        ],
+        # These responses carry access and refresh tokens; keep them out of the store
+        withheld_routes=[("POST", "/api/auth/register-with-invite")],
+    )
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -21,12 +76,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", LAST_WRITE_HEADER, "Idempotent-Replayed"],
 )
 
+# Per-route latency and DB/bcrypt cost, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Stamps responses of requests that committed, for read-your-writes routing
+app.add_middleware(WriteMarkerMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(invites.router, prefix="/api/invites", tags=["invites"])
 app.include_router(home.router, prefix="/api", tags=["home"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(audit.router, prefix="/api/audit", tags=["audit"])
+
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    """Shed login/register load when the bcrypt pool is saturated"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
 
 
 @app.get("/health", tags=["health"])
@@ -35,6 +109,43 @@ def health_check():
     return {"status": "healthy"}
 
 
+@lru_cache(maxsize=4)
+def _internal_networks(spec: str) -> tuple:
+    return tuple(ipaddress.ip_network(value.strip()) for value in spec.split(",") if value.strip())
+
+
+def require_internal(request: Request) -> None:
+    """Limit operational endpoints to internal networks or the metrics token"""
+    if settings.metrics_token:
+        scheme, _, value = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(value, settings.metrics_token):
+            return
+    try:
+        address = ipaddress.ip_address(request.client.host) if request.client else None
+    except ValueError:
+        address = None
+    if address is None or not any(address in network for network in _internal_networks(settings.internal_networks)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not available from this address",
+        )
+
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse, dependencies=[Depends(require_internal)])
+def metrics():
+    """Prometheus text exposition of request, DB, bcrypt and cache metrics"""
+    # Under serve.py, the merged view of every worker
+    text = multiprocess_metrics.render() if multiprocess_metrics.enabled else registry.render()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health/db-pool", tags=["health"], dependencies=[Depends(require_internal)])
+def db_pool_stats():
+    """Connection pool occupancy and checkout wait times"""
+    return pool_stats()
+
+
+# Development server with auto-reload; production runs `python serve.py`
 if __name__ == "__main__":
     import uvicorn
 
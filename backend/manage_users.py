@@ -0,0 +1,359 @@
+"""Bulk import and export of users.
+
+    python manage_users.py import users.csv            # CSV with a header row
+    python manage_users.py import users.jsonl --update # overwrite existing accounts
+    python manage_users.py export users -o users.jsonl
+    python manage_users.py export invites --format csv > invites.csv
+
+Import rows need ``email`` and ``full_name``, and either ``password`` (hashed
+here, in parallel across a process pool) or ``hashed_password`` (an existing
+bcrypt hash, loaded as-is). ``role`` (client, fee_earner or admin) and
+``is_active`` are optional. Input is read and loaded in batches, so memory
+stays flat however large the file is. On PostgreSQL each batch is COPYed into
+a temporary staging table and merged with ``INSERT ... SELECT ... ON CONFLICT``;
+other databases fall back to a batched executemany. ``--update`` also bumps
+each account's ``token_version``, so tokens issued before the import stop
+working: at once on PostgreSQL, where running workers are notified, else
+within ``TOKEN_VERSION_CACHE_TTL_SECONDS``.
+
+Exports stream rows with a server-side cursor. Password hashes are only
+included with ``--include-hashes``, which makes the output importable elsewhere.
+"""
+import argparse
+import csv
+import io
+import itertools
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from enum import Enum
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Row
+
+from app.core import database
+from app.core.security import get_password_hash
+from app.core.serialization import ORJSON_OPTIONS
+from app.models.invite import Invite
+from app.models.user import User, UserRole
+from app.schemas.user import NormalizedEmail
+from app.services.events import CHANNEL, Event
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+USER_COLUMNS = ("email", "full_name", "hashed_password", "role", "is_active")
+REVOCATIONS_PER_NOTIFY = 150
+
+
+class ImportRow(BaseModel):
+    email: NormalizedEmail
+    full_name: str
+    role: UserRole = UserRole.CLIENT
+    is_active: bool = True
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+
+    @field_validator("role", mode="before")
+    @classmethod
+    def upper_role(cls, value):
+        return value.upper() if isinstance(value, str) else value
+
+    @model_validator(mode="after")
+    def one_password(self):
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("give exactly one of password or hashed_password")
+        if self.hashed_password is not None and not self.hashed_password.startswith(BCRYPT_PREFIXES):
+            raise ValueError("hashed_password is not a bcrypt hash")
+        return self
+
+
+# -- input ----------------------------------------------------------------
+
+@contextmanager
+def open_input(path: str) -> Iterator[IO[str]]:
+    if path == "-":
+        # Leave stdin open for whoever else reads it
+        yield sys.stdin
+        return
+    with open(path, newline="", encoding="utf-8-sig") as stream:
+        yield stream
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, dict]]:
+    """(line number, raw record) pairs, read lazily"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield line_number, orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
+                yield line_number, {"__error__": str(exc)}
+
+
+def parse_rows(records: Iterable[Tuple[int, dict]], stats: dict) -> Iterator[ImportRow]:
+    for line_number, record in records:
+        if "__error__" in record:
+            report_invalid(stats, line_number, record["__error__"])
+            continue
+        # Empty CSV cells mean "not given"
+        record = {key: value for key, value in record.items() if key and value not in ("", None)}
+        try:
+            yield ImportRow.model_validate(record)
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            report_invalid(stats, line_number, f"{field}: {error['msg']}" if field else error["msg"])
+
+
+def report_invalid(stats: dict, line_number: int, message: str) -> None:
+    stats["invalid"] += 1
+    print(f"line {line_number}: skipped, {message}", file=sys.stderr)
+
+
+def batched(rows: Iterable[ImportRow], size: int) -> Iterator[List[ImportRow]]:
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+
+# -- hashing --------------------------------------------------------------
+
+def start_hashing(pool: ProcessPoolExecutor, batch: List[ImportRow]) -> Tuple[List[ImportRow], List[Optional[Future]]]:
+    """Submit the batch's plain passwords to the pool without waiting"""
+    futures = [
+        pool.submit(get_password_hash, row.password) if row.hashed_password is None else None
+        for row in batch
+    ]
+    return batch, futures
+
+
+def finish_hashing(batch: List[ImportRow], futures: List[Optional[Future]]) -> List[dict]:
+    values = {}
+    for row, future in zip(batch, futures):
+        # The last occurrence of an email within a batch wins; across batches
+        # ON CONFLICT decides
+        values[row.email] = {
+            "email": row.email,
+            "full_name": row.full_name,
+            "hashed_password": future.result() if future is not None else row.hashed_password,
+            "role": row.role,
+            "is_active": row.is_active,
+        }
+    return list(values.values())
+
+
+# -- loading --------------------------------------------------------------
+
+def supports_copy(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql" and hasattr(conn.connection.driver_connection.cursor(), "copy_expert")
+
+
+def copy_batch(conn: Connection, values: List[dict], update: bool) -> List[Row]:
+    """COPY into the staging table, then merge into users; returns (id, token_version) of rows written"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for value in values:
+        writer.writerow([
+            value["email"],
+            value["full_name"],
+            value["hashed_password"],
+            value["role"].value,
+            "true" if value["is_active"] else "false",
+        ])
+    buffer.seek(0)
+    cursor = conn.connection.driver_connection.cursor()
+    cursor.copy_expert(f"COPY user_import ({', '.join(USER_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    on_conflict = (
+        "DO UPDATE SET full_name = EXCLUDED.full_name, hashed_password = EXCLUDED.hashed_password, "
+        "role = EXCLUDED.role, is_active = EXCLUDED.is_active, "
+        "token_version = users.token_version + 1, updated_at = now()"
+        if update else "DO NOTHING"
+    )
+    result = conn.execute(text(f"""
+        INSERT INTO users (email, full_name, hashed_password, role, is_active)
+        SELECT email, full_name, hashed_password, role::userrole, is_active FROM user_import
+        ON CONFLICT (email) {on_conflict}
+        RETURNING id, token_version
+    """))
+    return result.all()
+
+
+def insert_batch(conn: Connection, values: List[dict], update: bool) -> List[Row]:
+    """Batched executemany with ON CONFLICT; returns (id, token_version) of rows written"""
+    insert = pg_insert(User) if conn.dialect.name == "postgresql" else sqlite_insert(User)
+    if update:
+        statement = insert.on_conflict_do_update(
+            index_elements=[User.email],
+            set_={
+                "full_name": insert.excluded.full_name,
+                "hashed_password": insert.excluded.hashed_password,
+                "role": insert.excluded.role,
+                "is_active": insert.excluded.is_active,
+                # Log out sessions issued under the old password (see notify_revocations)
+                "token_version": User.token_version + 1,
+            },
+        )
+    else:
+        statement = insert.on_conflict_do_nothing(index_elements=[User.email])
+    return conn.execute(statement.returning(User.id, User.token_version), values).all()
+
+
+def notify_revocations(conn: Connection, written: List[Row]) -> None:
+    """Tell running workers about bumped token versions when ``conn`` commits.
+
+    Only PostgreSQL can reach them (LISTEN/NOTIFY, as the event hub's
+    postgres transport); elsewhere they notice within
+    TOKEN_VERSION_CACHE_TTL_SECONDS. New accounts have nothing to revoke.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    revocations = [[row.id, row.token_version] for row in written if row.token_version]
+    # Each pair encodes to at most ~45 bytes, well under MAX_NOTIFY_BYTES per chunk
+    for start in range(0, len(revocations), REVOCATIONS_PER_NOTIFY):
+        event = Event("user.tokens_revoked", {"revocations": revocations[start:start + REVOCATIONS_PER_NOTIFY]})
+        conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": event.encode().decode()})
+
+
+def import_users(path: str, fmt: str, batch_size: int, workers: Optional[int], update: bool) -> int:
+    stats = {"written": 0, "read": 0, "invalid": 0}
+    started = time.perf_counter()
+
+    with open_input(path) as stream, ProcessPoolExecutor(max_workers=workers) as pool, \
+            database.engine.connect() as conn:
+        use_copy = supports_copy(conn)
+        if use_copy:
+            conn.execute(text(
+                "CREATE TEMP TABLE user_import "
+                "(email text, full_name text, hashed_password text, role text, is_active boolean) "
+                "ON COMMIT DELETE ROWS"
+            ))
+            conn.commit()
+        load = copy_batch if use_copy else insert_batch
+
+        def flush(hashing):
+            values = finish_hashing(*hashing)
+            written = load(conn, values, update)
+            if update:
+                notify_revocations(conn, written)
+            stats["written"] += len(written)
+            conn.commit()
+            elapsed = time.perf_counter() - started
+            print(
+                f"{stats['read']} read, {stats['written']} written, {stats['invalid']} invalid "
+                f"({stats['read'] / elapsed:.0f} rows/s)",
+                file=sys.stderr,
+            )
+
+        # Hash batch N+1 in the pool while batch N is loaded, holding at most
+        # two batches in memory
+        in_flight = None
+        for batch in batched(parse_rows(read_records(stream, fmt), stats), batch_size):
+            stats["read"] += len(batch)
+            hashing = start_hashing(pool, batch)
+            if in_flight is not None:
+                flush(in_flight)
+            in_flight = hashing
+        if in_flight is not None:
+            flush(in_flight)
+
+    skipped = stats["read"] - stats["written"]
+    print(
+        f"Imported {stats['written']} user(s); {skipped} already existed or were duplicates, "
+        f"{stats['invalid']} invalid",
+        file=sys.stderr,
+    )
+    return 1 if stats["invalid"] else 0
+
+
+# -- export ---------------------------------------------------------------
+
+def export_query(table: str, include_hashes: bool):
+    if table == "invites":
+        return select(
+            Invite.id, Invite.email, Invite.role, Invite.status, Invite.user_id,
+            Invite.created_by, Invite.created_at, Invite.expires_at,
+        ).order_by(Invite.id)
+    columns = [User.id, User.email, User.full_name, User.role, User.is_active, User.created_at]
+    if include_hashes:
+        columns.append(User.hashed_password)
+    return select(*columns).order_by(User.id)
+
+
+def plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def export_rows(table: str, fmt: str, output: IO[str], include_hashes: bool, batch_size: int) -> int:
+    count = 0
+    with database.engine.connect() as conn:
+        # Server-side cursor: rows arrive in batches instead of all at once
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+            export_query(table, include_hashes)
+        )
+        columns = list(result.keys())
+        writer = None
+        if fmt == "csv":
+            writer = csv.writer(output)
+            writer.writerow(columns)
+        for row in result:
+            values = [plain(value) for value in row]
+            if writer is not None:
+                writer.writerow(["" if value is None else value for value in values])
+            else:
+                output.write(orjson.dumps(dict(zip(columns, values)), option=ORJSON_OPTIONS).decode())
+                output.write("\n")
+            count += 1
+    print(f"Exported {count} {table}", file=sys.stderr)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import and export of users")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="create users from CSV or JSONL")
+    importer.add_argument("path", help="input file, or - for stdin")
+    importer.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    importer.add_argument("--batch-size", type=int, default=1000)
+    importer.add_argument("--workers", type=int, help="hashing processes (default: CPU count)")
+    importer.add_argument("--update", action="store_true", help="overwrite existing users instead of skipping them")
+
+    exporter = commands.add_parser("export", help="stream users or invites as CSV or JSONL")
+    exporter.add_argument("table", choices=("users", "invites"))
+    exporter.add_argument("--format", choices=("csv", "jsonl"), default="jsonl")
+    exporter.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    exporter.add_argument("--include-hashes", action="store_true", help="include users' password hashes")
+    exporter.add_argument("--batch-size", type=int, default=1000)
+
+    args = parser.parse_args(argv)
+
+    database.init_engines(use_async=False)
+    try:
+        if args.command == "import":
+            fmt = args.format or ("csv" if args.path.endswith(".csv") else "jsonl")
+            return import_users(args.path, fmt, args.batch_size, args.workers, args.update)
+
+        output = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+        try:
+            return export_rows(args.table, args.format, output, args.include_hashes, args.batch_size)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+    finally:
+        database.engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
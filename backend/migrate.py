@@ -0,0 +1,42 @@
+"""Apply or inspect schema migrations.
+
+    python migrate.py              # apply everything pending
+    python migrate.py --target 3   # stop after version 3
+    python migrate.py status       # list applied and pending versions
+"""
+import argparse
+import sys
+
+from app.core import database
+from app.core.migrations import applied_versions, load_migrations, upgrade
+
+
+def status() -> int:
+    migrations = load_migrations()
+    with database.engine.connect() as conn:
+        applied = applied_versions(conn)
+    for migration in migrations:
+        marker = "applied" if migration.version in applied else "pending"
+        print(f"{migration.version:04d} {migration.name:<32} {marker}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations")
+    parser.add_argument("command", nargs="?", choices=("upgrade", "status"), default="upgrade")
+    parser.add_argument("--target", type=int, help="highest version to apply")
+    args = parser.parse_args(argv)
+
+    database.init_engines(use_async=False)
+    try:
+        if args.command == "status":
+            return status()
+        applied = upgrade(database.engine, target=args.target)
+        print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
+        return 0
+    finally:
+        database.engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""Production server: a pre-forking supervisor running several uvicorn workers.
+
+    python serve.py                  # one worker per CPU on SERVER_HOST:SERVER_PORT
+    python serve.py --workers 4 --port 8080
+
+The app is imported and the listening socket bound once, in the supervisor,
+before forking. Workers therefore share the imported code copy-on-write and
+accept connections from the same socket. Engines, pools and background
+services are created per worker by the app's lifespan, after the fork.
+
+Signals:
+    SIGTERM / SIGINT  graceful shutdown: workers stop accepting, finish
+                      in-flight requests (up to GRACEFUL_SHUTDOWN_SECONDS),
+                      run their shutdown hooks and exit
+    SIGHUP            rolling restart: start a fresh set of workers, then
+                      drain the old ones (code is not reloaded; restart the
+                      supervisor to deploy)
+
+Workers that exit (crash, or SERVER_MAX_REQUESTS reached) are replaced.
+uvloop and httptools are used when installed.
+"""
+import argparse
+import gc
+import logging
+import os
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from typing import Dict
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.metrics import retire_snapshots
+from app.services.events import event_hub, transport_name
+
+logger = logging.getLogger("serve")
+
+# uvicorn's exit code when the app's startup (lifespan) fails
+STARTUP_FAILURE = 3
+# A worker dying sooner than this after its start counts as a crash loop
+MIN_WORKER_LIFETIME_SECONDS = 5.0
+
+
+def apply_connection_budget(workers: int) -> None:
+    """Split DB_MAX_CONNECTIONS evenly between the workers' pools.
+
+    Besides its pool, a worker holds one connection outside it: the event
+    hub's LISTEN connection when events go through PostgreSQL. Workers open
+    no sync engine. Replica pools get the same size, so each replica serves
+    the same number of connections as the primary.
+    """
+    if not settings.db_max_connections:
+        return
+    per_worker = settings.db_max_connections // workers
+    outside_pool = 1 if transport_name() == "postgres" else 0
+    pool_size = per_worker - outside_pool
+    if pool_size < 1:
+        raise SystemExit(
+            f"DB_MAX_CONNECTIONS={settings.db_max_connections} leaves no pooled connection for each "
+            f"of {workers} worker(s) ({outside_pool} per worker are held outside the pool)"
+        )
+    settings.db_pool_size = pool_size
+    settings.db_max_overflow = 0
+    logger.info(
+        "Each worker's pool holds up to %d connection(s), plus %d outside it", pool_size, outside_pool
+    )
+
+
+def build_config(args) -> uvicorn.Config:
+    return uvicorn.Config(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        loop="auto",  # uvloop if installed
+        http="auto",  # httptools if installed
+        lifespan="on",
+        proxy_headers=True,
+        timeout_keep_alive=settings.keep_alive_timeout_seconds,
+        timeout_graceful_shutdown=settings.graceful_shutdown_seconds,
+        backlog=settings.server_backlog,
+        limit_concurrency=settings.server_limit_concurrency or None,
+        access_log=args.access_log,
+    )
+
+
+class Server(uvicorn.Server):
+    def handle_exit(self, sig, frame) -> None:
+        super().handle_exit(sig, frame)
+        # Open event streams never finish on their own; end them so the
+        # worker can drain, and let the browsers reconnect elsewhere
+        event_hub.close_streams()
+
+
+class Supervisor:
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.socket = None
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.stopping = False
+        self.restart_requested = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        # Worker
+        exit_code = 1
+        try:
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            if settings.server_max_requests:
+                # Jitter so the workers don't all recycle at once
+                self.config.limit_max_requests = int(settings.server_max_requests * random.uniform(0.9, 1.1))
+            server = Server(self.config)
+            server.run(sockets=[self.socket])
+            exit_code = 0 if server.started else STARTUP_FAILURE
+        except BaseException:
+            logger.exception("Worker %d failed", os.getpid())
+        finally:
+            logging.shutdown()
+            # Skip the supervisor's atexit handlers and buffered state
+            os._exit(exit_code)
+
+    def signal_children(self, sig: int, pids=None) -> None:
+        for pid in list(pids if pids is not None else self.children):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def reap(self) -> None:
+        """Collect exited workers and replace them unless shutting down"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            exit_code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                continue
+            if exit_code == STARTUP_FAILURE:
+                logger.error("Worker %d failed to start; shutting down", pid)
+                self.stopping = True
+                continue
+            if exit_code != 0:
+                logger.warning("Worker %d exited with %d; replacing it", pid, exit_code)
+                if time.monotonic() - started < MIN_WORKER_LIFETIME_SECONDS:
+                    time.sleep(1)
+            if len(self.children) < self.workers:
+                self.spawn()
+
+    def rolling_restart(self) -> None:
+        old = list(self.children)
+        logger.info("Restarting %d worker(s)", len(old))
+        for _ in range(self.workers):
+            self.spawn()
+        # The new workers accept on the shared socket while the old ones drain
+        for pid in old:
+            self.children.pop(pid, None)
+        self.signal_children(signal.SIGTERM, old)
+        self._wait(old)
+
+    def _wait(self, pids) -> None:
+        deadline = time.monotonic() + settings.graceful_shutdown_seconds + 5
+        remaining = set(pids)
+        while remaining and time.monotonic() < deadline:
+            for pid in list(remaining):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        remaining.discard(pid)
+                except ChildProcessError:
+                    remaining.discard(pid)
+            time.sleep(0.1)
+        if remaining:
+            logger.warning("Killing %d worker(s) that did not drain in time", len(remaining))
+            self.signal_children(signal.SIGKILL, remaining)
+            for pid in remaining:
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+
+    def retire_metrics(self) -> None:
+        """Fold exited workers' metrics snapshots into one file"""
+        try:
+            retire_snapshots(settings.metrics_dir)
+        except Exception:
+            logger.exception("Folding retired metrics snapshots failed")
+
+    def handle_stop(self, sig, frame) -> None:
+        self.stopping = True
+
+    def handle_restart(self, sig, frame) -> None:
+        self.restart_requested = True
+
+    def run(self) -> int:
+        self.config.load()
+        self.socket = self.config.bind_socket()
+        # Keep the objects created during import out of the collector's
+        # generations, so workers don't copy those pages by touching refcounts
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_restart)
+
+        logger.info("Starting %d worker(s)", self.workers)
+        for _ in range(self.workers):
+            self.spawn()
+
+        next_retire = time.monotonic()
+        while not self.stopping:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            self.reap()
+            if time.monotonic() >= next_retire:
+                next_retire = time.monotonic() + settings.metrics_snapshot_interval_seconds
+                self.retire_metrics()
+            time.sleep(0.2)
+
+        logger.info("Shutting down %d worker(s)", len(self.children))
+        self.signal_children(signal.SIGTERM)
+        self._wait(list(self.children))
+        self.children.clear()
+        self.socket.close()
+        return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--workers", type=int, default=settings.server_workers or os.cpu_count() or 1)
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(name)s[%(process)d] %(message)s")
+    logger.setLevel(logging.INFO)
+    apply_connection_budget(args.workers)
+
+    # /metrics in any worker reports the merged view of all of them
+    own_metrics_dir = not settings.metrics_dir
+    if own_metrics_dir:
+        settings.metrics_dir = tempfile.mkdtemp(prefix="api-metrics-")
+    else:
+        # Counters start from zero with every supervisor
+        os.makedirs(settings.metrics_dir, exist_ok=True)
+        for name in os.listdir(settings.metrics_dir):
+            if name.endswith(".json"):
+                os.remove(os.path.join(settings.metrics_dir, name))
+    try:
+        return Supervisor(build_config(args), args.workers).run()
+    finally:
+        if own_metrics_dir:
+            shutil.rmtree(settings.metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
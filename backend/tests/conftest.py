@@ -0,0 +1,101 @@
+"""Fixtures running the real app from main.py in-process.
+
+Each test gets its own SQLite file, migrated from scratch, and its own app
+lifespan (engines, event hub, audit writer), driven through httpx's ASGI
+transport the same way benchmarks/run.py does. Async tests use the anyio
+pytest plugin that ships with anyio.
+"""
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='tests-'), 'unused.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("INVITE_SWEEP_ENABLED", "false")
+os.environ.setdefault("OUTBOX_DISPATCH_ENABLED", "false")
+os.environ.setdefault("LOGIN_RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("EMAIL_TRANSPORT", "memory")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+import main  # noqa: E402
+from app.core import database  # noqa: E402
+from app.core.auth import token_versions, user_cache  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.idempotency import idempotency_store  # noqa: E402
+from app.core.migrations import upgrade  # noqa: E402
+from app.core.security import get_password_hash, token_cache  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.services.dashboard import dashboard_cache  # noqa: E402
+
+PASSWORD = "test-password"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def database_url(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    monkeypatch.setattr(settings, "database_url", url)
+    database.init_engines(use_async=False)
+    upgrade(database.engine, log=lambda message: None)
+    # Ids start over in every database, so nothing cached may survive a test
+    for cache in (token_cache, user_cache, token_versions, idempotency_store.responses, dashboard_cache):
+        cache.clear()
+    yield url
+    # The app's lifespan disposes the engines it used; tests without it don't
+    if database.engine is not None:
+        database.engine.dispose()
+        database.engine = None
+
+
+@pytest.fixture
+async def app(database_url):
+    async with main.app.router.lifespan_context(main.app):
+        yield main.app
+
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def create_user(database_url):
+    def create(email: str, role: UserRole = UserRole.CLIENT) -> int:
+        with database.engine.begin() as conn:
+            return conn.execute(
+                User.__table__.insert().returning(User.id),
+                {
+                    "email": email,
+                    "full_name": email.split("@")[0],
+                    "hashed_password": get_password_hash(PASSWORD),
+                    "role": role,
+                    "is_active": True,
+                    "token_version": 0,
+                },
+            ).scalar_one()
+
+    return create
+
+
+@pytest.fixture
+def login(client):
+    async def log_in(email: str) -> dict:
+        response = await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return log_in
+
+
+@pytest.fixture
+async def admin_headers(create_user, login):
+    create_user("admin@example.com", UserRole.ADMIN)
+    tokens = await login("admin@example.com")
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
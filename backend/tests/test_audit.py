@@ -0,0 +1,76 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.core import database
+from app.core.config import settings
+from app.models.audit import AuditEvent
+from app.schemas.user import AuditEventResponse
+from app.services.audit import AuditLog
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_buffered_events_are_written_on_shutdown(app):
+    log = AuditLog(database.AsyncSessionLocal, batch_size=20)
+    log.start()
+
+    await log.record_many("invite.sent", [(n, {"n": n}) for n in range(50)], actor_id=1, target_type="invite")
+    await log.stop()
+
+    with database.engine.connect() as conn:
+        assert conn.scalar(select(func.count()).where(AuditEvent.action == "invite.sent")) == 50
+    assert (log.written, log.batches, log.dropped) == (50, 3, 0)
+
+
+async def test_events_are_listed_newest_first(client, admin_headers):
+    start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    with database.engine.begin() as conn:
+        conn.execute(
+            insert(AuditEvent),
+            [{"occurred_at": start + timedelta(minutes=n), "action": "test.event", "target_id": n} for n in range(5)],
+        )
+
+    first = (await client.get("/api/audit", params={"action": "test.event", "limit": 3}, headers=admin_headers)).json()
+    second = (
+        await client.get(
+            "/api/audit",
+            params={"action": "test.event", "limit": 3, "cursor": first["next_cursor"]},
+            headers=admin_headers,
+        )
+    ).json()
+
+    assert [event["target_id"] for event in first["items"]] == [4, 3, 2]
+    assert [event["target_id"] for event in second["items"]] == [1, 0]
+    assert second["next_cursor"] is None
+
+
+async def test_audit_log_is_admin_only(client, create_user, login):
+    create_user("client@example.com")
+    tokens = await login("client@example.com")
+
+    response = await client.get("/api/audit", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+
+    assert response.status_code == 403
+
+
+def test_response_model_reads_orm_rows():
+    event = AuditEvent(id=1, occurred_at=datetime.now(timezone.utc), action="auth.login", actor_id=2)
+
+    assert AuditEventResponse.model_validate(event).actor_id == 2
+
+
+async def test_record_many_waits_once_for_a_full_buffer(monkeypatch):
+    monkeypatch.setattr(settings, "audit_block_timeout_seconds", 0.2)
+    log = AuditLog(buffer_size=2, block=True)
+    # No writer, so the buffer never drains
+    log.queue = asyncio.Queue(2)
+
+    started = time.monotonic()
+    await log.record_many("invite.sent", [(n, None) for n in range(100)])
+
+    assert time.monotonic() - started < 1
+    assert (log.recorded, log.dropped) == (2, 98)
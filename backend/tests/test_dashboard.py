@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.core import database
+from app.models.user import User, UserRole
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client_headers(create_user, login):
+    create_user("client@example.com")
+    tokens = await login("client@example.com")
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+@contextmanager
+def checkouts():
+    """Record every connection checked out of the async pool"""
+    recorded = []
+    engine = database.async_engine.sync_engine
+    record = lambda *args: recorded.append(args)  # noqa: E731
+    event.listen(engine, "checkout", record)
+    try:
+        yield recorded
+    finally:
+        event.remove(engine, "checkout", record)
+
+
+async def test_unchanged_dashboard_answers_304_without_a_connection(client, client_headers):
+    first = await client.get("/api/client-home", headers=client_headers)
+    assert first.status_code == 200
+    assert first.json()["email"] == "client@example.com"
+
+    with checkouts() as recorded:
+        second = await client.get("/api/client-home", headers={**client_headers, "If-None-Match": first.headers["etag"]})
+        cached = await client.get("/api/client-home", headers=client_headers)
+
+    assert second.status_code == 304
+    assert second.headers["etag"] == first.headers["etag"]
+    assert cached.content == first.content
+    assert recorded == []
+
+
+async def test_updating_the_user_changes_the_etag(client, client_headers):
+    first = await client.get("/api/client-home", headers=client_headers)
+
+    with database.SessionLocal() as db:
+        db.query(User).filter_by(email="client@example.com").one().full_name = "Renamed Client"
+        db.commit()
+
+    second = await client.get("/api/client-home", headers={**client_headers, "If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.json()["full_name"] == "Renamed Client"
+
+
+async def test_dashboards_are_per_role(client, client_headers, create_user, login):
+    assert (await client.get("/api/fee-earner-home", headers=client_headers)).status_code == 403
+
+    create_user("earner@example.com", UserRole.FEE_EARNER)
+    tokens = await login("earner@example.com")
+    response = await client.get("/api/fee-earner-home", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.json()["email"] == "earner@example.com"
+
+
+async def test_cached_me_holds_no_connection(client, client_headers):
+    await client.get("/api/auth/me", headers=client_headers)
+
+    with checkouts() as recorded:
+        assert (await client.get("/api/auth/me", headers=client_headers)).status_code == 200
+
+    assert recorded == []
@@ -0,0 +1,66 @@
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from app.core import database
+from app.core.migrations import upgrade
+from app.models.user import User
+from app.schemas.user import normalize_email
+from tests.conftest import PASSWORD
+
+pytestmark = pytest.mark.anyio
+
+
+async def register(client, email):
+    return await client.post(
+        "/api/auth/register",
+        headers={"Idempotency-Key": str(uuid.uuid4())},
+        json={"email": email, "full_name": "Mixed Case", "password": PASSWORD},
+    )
+
+
+async def test_emails_are_stored_lower_cased(client):
+    response = await register(client, "  Mixed.Case@Example.COM ")
+
+    assert response.status_code == 200
+    assert response.json()["email"] == "mixed.case@example.com"
+    with database.engine.connect() as conn:
+        assert conn.execute(select(User.email)).scalars().all() == ["mixed.case@example.com"]
+
+
+async def test_case_variants_are_one_account(client):
+    assert (await register(client, "someone@example.com")).status_code == 200
+
+    assert (await register(client, "SomeOne@Example.com")).status_code == 400
+    login = await client.post("/api/auth/login", json={"email": "SOMEONE@example.com", "password": PASSWORD})
+    assert login.status_code == 200
+
+
+def test_normalize_email_leaves_other_values_alone():
+    assert normalize_email(" A@B.Example ") == "a@b.example"
+    assert normalize_email(None) is None
+
+
+def test_migration_merges_case_duplicates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    try:
+        upgrade(engine, target=6, log=lambda message: None)
+        with engine.begin() as conn:
+            for email in ("Dup@Example.com", "dup@example.com ", "Other@Example.com"):
+                conn.execute(text(
+                    "INSERT INTO users (email, full_name, hashed_password, role, is_active, token_version) "
+                    "VALUES (:email, 'x', 'x', 'CLIENT', 1, 0)"
+                ), {"email": email})
+
+        upgrade(engine, log=lambda message: None)
+
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT id, email, is_active FROM users ORDER BY id")).all()
+    finally:
+        engine.dispose()
+    assert [tuple(row) for row in rows] == [
+        (1, "dup@example.com", 1),
+        (2, "duplicate-2+dup@example.com", 0),
+        (3, "other@example.com", 1),
+    ]
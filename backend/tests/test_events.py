@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.auth import Principal, token_versions
+from app.core.config import settings
+from app.models.user import UserRole
+from app.routers.events import stream_events
+from app.services.events import Event, event_hub
+
+pytestmark = pytest.mark.anyio
+
+CLIENT = Principal(user_id=7, email="client@example.com", role=UserRole.CLIENT, token_version=2)
+
+
+async def next_chunk(stream) -> bytes:
+    return await asyncio.wait_for(stream.__anext__(), 1)
+
+
+async def test_stream_relays_the_users_events(app):
+    stream = stream_events(CLIENT, None)
+    assert b"event: ready" in await next_chunk(stream)
+
+    event_hub.deliver(Event("dashboard.invalidated", user_ids=frozenset({8})))
+    event_hub.deliver(Event("invite.created", {"id": 1}, roles=frozenset({UserRole.ADMIN.value})))
+    event_hub.deliver(Event("dashboard.invalidated", {"n": 1}, user_ids=frozenset({7})))
+
+    assert await next_chunk(stream) == b'event: dashboard.invalidated\ndata: {"n":1}\n\n'
+    await stream.aclose()
+    assert event_hub.connections == 0
+
+
+async def test_revocation_event_ends_older_streams(app):
+    old = stream_events(CLIENT, None)
+    fresh = stream_events(Principal(7, "client@example.com", UserRole.CLIENT, token_version=3), None)
+    await next_chunk(old)
+    await next_chunk(fresh)
+
+    event_hub.deliver(Event("user.tokens_revoked", {"revocations": [(7, 3)]}))
+    event_hub.deliver(Event("dashboard.invalidated", user_ids=frozenset({7})))
+
+    assert b"event: expired" in await next_chunk(old)
+    with pytest.raises(StopAsyncIteration):
+        await next_chunk(old)
+    assert b"event: dashboard.invalidated" in await next_chunk(fresh)
+    await fresh.aclose()
+
+
+async def test_heartbeats_run_no_token_lookups(app, monkeypatch):
+    monkeypatch.setattr(settings, "events_heartbeat_seconds", 0.01)
+    lookups = token_versions.lookups
+    stream = stream_events(CLIENT, None)
+    await next_chunk(stream)
+
+    heartbeats = [await next_chunk(stream) for _ in range(5)]
+
+    assert heartbeats == [b": keep-alive\n\n"] * 5
+    assert token_versions.lookups == lookups
+    await stream.aclose()
+
+
+async def test_stream_ends_when_the_token_expires(app):
+    stream = stream_events(CLIENT, time.time() + 0.05)
+
+    chunks = [chunk async for chunk in stream]
+
+    assert b"event: expired" in chunks[-1]
+
+
+async def test_slow_client_gets_one_resync(app, monkeypatch):
+    monkeypatch.setattr(settings, "events_queue_size", 2)
+    stream = stream_events(CLIENT, None)
+    await next_chunk(stream)
+
+    for n in range(5):
+        event_hub.deliver(Event("dashboard.invalidated", {"n": n}, user_ids=frozenset({7})))
+
+    assert b"event: resync" in await next_chunk(stream)
+    await stream.aclose()
+
+
+async def test_stream_needs_a_valid_token(client):
+    assert (await client.get("/api/events/stream")).status_code == 401
+    assert (await client.get("/api/events/stream", params={"token": "not-a-token"})).status_code == 401
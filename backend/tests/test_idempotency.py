@@ -0,0 +1,149 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+from app.core import database
+from app.core.idempotency import DatabaseIdempotencyStore, IdempotencyMiddleware
+from app.models.idempotency import IdempotencyKey
+from app.models.invite import Invite
+from app.models.user import User, UserRole
+from tests.conftest import PASSWORD
+
+pytestmark = pytest.mark.anyio
+
+NEW_USER = {"email": "new@example.com", "full_name": "New User", "password": PASSWORD}
+
+
+def count(model) -> int:
+    with database.engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(model))
+
+
+async def register(client, key, body=NEW_USER):
+    return await client.post("/api/auth/register", headers={"Idempotency-Key": key}, json=body)
+
+
+async def test_retry_replays_the_first_response(client):
+    first = await register(client, "key-1")
+    retry = await register(client, "key-1")
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert count(User) == 1
+
+
+async def test_key_reused_for_another_body_is_rejected(client):
+    await register(client, "key-1")
+
+    response = await register(client, "key-1", {**NEW_USER, "email": "other@example.com"})
+
+    assert response.status_code == 422
+    assert count(User) == 1
+
+
+async def test_concurrent_duplicates_run_once(client):
+    responses = await asyncio.gather(*(register(client, "key-1") for _ in range(5)))
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert count(User) == 1
+
+
+async def test_requests_without_a_key_pass_through(client):
+    first = await client.post("/api/auth/register", json=NEW_USER)
+    retry = await client.post("/api/auth/register", json=NEW_USER)
+
+    assert (first.status_code, retry.status_code) == (200, 400)
+    assert (await register(client, " ")).status_code == 400
+
+
+async def test_register_with_invite_is_not_replayed(client, admin_headers):
+    await client.post(
+        "/api/invites/bulk", headers=admin_headers, json=[{"email": "earner@example.com", "role": "fee_earner"}]
+    )
+    with database.engine.connect() as conn:
+        invite_token = conn.scalar(select(Invite.invite_token))
+    body = {"invite_token": invite_token, "full_name": "Fee Earner", "password": "new-password"}
+
+    async def accept():
+        return await client.post(
+            "/api/auth/register-with-invite", headers={"Idempotency-Key": "key-1"}, json=body
+        )
+
+    first = await accept()
+    retry = await accept()
+
+    assert first.status_code == 200
+    assert "access_token" in first.json()
+    assert retry.status_code == 409
+    assert "access_token" not in retry.text
+
+
+async def test_query_token_callers_get_their_own_scope(client, create_user, login):
+    for email in ("first@example.com", "second@example.com"):
+        create_user(email, UserRole.ADMIN)
+    first, second = [(await login(email))["access_token"] for email in ("first@example.com", "second@example.com")]
+
+    async def send_invite(token, email):
+        return await client.post(
+            "/api/invites/send-invite",
+            params={"token": token},
+            headers={"Idempotency-Key": "key-1"},
+            json={"email": email, "role": "client"},
+        )
+
+    assert (await send_invite(first, "a@example.com")).status_code == 200
+    response = await send_invite(second, "a@example.com")
+
+    # Not another admin's invite replayed: the second admin's request ran
+    assert "idempotent-replayed" not in response.headers
+    assert response.status_code == 400
+    replay = await send_invite(first, "a@example.com")
+    assert replay.headers["idempotent-replayed"] == "true"
+
+
+def counting_app():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await receive()
+        await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"created"})
+
+    return app, calls
+
+
+async def test_database_store_is_shared_between_workers(app):
+    inner, calls = counting_app()
+    workers = [
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=IdempotencyMiddleware(
+                inner,
+                routes=[("POST", "/things")],
+                withheld_routes=[("POST", "/secrets")],
+                store=DatabaseIdempotencyStore(100, 60, database.AsyncSessionLocal),
+            )),
+            base_url="http://test",
+        )
+        for _ in range(2)
+    ]
+    headers = {"Idempotency-Key": "key-1"}
+
+    first = await workers[0].post("/things", headers=headers, content=b"body")
+    replay = await workers[1].post("/things", headers=headers, content=b"body")
+    assert (first.status_code, replay.status_code, replay.text) == (201, 201, "created")
+    assert replay.headers["idempotent-replayed"] == "true"
+
+    await workers[0].post("/secrets", headers=headers, content=b"body")
+    withheld = await workers[1].post("/secrets", headers=headers, content=b"body")
+    assert withheld.status_code == 409
+    assert calls == ["/things", "/secrets"]
+    with database.engine.connect() as conn:
+        assert sorted(conn.execute(select(IdempotencyKey.body)).scalars(), key=bool) == [None, b"created"]
+    for worker in workers:
+        await worker.aclose()
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.core import database
+from app.models.invite import Invite, InviteStatus
+from app.services.invite_expiry import InviteExpirySweeper
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def add_invites(admin_headers):
+    def add(count: int, expires_in: timedelta, prefix: str) -> None:
+        now = datetime.now(timezone.utc)
+        with database.engine.begin() as conn:
+            conn.execute(Invite.__table__.insert(), [
+                {
+                    "email": f"{prefix}{i}@example.com",
+                    "role": "client",
+                    "invite_token": f"{prefix}-{i}",
+                    "status": InviteStatus.PENDING,
+                    "created_by": 1,
+                    "expires_at": now + expires_in,
+                }
+                for i in range(count)
+            ])
+
+    return add
+
+
+def statuses() -> dict:
+    with database.engine.connect() as conn:
+        return dict(conn.execute(select(Invite.invite_token, Invite.status)).all())
+
+
+async def test_sweep_expires_only_overdue_invites_in_batches(add_invites):
+    add_invites(5, timedelta(hours=-1), "overdue")
+    add_invites(2, timedelta(days=1), "live")
+    sweeper = InviteExpirySweeper(database.AsyncSessionLocal, batch_size=2)
+
+    assert await sweeper.sweep() == 5
+
+    assert sweeper.batches == 3
+    assert sweeper.expired_total == 5
+    assert {token: status for token, status in statuses().items() if token.startswith("overdue")} == {
+        f"overdue-{i}": InviteStatus.EXPIRED for i in range(5)
+    }
+    assert statuses()["live-0"] == InviteStatus.PENDING
+    assert await sweeper.sweep() == 0
+
+
+async def test_an_expired_invite_frees_its_email(client, admin_headers, add_invites):
+    add_invites(1, timedelta(hours=-1), "overdue")
+    await InviteExpirySweeper(database.AsyncSessionLocal).sweep()
+
+    response = await client.post(
+        "/api/invites/bulk", headers=admin_headers, json=[{"email": "overdue0@example.com", "role": "client"}]
+    )
+
+    assert response.json()["results"][0]["status"] == "created"
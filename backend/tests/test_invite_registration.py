@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core import database
+from app.models.invite import Invite, InviteStatus
+from app.models.user import User, UserRole
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def invite_token(client, admin_headers):
+    response = await client.post(
+        "/api/invites/bulk", headers=admin_headers, json=[{"email": "earner@example.com", "role": "fee_earner"}]
+    )
+    with database.engine.connect() as conn:
+        return conn.execute(
+            select(Invite.invite_token).where(Invite.id == response.json()["results"][0]["invite"]["id"])
+        ).scalar_one()
+
+
+async def accept(client, invite_token):
+    return await client.post("/api/auth/register-with-invite", json={
+        "invite_token": invite_token, "full_name": "Fee Earner", "password": "new-password",
+    })
+
+
+async def test_accepting_creates_the_user_with_the_invites_role(client, invite_token):
+    response = await accept(client, invite_token)
+
+    assert response.status_code == 200
+    me = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {response.json()['access_token']}"})
+    assert me.json()["email"] == "earner@example.com"
+    assert me.json()["role"] == UserRole.FEE_EARNER
+    with database.engine.connect() as conn:
+        invite = conn.execute(select(Invite).where(Invite.invite_token == invite_token)).one()
+    assert invite.status == InviteStatus.ACCEPTED
+    assert invite.user_id == me.json()["id"]
+
+
+async def test_an_accepted_invite_cannot_be_used_again(client, invite_token):
+    assert (await accept(client, invite_token)).status_code == 200
+
+    response = await accept(client, invite_token)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invite is no longer valid"
+
+
+async def test_concurrent_double_submits_create_one_account(client, invite_token):
+    responses = await asyncio.gather(*(accept(client, invite_token) for _ in range(5)))
+
+    assert sorted(response.status_code for response in responses) == [200] + [400] * 4
+    with database.engine.connect() as conn:
+        assert conn.execute(
+            select(func.count()).select_from(User).where(User.email == "earner@example.com")
+        ).scalar_one() == 1
+
+
+async def test_unknown_invite_is_not_found(client):
+    assert (await accept(client, "no-such-token")).status_code == 404
@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy import event, func, select
+
+from app.core import database
+from app.models.invite import Invite
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_bulk_reports_duplicates_and_pending_invites(client, admin_headers, create_user):
+    create_user("existing@example.com")
+    first = await client.post(
+        "/api/invites/bulk", headers=admin_headers, json=[{"email": "pending@example.com", "role": "client"}]
+    )
+    assert first.json()["created"] == 1
+
+    response = await client.post("/api/invites/bulk", headers=admin_headers, json=[
+        {"email": "new@example.com", "role": "client"},
+        {"email": "NEW@example.com", "role": "fee_earner"},
+        {"email": "pending@example.com", "role": "client"},
+        {"email": "existing@example.com", "role": "client"},
+        {"email": "admin2@example.com", "role": "admin"},
+        {"email": "not-an-email", "role": "client"},
+    ])
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert [result["status"] for result in response.json()["results"]] == [
+        "created", "duplicate", "invite_pending", "user_exists", "invalid", "invalid",
+    ]
+
+
+async def test_bulk_accepts_a_csv_upload(client, admin_headers):
+    body = "email,role\r\na@example.com,client\r\nb@example.com,fee_earner\r\n"
+    response = await client.post(
+        "/api/invites/bulk", headers={**admin_headers, "Content-Type": "text/csv"}, content=body
+    )
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
+    with database.engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(Invite)).scalar_one() == 2
+
+
+async def test_bulk_needs_an_admin(client, create_user, login):
+    create_user("client@example.com")
+    tokens = await login("client@example.com")
+
+    response = await client.post(
+        "/api/invites/bulk",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        json=[{"email": "a@example.com", "role": "client"}],
+    )
+
+    assert response.status_code == 403
+
+
+async def test_cursor_pages_cover_every_invite_once(client, admin_headers):
+    emails = [f"client{i}@example.com" for i in range(25)]
+    await client.post(
+        "/api/invites/bulk", headers=admin_headers, json=[{"email": email, "role": "client"} for email in emails]
+    )
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/api/invites", headers=admin_headers, params=params)).json()
+        seen += [invite["id"] for invite in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 25
+    assert seen == sorted(seen, reverse=True)
+
+
+async def test_invalid_cursor_is_rejected(client, admin_headers):
+    response = await client.get("/api/invites", headers=admin_headers, params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("params, index", [
+    ({"created_by": 1}, "ix_invites_created_by_id"),
+    ({"status": "pending"}, "ix_invites_status_id"),
+    ({"status": "pending", "expires_before": "2030-01-01T00:00:00"}, "ix_invites_status_expires_at"),
+])
+async def test_listing_filters_are_index_range_scans(client, admin_headers, params, index):
+    first = (await client.get("/api/invites", headers=admin_headers, params={"limit": 1})).json()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM invites" in statement:
+            statements.append((statement, parameters))
+
+    engine = database.async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        cursor = {"cursor": first["next_cursor"]} if first["next_cursor"] else {}
+        response = await client.get("/api/invites", headers=admin_headers, params={**params, **cursor})
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert response.status_code == 200
+
+    statement, parameters = statements[-1]
+    with database.engine.connect() as conn:
+        plan = " ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+    assert f"USING INDEX {index}" in plan
+    assert "SCAN invites" not in plan
@@ -0,0 +1,54 @@
+import base64
+import json
+import time
+
+import pytest
+
+from app.core.keyring import HMACBackend, JoseBackend, Keyring
+
+pytestmark = pytest.mark.anyio
+
+BACKENDS = [JoseBackend, HMACBackend]
+
+
+def segment(data) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+
+def token_with_kid(kid) -> str:
+    return f"{segment({'alg': 'HS256', 'kid': kid})}.{segment({'sub': '1'})}.c2ln"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("kid", [[1], {"a": 1}, 5])
+def test_non_string_kid_is_rejected_by_the_backends(backend, kid):
+    keyring = Keyring.parse("", "secret", "HS256")
+
+    assert backend(keyring).decode(token_with_kid(kid)) is None
+
+
+@pytest.mark.parametrize("kid", [[1], {"a": 1}, 5])
+async def test_non_string_kid_is_rejected(client, kid):
+    token = token_with_kid(kid)
+
+    assert (await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})).status_code == 401
+    assert (await client.get("/api/events/stream", params={"token": token})).status_code == 401
+
+
+@pytest.mark.parametrize("signer", BACKENDS)
+@pytest.mark.parametrize("verifier", BACKENDS)
+def test_tokens_from_a_rotated_out_key_verify_until_retired(signer, verifier):
+    claims = {"sub": "1", "exp": time.time() + 60}
+    old = signer(Keyring.parse("old:old-secret", "", "HS256")).encode(claims)
+
+    rotated = Keyring.parse(f"new:new-secret,old:old-secret:{time.time() + 60}", "", "HS256")
+    assert verifier(rotated).decode(old)["sub"] == "1"
+    assert verifier(rotated).decode(signer(rotated).encode(claims))["sub"] == "1"
+
+    retired = Keyring.parse(f"new:new-secret,old:old-secret:{time.time() - 1}", "", "HS256")
+    assert verifier(retired).decode(old) is None
+
+
+def test_signing_key_cannot_be_retired():
+    with pytest.raises(ValueError):
+        Keyring.parse("new:secret:2024-06-01T12:30:00Z", "", "HS256")
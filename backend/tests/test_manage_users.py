@@ -0,0 +1,85 @@
+import io
+import sys
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from sqlalchemy import select
+
+import manage_users
+from app.core import database
+from app.core.security import get_password_hash, verify_password
+from app.models.user import User, UserRole
+from app.services.events import MAX_NOTIFY_BYTES, Event
+
+
+def users():
+    with database.engine.connect() as conn:
+        return {row.email: row for row in conn.execute(select(User))}
+
+
+def test_import_from_stdin_leaves_it_open(database_url, monkeypatch):
+    hashed = get_password_hash("pre-hashed")
+    stdin = io.StringIO(
+        "email,full_name,password,hashed_password,role\n"
+        "A@Example.com,Ann,plain-password,,fee_earner\n"
+        f"b@example.com,Bob,,{hashed},\n"
+        "not-an-email,Nobody,x,,\n"
+    )
+    monkeypatch.setattr(sys, "stdin", stdin)
+
+    assert manage_users.main(["import", "-", "--format", "csv", "--workers", "1"]) == 1
+
+    assert not stdin.closed
+    imported = users()
+    assert sorted(imported) == ["a@example.com", "b@example.com"]
+    assert imported["a@example.com"].role == UserRole.FEE_EARNER
+    assert verify_password("plain-password", imported["a@example.com"].hashed_password)
+    assert imported["b@example.com"].hashed_password == hashed
+
+
+def test_update_overwrites_and_bumps_the_token_version(database_url, tmp_path):
+    path = tmp_path / "users.jsonl"
+    path.write_text('{"email": "a@example.com", "full_name": "Ann", "password": "first"}\n')
+    assert manage_users.main(["import", str(path), "--workers", "1"]) == 0
+
+    path.write_text('{"email": "a@example.com", "full_name": "Ann B", "password": "second"}\n')
+    assert manage_users.main(["import", str(path), "--workers", "1"]) == 0
+    assert users()["a@example.com"].full_name == "Ann"
+
+    assert manage_users.main(["import", str(path), "--workers", "1", "--update"]) == 0
+    updated = users()["a@example.com"]
+    assert updated.full_name == "Ann B"
+    assert updated.token_version == 1
+    assert verify_password("second", updated.hashed_password)
+
+
+def test_revocations_are_notified_in_chunks_on_postgresql():
+    sent = []
+    conn = SimpleNamespace(
+        dialect=SimpleNamespace(name="postgresql"),
+        execute=lambda statement, parameters: sent.append(parameters),
+    )
+    written = [SimpleNamespace(id=2 ** 62 + i, token_version=i % 3) for i in range(1000)]
+
+    manage_users.notify_revocations(conn, written)
+
+    events = [Event.decode(parameters["payload"]) for parameters in sent]
+    assert all(len(parameters["payload"].encode()) < MAX_NOTIFY_BYTES for parameters in sent)
+    assert {event.type for event in events} == {"user.tokens_revoked"}
+    revoked = [pair for event in events for pair in event.data["revocations"]]
+    assert revoked == [[row.id, row.token_version] for row in written if row.token_version]
+
+
+def test_export_streams_users_and_invites(database_url, create_user, tmp_path, capsys):
+    create_user("a@example.com")
+    create_user("b@example.com", UserRole.ADMIN)
+    output = tmp_path / "users.jsonl"
+
+    assert manage_users.main(["export", "users", "-o", str(output)]) == 0
+    rows = [orjson.loads(line) for line in output.read_text().splitlines()]
+    assert [(row["email"], row["role"]) for row in rows] == [("a@example.com", "CLIENT"), ("b@example.com", "ADMIN")]
+    assert "hashed_password" not in rows[0]
+
+    assert manage_users.main(["export", "invites", "--format", "csv"]) == 0
+    assert capsys.readouterr().out.splitlines()[0].startswith("id,email,role,status")
@@ -0,0 +1,40 @@
+import pytest
+
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def sample(text: str, series: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+async def test_requests_are_counted_per_route(client, admin_headers):
+    series = 'http_requests_total{method="GET",route="/api/auth/me",status="200"}'
+    before = sample((await client.get("/metrics")).text, series)
+
+    await client.get("/api/auth/me", headers=admin_headers)
+
+    text = (await client.get("/metrics")).text
+    assert sample(text, series) == before + 1
+    assert 'http_request_db_queries_count{route="/api/auth/login"}' in text
+    assert "http_request_bcrypt_seconds" in text
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/health/db-pool"])
+async def test_operational_endpoints_refuse_outside_callers(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "internal_networks", "10.0.0.0/8")
+
+    assert (await client.get(path)).status_code == 403
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/health/db-pool"])
+async def test_metrics_token_opens_operational_endpoints(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "internal_networks", "")
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+
+    assert (await client.get(path, headers={"Authorization": "Bearer wrong"})).status_code == 403
+    assert (await client.get(path, headers={"Authorization": "Bearer scrape-secret"})).status_code == 200
@@ -0,0 +1,41 @@
+from sqlalchemy import create_engine, inspect
+
+from app.core import database
+from app.core.database import Base
+from app.core.migrations import applied_versions, load_migrations, upgrade
+
+
+def test_migrations_build_the_models_schema(database_url):
+    tables = inspect(database.engine).get_table_names()
+
+    for table in Base.metadata.sorted_tables:
+        assert table.name in tables
+        columns = {column["name"] for column in inspect(database.engine).get_columns(table.name)}
+        assert {column.name for column in table.columns} <= columns
+
+
+def test_every_migration_is_recorded_once(database_url):
+    versions = [migration.version for migration in load_migrations()]
+
+    assert versions == list(range(1, len(versions) + 1))
+    with database.engine.connect() as conn:
+        assert applied_versions(conn) == set(versions)
+    assert upgrade(database.engine, log=lambda message: None) == []
+
+
+def test_upgrade_to_a_target_stops_there(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'partial.db'}")
+    try:
+        applied = upgrade(engine, target=3, log=lambda message: None)
+
+        assert [migration.version for migration in applied] == [1, 2, 3]
+        with engine.connect() as conn:
+            assert applied_versions(conn) == {1, 2, 3}
+        assert [migration.version for migration in upgrade(engine, log=lambda message: None)][0] == 4
+    finally:
+        engine.dispose()
+
+
+def test_importing_the_app_opens_no_connections(database_url):
+    # Engines are built by the lifespan, not at import
+    assert database.async_engine is None
@@ -0,0 +1,99 @@
+import smtplib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core import database
+from app.core.config import settings
+from app.models.outbox import OutboxMessage, OutboxStatus
+from app.services.mailer import MemoryTransport, SMTPTransport, build_transport
+from app.services.outbox import OutboxDispatcher
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyTransport(MemoryTransport):
+    """Fails the first ``failures`` sends"""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    async def send(self, message):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("relay unavailable")
+        await super().send(message)
+
+
+def outbox_rows():
+    with database.engine.connect() as conn:
+        return conn.execute(select(OutboxMessage).order_by(OutboxMessage.id)).all()
+
+
+async def invite(client, admin_headers, *emails):
+    response = await client.post(
+        "/api/invites/bulk", headers=admin_headers, json=[{"email": email, "role": "client"} for email in emails]
+    )
+    assert response.json()["created"] == len(emails)
+
+
+async def test_invites_are_queued_in_their_transaction_and_sent_later(client, admin_headers):
+    await invite(client, admin_headers, "a@example.com", "b@example.com")
+    assert [row.status for row in outbox_rows()] == [OutboxStatus.PENDING] * 2
+
+    transport = MemoryTransport()
+    dispatcher = OutboxDispatcher(database.AsyncSessionLocal, transport, batch_size=1)
+
+    assert await dispatcher.drain() == 2
+    assert sorted(message["To"] for message in transport.sent) == ["a@example.com", "b@example.com"]
+    assert "invite_token=" in transport.sent[0].get_content()
+    assert [row.status for row in outbox_rows()] == [OutboxStatus.SENT] * 2
+
+
+async def test_failed_sends_back_off_then_fail_permanently(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(settings, "outbox_max_attempts", 2)
+    await invite(client, admin_headers, "a@example.com")
+    dispatcher = OutboxDispatcher(database.AsyncSessionLocal, FlakyTransport(failures=2))
+
+    assert await dispatcher.drain() == 1
+    row = outbox_rows()[0]
+    assert row.status == OutboxStatus.PENDING
+    assert row.last_error == "ConnectionError: relay unavailable"
+    assert dispatcher.retried_total == 1
+
+    # Skip the backoff
+    with database.engine.begin() as conn:
+        conn.execute(update(OutboxMessage).values(available_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    assert await dispatcher.drain() == 1
+    assert outbox_rows()[0].status == OutboxStatus.FAILED
+    assert dispatcher.failed_total == 1
+
+
+def test_smtp_transport_uses_the_send_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "email_transport", "smtp")
+    monkeypatch.setattr(settings, "smtp_starttls", False)
+    monkeypatch.setattr(settings, "outbox_send_timeout_seconds", 7.5)
+    opened = []
+
+    class FakeSMTP:
+        def __init__(self, host, port, timeout):
+            opened.append((host, port, timeout))
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def send_message(self, message):
+            pass
+
+    monkeypatch.setattr(smtplib, "SMTP", FakeSMTP)
+    transport = build_transport()
+    assert isinstance(transport, SMTPTransport)
+
+    transport._send(None)
+
+    assert opened == [(settings.smtp_host, settings.smtp_port, 7.5)]
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import select
+
+from app.core import database
+from app.core.config import settings
+from app.core.security import get_password_hash, password_hasher, password_needs_rehash
+from app.models.user import User
+from tests.conftest import PASSWORD
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_login_is_shed_with_503_when_the_pool_is_full(client, create_user, monkeypatch):
+    create_user("client@example.com")
+    monkeypatch.setattr(settings, "bcrypt_max_pending", 0)
+
+    response = await client.post("/api/auth/login", json={"email": "client@example.com", "password": PASSWORD})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert password_hasher.rejected >= 1
+
+
+async def test_login_upgrades_a_hash_with_another_work_factor(client, create_user, login, monkeypatch):
+    user_id = create_user("client@example.com")
+    monkeypatch.setattr(settings, "bcrypt_rounds", 5)
+    with database.engine.begin() as conn:
+        old_hash = conn.execute(select(User.hashed_password).where(User.id == user_id)).scalar_one()
+    assert password_needs_rehash(old_hash)
+
+    await login("client@example.com")
+
+    with database.engine.begin() as conn:
+        new_hash = conn.execute(select(User.hashed_password).where(User.id == user_id)).scalar_one()
+    assert new_hash != old_hash
+    assert not password_needs_rehash(new_hash)
+
+
+def test_rehash_follows_the_configured_rounds(monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+    hashed = get_password_hash(PASSWORD)
+
+    assert not password_needs_rehash(hashed)
+    monkeypatch.setattr(settings, "bcrypt_rounds", 6)
+    assert password_needs_rehash(hashed)
+    assert password_needs_rehash("not-a-bcrypt-hash")
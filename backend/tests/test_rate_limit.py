@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import event
+
+from app.core import database
+from app.core.config import settings
+from app.core.rate_limit import MemoryRateLimitBackend, login_limiter
+from app.routers import auth
+from tests.conftest import PASSWORD
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def rate_limited(monkeypatch):
+    monkeypatch.setattr(settings, "login_rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "login_rate_limit_per_email", 2)
+    monkeypatch.setattr(settings, "login_rate_limit_per_ip", 5)
+    monkeypatch.setattr(login_limiter, "backend", MemoryRateLimitBackend(100))
+
+
+async def attempt(client, email, password="wrong-password"):
+    return await client.post("/api/auth/login", json={"email": email, "password": password})
+
+
+async def test_limited_attempts_are_rejected_before_any_query(client, create_user, rate_limited):
+    create_user("client@example.com")
+    assert [(await attempt(client, "client@example.com")).status_code for _ in range(2)] == [401, 401]
+
+    statements = []
+    engine = database.async_engine.sync_engine
+    record = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = await attempt(client, "client@example.com")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == str(settings.login_rate_limit_window_seconds)
+    assert statements == []
+
+
+async def test_ip_budget_spans_emails(client, rate_limited):
+    codes = [(await attempt(client, f"user{i}@example.com")).status_code for i in range(6)]
+
+    assert codes == [401] * 5 + [429]
+
+
+async def test_successful_login_resets_the_email_budget(client, create_user, rate_limited):
+    create_user("client@example.com")
+    await attempt(client, "client@example.com")
+    assert (await attempt(client, "client@example.com", PASSWORD)).status_code == 200
+
+    assert [(await attempt(client, "client@example.com")).status_code for _ in range(2)] == [401, 401]
+
+
+async def test_unknown_email_still_spends_a_password_verify(client, monkeypatch):
+    verified = []
+
+    async def dummy(password):
+        verified.append(password)
+        return False
+
+    monkeypatch.setattr(auth, "verify_dummy_password", dummy)
+
+    assert (await attempt(client, "nobody@example.com")).status_code == 401
+    assert verified == ["wrong-password"]
+
+
+async def test_memory_backend_evicts_the_least_recent_key():
+    backend = MemoryRateLimitBackend(2)
+    for key in ("a", "b", "a", "c"):
+        await backend.hit(key, 60, 1000.0)
+
+    assert len(backend) == 2
+    assert backend.evictions == 1
+    assert await backend.hit("b", 60, 1000.0) == 1
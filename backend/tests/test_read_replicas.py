@@ -0,0 +1,69 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.core.config import settings
+from app.core.database import read_replicas
+from app.core.migrations import upgrade
+from app.models.invite import Invite, InviteStatus
+
+pytestmark = pytest.mark.anyio
+
+
+def add_invite(url: str, token: str) -> None:
+    engine = create_engine(url)
+    try:
+        upgrade(engine, log=lambda message: None)
+        with engine.begin() as conn:
+            conn.execute(Invite.__table__.insert(), {
+                "email": f"{token}@example.com",
+                "role": "client",
+                "invite_token": token,
+                "status": InviteStatus.PENDING,
+                "created_by": 1,
+                "expires_at": datetime.now(timezone.utc) + timedelta(days=1),
+            })
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def replica_url(database_url, tmp_path, monkeypatch):
+    # Two SQLite files stand in for a primary and a replica that has not
+    # caught up: each holds an invite the other lacks
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    add_invite(url, "on-replica")
+    add_invite(database_url, "on-primary")
+    monkeypatch.setattr(settings, "database_replica_urls", url)
+    return url
+
+
+async def test_reads_go_to_the_replica(replica_url, client):
+    assert (await client.get("/api/invites/invite/on-replica")).status_code == 200
+    assert (await client.get("/api/invites/invite/on-primary")).status_code == 404
+
+
+async def test_clients_that_just_wrote_read_from_the_primary(replica_url, client, admin_headers):
+    response = await client.post(
+        "/api/invites/bulk", headers=admin_headers, json=[{"email": "new@example.com", "role": "client"}]
+    )
+    last_write = response.headers["x-last-write"]
+    assert abs(float(last_write) - time.time()) < 5
+
+    assert (await client.get("/api/invites/invite/on-primary", headers={"X-Last-Write": last_write})).status_code == 200
+    stale = f"{time.time() - settings.read_your_writes_seconds - 1:.3f}"
+    assert (await client.get("/api/invites/invite/on-primary", headers={"X-Last-Write": stale})).status_code == 404
+
+
+@pytest.fixture
+def unreachable_replica(database_url, tmp_path, monkeypatch):
+    add_invite(database_url, "on-primary")
+    monkeypatch.setattr(settings, "database_replica_urls", f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+
+
+async def test_unreachable_replica_fails_over_to_the_primary(unreachable_replica, client):
+    assert (await client.get("/api/invites/invite/on-primary")).status_code == 200
+    # Marked down by the failed checkout or the health check, whichever ran first
+    assert read_replicas.healthy == [False]
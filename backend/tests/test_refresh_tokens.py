@@ -0,0 +1,53 @@
+import pytest
+
+from app.core.security import password_hasher
+
+pytestmark = pytest.mark.anyio
+
+
+async def refresh(client, refresh_token):
+    return await client.post("/api/auth/refresh", json={"refresh_token": refresh_token})
+
+
+async def test_refresh_rotates_the_refresh_token(client, create_user, login):
+    create_user("client@example.com")
+    tokens = await login("client@example.com")
+
+    response = await refresh(client, tokens["refresh_token"])
+
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    me = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert me.json()["email"] == "client@example.com"
+
+
+async def test_refresh_never_touches_bcrypt(client, create_user, login, monkeypatch):
+    create_user("client@example.com")
+    tokens = await login("client@example.com")
+
+    async def no_bcrypt(*args):
+        raise AssertionError("refresh ran bcrypt")
+
+    monkeypatch.setattr(password_hasher, "run", no_bcrypt)
+
+    assert (await refresh(client, tokens["refresh_token"])).status_code == 200
+
+
+async def test_reusing_a_spent_refresh_token_revokes_its_family(client, create_user, login):
+    create_user("client@example.com")
+    tokens = await login("client@example.com")
+    rotated = (await refresh(client, tokens["refresh_token"])).json()
+
+    assert (await refresh(client, tokens["refresh_token"])).status_code == 401
+    assert (await refresh(client, rotated["refresh_token"])).status_code == 401
+
+
+async def test_refresh_token_of_another_family_survives_reuse(client, create_user, login):
+    create_user("client@example.com")
+    first = await login("client@example.com")
+    second = await login("client@example.com")
+    await refresh(client, first["refresh_token"])
+
+    assert (await refresh(client, first["refresh_token"])).status_code == 401
+    assert (await refresh(client, second["refresh_token"])).status_code == 200
@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import List, Optional
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, Response
+from pydantic import BaseModel
+
+from app.core.serialization import FastJSONResponse, TrustedResponseRoute, serializer_for
+
+pytestmark = pytest.mark.anyio
+
+
+class Item(BaseModel):
+    id: int
+    created_at: datetime
+
+
+class Page(BaseModel):
+    items: List[Item]
+    next_cursor: Optional[str] = None
+
+
+router = APIRouter(route_class=TrustedResponseRoute, default_response_class=FastJSONResponse)
+
+
+@router.post("/items", response_model=Item, status_code=201)
+async def create_item(response: Response):
+    response.headers["Location"] = "/items/1"
+    response.set_cookie("seen", "1")
+    return SimpleNamespace(id=1, created_at=datetime(2026, 1, 2, tzinfo=timezone.utc), secret="x")
+
+
+@router.get("/items", response_model=Page)
+def list_items(response: Response):
+    response.status_code = 206
+    return {"items": [{"id": 1, "created_at": datetime(2026, 1, 2, tzinfo=timezone.utc)}]}
+
+
+@router.get("/items/1", response_model=Item)
+async def read_item(response: Response):
+    response.status_code = 304
+    return SimpleNamespace(id=1, created_at=None)
+
+
+app = FastAPI()
+app.include_router(router, prefix="/api")
+
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def test_serializer_copies_only_schema_fields():
+    row = SimpleNamespace(items=[SimpleNamespace(id=1, created_at=None, secret="x")], next_cursor=None)
+
+    assert serializer_for(Page).dump(row) == {"items": [{"id": 1, "created_at": None}], "next_cursor": None}
+
+
+async def test_headers_cookies_and_status_of_the_injected_response_are_kept(client):
+    response = await client.post("/api/items")
+
+    assert response.status_code == 201
+    assert response.headers["location"] == "/items/1"
+    assert response.cookies["seen"] == "1"
+    assert response.json() == {"id": 1, "created_at": "2026-01-02T00:00:00Z"}
+
+
+async def test_status_set_on_the_injected_response_wins(client):
+    response = await client.get("/api/items")
+
+    assert response.status_code == 206
+    assert response.json()["items"][0]["id"] == 1
+
+
+async def test_bodiless_status_sends_no_body(client):
+    response = await client.get("/api/items/1")
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_sub_response_stays_out_of_the_schema():
+    operation = app.openapi()["paths"]["/api/items"]["post"]
+
+    assert "parameters" not in operation
+    assert operation["responses"]["201"]["content"]["application/json"]["schema"]["$ref"].endswith("/Item")
@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import serve
+from app.core.config import settings
+from app.core.metrics import RETIRED_SNAPSHOT, MultiProcessMetrics, Registry, retire_snapshots
+
+
+@pytest.mark.parametrize("transport, pool_size", [("postgres", 9), ("local", 10)])
+def test_connection_budget_leaves_room_for_the_listen_connection(monkeypatch, transport, pool_size):
+    monkeypatch.setattr(settings, "db_max_connections", 40)
+    monkeypatch.setattr(settings, "events_transport", transport)
+    monkeypatch.setattr(settings, "db_pool_size", 10)
+    monkeypatch.setattr(settings, "db_max_overflow", 20)
+
+    serve.apply_connection_budget(4)
+
+    assert (settings.db_pool_size, settings.db_max_overflow) == (pool_size, 0)
+
+
+def test_connection_budget_below_one_pooled_connection_per_worker_is_refused(monkeypatch):
+    monkeypatch.setattr(settings, "db_max_connections", 4)
+    monkeypatch.setattr(settings, "events_transport", "postgres")
+
+    with pytest.raises(SystemExit):
+        serve.apply_connection_budget(4)
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def write_snapshot(directory, pid, requests, in_flight, start=0):
+    families = [
+        ["http_requests_total", "counter", "requests", [["http_requests_total", {}, requests]]],
+        ["http_requests_in_flight", "gauge", "in flight", [["http_requests_in_flight", {}, in_flight]]],
+    ]
+    with open(os.path.join(directory, f"{pid}-{start}.json"), "w") as f:
+        json.dump(families, f)
+
+
+def merged(directory) -> dict:
+    metrics = MultiProcessMetrics(Registry())
+    metrics.directory = str(directory)
+    return {
+        (series_name, labels.get("worker")): value
+        for _, _, _, series in metrics.collect()
+        for series_name, labels, value in series
+    }
+
+
+def test_exited_workers_are_folded_into_one_snapshot(tmp_path):
+    live = os.getppid()
+    write_snapshot(tmp_path, live, requests=5, in_flight=2)
+    write_snapshot(tmp_path, dead_pid(), requests=7, in_flight=3)
+    write_snapshot(tmp_path, dead_pid(), requests=11, in_flight=4)
+    before = merged(tmp_path)
+
+    assert retire_snapshots(str(tmp_path)) == 2
+    assert sorted(os.listdir(tmp_path)) == sorted([f"{live}-0.json", RETIRED_SNAPSHOT])
+    assert merged(tmp_path) == before == {
+        ("http_requests_total", None): 23,
+        ("http_requests_in_flight", str(live)): 2,
+    }
+
+    write_snapshot(tmp_path, dead_pid(), requests=1, in_flight=1)
+    assert retire_snapshots(str(tmp_path)) == 1
+    assert merged(tmp_path)[("http_requests_total", None)] == 24
+    assert retire_snapshots(str(tmp_path)) == 0
+
+
+def test_snapshots_already_folded_are_not_counted_twice(tmp_path):
+    pid = dead_pid()
+    write_snapshot(tmp_path, pid, requests=7, in_flight=0)
+    retire_snapshots(str(tmp_path))
+    # As a reader that listed the directory before the file was removed would see it
+    write_snapshot(tmp_path, pid, requests=7, in_flight=0)
+
+    assert merged(tmp_path)[("http_requests_total", None)] == 7
@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+
+from app.core.auth import invalidate_user, user_cache
+from app.core.cache import TTLCache
+from app.core.security import create_access_token, decode_token, token_cache, token_digest
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(2, 60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_at_the_shorter_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(10, 60)
+    cache.set("short", 1, ttl=5)
+    cache.set("capped", 2, ttl=3600)
+
+    now[0] += 10
+    assert cache.get("short") is None
+    now[0] += 60
+    assert cache.get("capped") is None
+    assert cache.stats()["expirations"] == 2
+
+
+def test_decoded_tokens_are_served_from_the_cache(database_url):
+    token = create_access_token({"sub": "a@example.com", "user_id": 1}, timedelta(minutes=5))
+    hits = token_cache.hits
+
+    assert decode_token(token)["user_id"] == 1
+    assert decode_token(token)["user_id"] == 1
+    assert token_cache.hits == hits + 1
+
+
+def test_expired_tokens_are_not_cached(database_url):
+    token = create_access_token({"sub": "a@example.com", "user_id": 1}, timedelta(seconds=-1))
+
+    assert decode_token(token) is None
+    assert token_cache.get(token_digest(token)) is None
+
+
+def test_invalidate_user_drops_only_that_users_entries(database_url):
+    first = create_access_token({"sub": "a@example.com", "user_id": 1}, timedelta(minutes=5))
+    second = create_access_token({"sub": "b@example.com", "user_id": 2}, timedelta(minutes=5))
+    decode_token(first)
+    decode_token(second)
+    user_cache.set(1, object())
+
+    invalidate_user(1)
+
+    assert token_cache.get(token_digest(first)) is None
+    assert token_cache.get(token_digest(second)) is not None
+    assert user_cache.get(1) is None
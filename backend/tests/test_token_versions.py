@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import text
+
+from app.core import database
+from app.core.auth import token_versions
+from app.models.user import User, UserRole
+from app.services.events import Event, event_hub
+
+pytestmark = pytest.mark.anyio
+
+
+def bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+async def test_role_change_in_the_app_revokes_tokens_at_once(client, create_user, login):
+    user_id = create_user("client@example.com")
+    tokens = await login("client@example.com")
+    assert (await client.get("/api/auth/me", headers=bearer(tokens))).status_code == 200
+
+    with database.SessionLocal() as db:
+        db.get(User, user_id).role = UserRole.FEE_EARNER
+        db.commit()
+
+    assert (await client.get("/api/auth/me", headers=bearer(tokens))).status_code == 401
+    fresh = await login("client@example.com")
+    assert (await client.get("/api/auth/me", headers=bearer(fresh))).json()["role"] == UserRole.FEE_EARNER
+
+
+async def test_token_version_bumped_outside_the_app_revokes_tokens(client, create_user, login):
+    user_id = create_user("client@example.com")
+    tokens = await login("client@example.com")
+    assert (await client.get("/api/auth/me", headers=bearer(tokens))).status_code == 200
+
+    # Plain SQL, as another worker, manage_users.py or an operator would run it
+    with database.engine.begin() as conn:
+        conn.execute(text("UPDATE users SET token_version = token_version + 1 WHERE id = :id"), {"id": user_id})
+    # What TOKEN_VERSION_CACHE_TTL_SECONDS passing does
+    token_versions.clear()
+
+    assert (await client.get("/api/auth/me", headers=bearer(tokens))).status_code == 401
+    fresh = await login("client@example.com")
+    assert (await client.get("/api/auth/me", headers=bearer(fresh))).status_code == 200
+
+
+async def test_user_deactivated_outside_the_app_is_locked_out(client, create_user, login):
+    user_id = create_user("client@example.com")
+    tokens = await login("client@example.com")
+
+    with database.engine.begin() as conn:
+        conn.execute(text("UPDATE users SET is_active = false WHERE id = :id"), {"id": user_id})
+    token_versions.clear()
+
+    assert (await client.get("/api/auth/me", headers=bearer(tokens))).status_code == 401
+
+
+async def test_version_lookups_are_cached(client, create_user, login):
+    create_user("client@example.com")
+    tokens = await login("client@example.com")
+    lookups = token_versions.lookups
+
+    for _ in range(5):
+        assert (await client.get("/api/auth/me", headers=bearer(tokens))).status_code == 200
+
+    assert token_versions.lookups - lookups <= 1
+
+
+async def test_revocation_event_from_another_worker_applies_at_once(client, create_user, login):
+    user_id = create_user("client@example.com")
+    tokens = await login("client@example.com")
+    assert (await client.get("/api/auth/me", headers=bearer(tokens))).status_code == 200
+
+    # What a worker's listener gets when another worker commits a revocation
+    event_hub.deliver(Event("user.tokens_revoked", {"revocations": [(user_id, 1)]}))
+
+    assert (await client.get("/api/auth/me", headers=bearer(tokens))).status_code == 401
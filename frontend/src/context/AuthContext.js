@@ -18,17 +18,20 @@ export const AuthProvider = ({ children }) => {
     setLoading(false);
   }, []);
 
-  const login = async (email, password) => {
-    const response = await authService.login(email, password);
-    const { access_token, user: userData } = response.data;
-    
+  const startSession = ({ access_token, refresh_token, user: userData }) => {
     localStorage.setItem('access_token', access_token);
+    localStorage.setItem('refresh_token', refresh_token);
     setToken(access_token);
     setUser(userData);
     
     return userData;
   };
 
+  const login = async (email, password) => {
+    const response = await authService.login(email, password);
+    return startSession(response.data);
+  };
+
   const register = async (email, password, fullName) => {
     const response = await authService.register(email, password, fullName);
     const userData = response.data;
@@ -37,14 +40,21 @@ export const AuthProvider = ({ children }) => {
     return userData;
   };
 
+  // Accepting an invite creates the account and logs it in
+  const registerWithInvite = async (inviteToken, password, fullName) => {
+    const response = await authService.registerWithInvite(inviteToken, password, fullName);
+    return startSession(response.data);
+  };
+
   const logout = () => {
     localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
     setToken(null);
     setUser(null);
   };
 
   return (
-    <AuthContext.Provider value={{ user, token, login, register, logout, loading }}>
+    <AuthContext.Provider value={{ user, token, login, register, registerWithInvite, logout, loading }}>
       {children}
     </AuthContext.Provider>
   );
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import { homeService } from '../services/api';
+import { subscribeToEvents } from '../services/events';
 
 const ClientHome = () => {
   const { user, logout } = useAuth();
@@ -21,6 +22,14 @@ const ClientHome = () => {
       }
     };
     fetchClientData();
+
+    // Refetch when the server says the dashboard changed; the ETag makes an
+    // unchanged refetch a cheap 304
+    return subscribeToEvents({
+      ready: fetchClientData,
+      resync: fetchClientData,
+      'dashboard.invalidated': fetchClientData,
+    });
   }, []);
 
   const handleLogout = () => {
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import { homeService } from '../services/api';
+import { subscribeToEvents } from '../services/events';
 
 const FeeEarnerHome = () => {
   const { user, logout } = useAuth();
@@ -21,6 +22,14 @@ const FeeEarnerHome = () => {
       }
     };
     fetchFeeEarnerData();
+
+    // Refetch when the server says the dashboard changed; the ETag makes an
+    // unchanged refetch a cheap 304
+    return subscribeToEvents({
+      ready: fetchFeeEarnerData,
+      resync: fetchFeeEarnerData,
+      'dashboard.invalidated': fetchFeeEarnerData,
+    });
   }, []);
 
   const handleLogout = () => {
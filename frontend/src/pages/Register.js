@@ -15,7 +15,7 @@ const Register = () => {
   const [inviteToken, setInviteToken] = useState(null);
   const [inviteData, setInviteData] = useState(null);
 
-  const { register } = useAuth();
+  const { register, registerWithInvite } = useAuth();
   const navigate = useNavigate();
   const location = useLocation();
 
@@ -69,8 +69,13 @@ const Register = () => {
 
     setLoading(true);
     try {
-      await register(formData.email, formData.password, formData.fullName);
-      navigate('/login');
+      if (inviteToken) {
+        const user = await registerWithInvite(inviteToken, formData.password, formData.fullName);
+        navigate(user.role === 'FEE_EARNER' ? '/fee-earner-home' : '/client-home');
+      } else {
+        await register(formData.email, formData.password, formData.fullName);
+        navigate('/login');
+      }
     } catch (err) {
       setError(err.response?.data?.detail || 'Registration failed');
     } finally {
@@ -1,23 +1,113 @@
 import axios from 'axios';
 
-const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
+export const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
 
 const apiClient = axios.create({
   baseURL: API_URL,
 });
 
+// Latest X-Last-Write seen from the API; echoing it back makes reads right
+// after a write go to the primary database instead of a lagging replica
+let lastWrite = null;
+
 // Add token to requests
 apiClient.interceptors.request.use((config) => {
   const token = localStorage.getItem('access_token');
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
   }
+  if (lastWrite) {
+    config.headers['X-Last-Write'] = lastWrite;
+  }
   return config;
 });
 
+apiClient.interceptors.response.use((response) => {
+  const marker = response.headers['x-last-write'];
+  if (marker) {
+    lastWrite = marker;
+  }
+  return response;
+});
+
+// On a 401, swap the refresh token for a new access token once and retry.
+// Refresh tokens are single-use, so concurrent 401s share one refresh call.
+let refreshing = null;
+
+export const refreshAccessToken = () => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshing = (refreshToken
+      ? axios.post(`${API_URL}/auth/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then((response) => {
+        localStorage.setItem('access_token', response.data.access_token);
+        localStorage.setItem('refresh_token', response.data.refresh_token);
+        return response.data.access_token;
+      })
+      .catch((error) => {
+        localStorage.removeItem('access_token');
+        localStorage.removeItem('refresh_token');
+        throw error;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+apiClient.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    const isAuthCall = original && /\/auth\/(login|refresh)$/.test(original.url);
+    if (error.response?.status === 401 && original && !original._retried && !isAuthCall) {
+      original._retried = true;
+      const token = await refreshAccessToken();
+      original.headers.Authorization = `Bearer ${token}`;
+      return apiClient(original);
+    }
+    return Promise.reject(error);
+  }
+);
+
+// Writes that are safe to retry carry an Idempotency-Key, generated once per
+// call: the API replays the first response to every retry with the same key
+const newIdempotencyKey = () =>
+  window.crypto?.randomUUID?.() ?? `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+const idempotent = () => ({ headers: { 'Idempotency-Key': newIdempotencyKey() } });
+
+const MAX_NETWORK_RETRIES = 2;
+
+// Retry idempotent writes that never got a response (dropped connection,
+// timeout) with a short backoff
+apiClient.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    const attempts = original?._networkRetries || 0;
+    if (!error.response && original?.headers?.['Idempotency-Key'] && attempts < MAX_NETWORK_RETRIES) {
+      original._networkRetries = attempts + 1;
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempts));
+      return apiClient(original);
+    }
+    return Promise.reject(error);
+  }
+);
+
 export const authService = {
   register: (email, password, fullName) =>
-    apiClient.post('/auth/register', { email, password, full_name: fullName }),
+    apiClient.post('/auth/register', { email, password, full_name: fullName }, idempotent()),
+  
+  registerWithInvite: (inviteToken, password, fullName) =>
+    apiClient.post('/auth/register-with-invite', {
+      invite_token: inviteToken,
+      password,
+      full_name: fullName,
+    }, idempotent()),
   
   login: (email, password) =>
     apiClient.post('/auth/login', { email, password }),
@@ -31,7 +121,7 @@ export const inviteService = {
     apiClient.get(`/invites/invite/${inviteToken}`),
   
   sendInvite: (email, role) =>
-    apiClient.post('/invites/send-invite', { email, role }),
+    apiClient.post('/invites/send-invite', { email, role }, idempotent()),
 };
 
 export const homeService = {
@@ -0,0 +1,49 @@
+import { API_URL, refreshAccessToken } from './api';
+
+// Opens the live event stream (server-sent events) and calls
+// handlers[eventType](data) for each event. 'ready' (stream opened) and
+// 'resync' (events were missed) mean "refetch from the REST API".
+// Returns a function that closes the stream.
+export const subscribeToEvents = (handlers) => {
+  let source = null;
+  let retryTimer = null;
+  let closed = false;
+
+  const connect = () => {
+    const token = localStorage.getItem('access_token');
+    if (closed || !token) {
+      return;
+    }
+    // EventSource can't send headers, so the token goes in the query string
+    source = new EventSource(`${API_URL}/events/stream?token=${encodeURIComponent(token)}`);
+    Object.entries(handlers).forEach(([type, handler]) => {
+      source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+    });
+    source.addEventListener('expired', () => reconnect(0));
+    source.onerror = () => {
+      // EventSource retries dropped connections itself but gives up on an
+      // HTTP error such as 401 (token expired) or 503 (server busy)
+      if (source.readyState === EventSource.CLOSED) {
+        reconnect(5000);
+      }
+    };
+  };
+
+  const reconnect = (delay) => {
+    source.close();
+    clearTimeout(retryTimer);
+    retryTimer = setTimeout(() => {
+      refreshAccessToken().then(connect, () => {});
+    }, delay);
+  };
+
+  connect();
+
+  return () => {
+    closed = true;
+    clearTimeout(retryTimer);
+    if (source) {
+      source.close();
+    }
+  };
+};
@@ -28,7 +28,7 @@ echo "Setup complete!"
 echo ""
 echo "To run the application:"
 echo "1. Update backend/.env with PostgreSQL connection string"
-echo "2. In one terminal: cd backend && source venv/bin/activate && python main.py"
+echo "2. In one terminal: cd backend && source venv/bin/activate && python migrate.py && python main.py"
 echo "3. In another terminal: cd frontend && npm start"
 echo ""
 echo "Then visit: http://localhost:3000"